@@ -10,7 +10,8 @@ const AuditLog = () => {
     const fetchLogs = async () => {
       try {
         const res = await api.get('/audit-logs/');
-        setLogs(res.data);
+        // The feed is cursor paginated, this page shows the newest entries
+        setLogs(res.data.results);
       } catch (error) {
         console.error('Failed to load audit logs', error);
       } finally {
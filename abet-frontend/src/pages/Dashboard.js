@@ -234,12 +234,12 @@ const Dashboard = () => {
               break;
 
             case "recentActivities":
-              const activitiesData = response.value.data;
+              const activitiesData = response.value.data.results;
               setRecentActivities(activitiesData);
               newDashboardData.recentActivities = activitiesData;
               console.log(
                 "Recent activities loaded:",
-                response.value.data.length
+                activitiesData.length
               );
               break;
             case "facultyTraining":
@@ -262,7 +262,7 @@ const Dashboard = () => {
               break;
 
             case "auditLogs":
-              newDashboardData.recentActivities = response.value.data;
+              newDashboardData.recentActivities = response.value.data.results;
               break;
 
             default:
@@ -16,7 +16,7 @@ const CourseList = () => {
            },
            withCredentials: true 
     }
-    axios.get('http://localhost:8000/api/courses/',config)
+    axios.get('http://localhost:8000/api/courses/?expand=average_score,assessments.score',config)
       .then(res => {
         console.log("Fetched courses:", res.data); 
         setCourses(res.data);
@@ -28,7 +28,7 @@ const ProgramDetail = () => {
         const [programRes, avgRes, assessmentsRes] = await Promise.all([
           api.get(`/programs/${id}/`),
           api.get(`/assessments/program/${id}/average/`),
-          api.get(`/assessments/?program_id=${id}`),
+          api.get(`/assessments/?program_id=${id}&expand=score`),
         ]);
         setProgram(programRes.data);
         setAverageData(avgRes.data);
@@ -67,6 +67,9 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    # Outermost so the numbers include the other middleware, inactive unless
+    # REQUEST_METRICS_ENABLED is set
+    'assessment.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -127,6 +130,56 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Dashboard snapshots only need get/set/add/incr, so a file based or Redis
+# backend can be swapped in to share them between worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'abet-assessment',
+    }
+}
+
+# Seconds a dashboard snapshot is kept even if no data changes
+DASHBOARD_SNAPSHOT_TIMEOUT = 60 * 60
+
+# After a data change keep serving the previous snapshot (marked stale) while it
+# is rebuilt in the background, as long as the change was at most this many
+# seconds ago. After that the rebuild is synchronous; 0 disables
+# stale-while-revalidate.
+DASHBOARD_SNAPSHOT_MAX_STALENESS = 15 * 60
+
+# Concurrent cold-cache requests share one computation (assessment/singleflight.py)
+SINGLE_FLIGHT_LOCK_TIMEOUT = 120
+SINGLE_FLIGHT_WAIT_TIMEOUT = 60
+
+# Assessment events are queued in an outbox and written in batches by a
+# background thread in each process. Disable it when the
+# flush_assessment_events command runs as a separate worker.
+ASSESSMENT_EVENT_BACKGROUND_FLUSH = True
+ASSESSMENT_EVENT_FLUSH_DELAY = 2
+
+# Per-endpoint query count / latency histograms (assessment/metrics.py).
+# Each process publishes its numbers to the cache every
+# REQUEST_METRICS_PUBLISH_INTERVAL seconds; see them at
+# /api/request-metrics/ or with the request_metrics_report command.
+REQUEST_METRICS_ENABLED = False
+REQUEST_METRICS_PUBLISH_INTERVAL = 30
+
+# Self-study PDFs (reports/self_study.py) are rendered by a small thread pool in
+# each process and stored under a hash of their data, so unchanged data is
+# never rendered twice. Jobs still pending after the timeout are started again.
+SELF_STUDY_REPORT_DIR = BASE_DIR / 'generated_reports' / 'self_study'
+SELF_STUDY_REPORT_BACKGROUND = True
+SELF_STUDY_REPORT_WORKERS = 2
+SELF_STUDY_REPORT_TIMEOUT = 30 * 60
+
+# The archive tree is indexed in archive.ArchiveNode, reconcile_archive scans
+# folders whose mtime changed on this many threads. Run `manage.py reconcile_archive`
+# after `manage.py migrate` on deploy, migrations do not fill the index
+ARCHIVE_RECONCILE_WORKERS = 4
 ARCHIVE_BASE_PATH = r"C:\Users\Cobra Shop\Desktop\University\University Courses\First Semester - 5th Year\Software Engineering\Project\ABETFiles"
 
 
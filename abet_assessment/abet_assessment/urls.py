@@ -15,11 +15,11 @@ from assessment.views import (
     AssessmentViewSet, ContinuousImprovementViewSet, AcademicPerformanceViewSet,
     AssessmentLearningOutcomeViewSet, AssessmentLearningOutcomeABETViewSet, DashboardStatsView, AuditLogListAPIView,
     ABETOutcomeViewSet, AssessmentEventViewSet, program_averages, abet_accreditation_status, debug_abet_outcomes, assessment_methods_summary,
-    compliance_dashboard, FacultyTrainingViewSet, faculty_training_stats, RecentActivitiesAPIView, AssessmentQuestionViewSet, get_course_academic_performances
+    compliance_dashboard, FacultyTrainingViewSet, faculty_training_stats, request_metrics, course_assessment_summary, import_assessment_data, export_assessment_data, RecentActivitiesAPIView, AssessmentQuestionViewSet, get_course_academic_performances
 )
 
 from reports.views import (
-    ReportViewSet, CommentViewSet, get_csrf_token, add_comment, current_user
+    ReportViewSet, CommentViewSet, SelfStudyReportJobViewSet, get_csrf_token, add_comment, current_user
 )
 
 from users.views import (
@@ -65,6 +65,7 @@ router.register(r'masters-requirements', MastersLevelRequirementViewSet)
 # Reports app routes
 router.register(r'reports', ReportViewSet)
 router.register(r'comments', CommentViewSet)
+router.register(r'self-study-reports', SelfStudyReportJobViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -85,6 +86,13 @@ urlpatterns = [
          name='assessment-methods-summary'),
     path('api/compliance-dashboard/', compliance_dashboard,
          name='compliance-dashboard'),
+    path('api/request-metrics/', request_metrics, name='request-metrics'),
+    path('api/course-assessment-summary/', course_assessment_summary,
+         name='course-assessment-summary'),
+    path('api/exports/assessments/', export_assessment_data,
+         name='export-assessment-data'),
+    path('api/imports/<str:kind>/', import_assessment_data,
+         name='import-assessment-data'),
     path('api/get-csrf-token/', get_csrf_token, name='get_csrf_token'),
     path('api/courses/<int:course_id>/academic-performances/',
          get_course_academic_performances, name='course-academic-performances'),
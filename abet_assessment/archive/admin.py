@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SyllabusUploadStatus
+from .models import ArchiveNode, SyllabusUploadStatus
 
 
 @admin.register(SyllabusUploadStatus)
@@ -9,3 +9,11 @@ class SyllabusUploadStatusAdmin(admin.ModelAdmin):
     search_fields = ['professor__name', 'course_name']
     readonly_fields = ['created_at', 'updated_at', 'has_files']
     date_hierarchy = 'marked_at'
+
+
+@admin.register(ArchiveNode)
+class ArchiveNodeAdmin(admin.ModelAdmin):
+    list_display = ['academic_year', 'path', 'filename', 'kind', 'size', 'indexed_at']
+    list_filter = ['academic_year', 'kind', 'folder_type']
+    search_fields = ['path', 'filename', 'course']
+    readonly_fields = ['size', 'mtime', 'checksum', 'indexed_at']
@@ -0,0 +1,197 @@
+"""
+Chunked authenticated encryption for archive files.
+
+Layout of an encrypted file:
+
+    header   magic "ABETARC1" | version (1) | segment size (4) | plaintext length (8)
+             | salt (16) | nonce prefix (7)                          = 44 bytes
+    segments AES-256-GCM(plaintext[i * size:(i + 1) * size]) + 16 byte tag, ...
+
+Every segment is sealed on its own, so files are written and read one segment
+at a time and any byte range can be decrypted without touching the rest of
+the file. The segment nonce is the prefix, the segment index and a flag set on
+the last segment only, and the header (except the length, which is checked
+against the file size) is authenticated with every segment. Reordered,
+dropped, truncated or appended segments therefore fail to decrypt. Each file
+gets its own key, derived with HKDF from settings.ENCRYPTION_KEY and a random
+salt.
+
+Files written before this format (one Fernet token, or plain bytes from
+before encryption was added) are still read, in memory as before.
+"""
+import os
+import struct
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from django.conf import settings
+
+MAGIC = b'ABETARC1'
+VERSION = 1
+HEADER = struct.Struct('>8sBIQ16s7s')
+HEADER_SIZE = HEADER.size
+TAG_SIZE = 16
+SEGMENT_SIZE = 64 * 1024
+KEY_INFO = b'abet-archive-segment-key-v1'
+
+
+class InvalidArchiveFile(Exception):
+    """The file is damaged, was tampered with or was encrypted with another key"""
+
+
+def _derive_key(salt, master_key=None):
+    master_key = master_key or settings.ENCRYPTION_KEY
+    if isinstance(master_key, str):
+        master_key = master_key.encode()
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=KEY_INFO).derive(master_key)
+
+
+def _nonce(prefix, index, last):
+    return prefix + struct.pack('>IB', index, 1 if last else 0)
+
+
+def _aad(header):
+    # Everything but the length, which is only known after the last segment
+    magic, version, segment_size, _, salt, prefix = HEADER.unpack(header)
+    return struct.pack('>8sBI16s7s', magic, version, segment_size, salt, prefix)
+
+
+def encrypt_chunks(chunks, dest_path, segment_size=None, master_key=None):
+    """
+    Encrypt an iterable of byte chunks (e.g. UploadedFile.chunks()) to dest_path,
+    holding at most one segment in memory. The file is written next to the target
+    and renamed into place, so readers never see a partial file. Returns the
+    plaintext length.
+    """
+    segment_size = segment_size or getattr(settings, 'ARCHIVE_SEGMENT_SIZE', SEGMENT_SIZE)
+    salt, prefix = os.urandom(16), os.urandom(7)
+    aesgcm = AESGCM(_derive_key(salt, master_key))
+    aad = _aad(HEADER.pack(MAGIC, VERSION, segment_size, 0, salt, prefix))
+
+    tmp_path = f'{dest_path}.part'
+    length = 0
+    index = 0
+    try:
+        with open(tmp_path, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, VERSION, segment_size, 0, salt, prefix))
+            buffer = bytearray()
+            for chunk in chunks:
+                buffer += chunk
+                length += len(chunk)
+                # Keep the tail back: the last segment is only known once the input ends
+                while len(buffer) > segment_size:
+                    out.write(aesgcm.encrypt(_nonce(prefix, index, False),
+                                             bytes(buffer[:segment_size]), aad))
+                    del buffer[:segment_size]
+                    index += 1
+            out.write(aesgcm.encrypt(_nonce(prefix, index, True), bytes(buffer), aad))
+
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, VERSION, segment_size, length, salt, prefix))
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return length
+
+
+class ChunkedArchiveFile:
+    """Reader for the segmented format, decrypts only the segments it is asked for"""
+    encrypted = True
+    legacy = False
+
+    def __init__(self, f, master_key=None):
+        self._file = f
+        header = f.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise InvalidArchiveFile('Truncated header')
+        magic, version, self.segment_size, self.size, salt, self._prefix = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or not self.segment_size:
+            raise InvalidArchiveFile('Unsupported archive format')
+        self._aad = _aad(header)
+        self._aesgcm = AESGCM(_derive_key(salt, master_key))
+
+        # The stored length must agree with the number and size of the segments on disk
+        self.segment_count = max(-(-self.size // self.segment_size), 1)
+        expected = HEADER_SIZE + self.size + self.segment_count * TAG_SIZE
+        if os.fstat(f.fileno()).st_size != expected:
+            raise InvalidArchiveFile('File size does not match its header')
+
+    def read_segment(self, index):
+        start = index * self.segment_size
+        plain_size = min(self.segment_size, self.size - start)
+        self._file.seek(HEADER_SIZE + index * (self.segment_size + TAG_SIZE))
+        sealed = self._file.read(plain_size + TAG_SIZE)
+        last = index == self.segment_count - 1
+        try:
+            return self._aesgcm.decrypt(_nonce(self._prefix, index, last), sealed, self._aad)
+        except InvalidTag:
+            raise InvalidArchiveFile(f'Segment {index} failed authentication')
+
+    def iter_chunks(self, start=0, stop=None):
+        """Plaintext bytes [start, stop) one segment at a time"""
+        stop = self.size if stop is None else min(stop, self.size)
+        if start >= stop:
+            return
+        for index in range(start // self.segment_size, (stop - 1) // self.segment_size + 1):
+            segment = self.read_segment(index)
+            offset = index * self.segment_size
+            yield segment[max(start - offset, 0):stop - offset]
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LegacyArchiveFile:
+    """A whole-file Fernet token or an unencrypted file, decrypted in memory"""
+    legacy = True
+
+    def __init__(self, data, encrypted):
+        self._data = data
+        self.encrypted = encrypted
+        self.size = len(data)
+
+    def iter_chunks(self, start=0, stop=None, chunk_size=SEGMENT_SIZE):
+        stop = self.size if stop is None else min(stop, self.size)
+        for offset in range(start, stop, chunk_size):
+            yield self._data[offset:min(offset + chunk_size, stop)]
+
+    def close(self):
+        self._data = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_archive_file(path, master_key=None):
+    """Open an archive file in whichever format it was written"""
+    f = open(path, 'rb')
+    try:
+        if f.read(len(MAGIC)) == MAGIC:
+            f.seek(0)
+            return ChunkedArchiveFile(f, master_key)
+        f.seek(0)
+        data = f.read()
+    except BaseException:
+        f.close()
+        raise
+    f.close()
+
+    try:
+        return LegacyArchiveFile(Fernet(master_key or settings.ENCRYPTION_KEY).decrypt(data), True)
+    except InvalidToken:
+        # Uploaded before archive encryption was added
+        return LegacyArchiveFile(data, False)
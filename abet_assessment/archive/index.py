@@ -0,0 +1,340 @@
+"""
+Database index of the archive tree (ArchiveNode).
+
+The structure, year and file listing endpoints read the index instead of
+walking ARCHIVE_BASE_PATH, so faculty filtering is a WHERE clause on
+professor_id rather than a walk of the whole year followed by pruning. The
+views keep the index current on upload, delete and auto-generate; files
+that land on disk any other way are picked up by reconcile(), run through
+the reconcile_archive management command, which also keeps
+SyllabusUploadStatus.has_files in step with the Syllabus folders.
+
+Deploying: migrate does not fill the index, run `manage.py reconcile_archive`
+after `manage.py migrate` so the listings show what is already on disk.
+"""
+import hashlib
+import os
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from programs.models import Faculty
+
+from .models import ArchiveNode, SyllabusUploadStatus
+
+CHECKSUM_BLOCK = 1024 * 1024
+BATCH_SIZE = 1000
+
+
+def split_path(path):
+    """'First Semester/Dr. X - 3/Syllabus/' -> ['First Semester', 'Dr. X - 3', 'Syllabus']"""
+    return [part for part in (path or '').replace('\\', '/').split('/') if part and part != '.']
+
+
+def join_path(parts):
+    return '/'.join(parts)
+
+
+def professor_id_from_folder(folder):
+    # Professor folders are named "Name - ID"
+    parts = folder.split(' - ')
+    return parts[-1].strip() if len(parts) > 1 else ''
+
+
+def path_columns(parts):
+    return {
+        'semester': parts[0] if len(parts) > 0 else '',
+        'professor_id': professor_id_from_folder(parts[1]) if len(parts) > 1 else '',
+        'course': parts[2] if len(parts) > 2 else '',
+        'folder_type': parts[3] if len(parts) > 3 else '',
+    }
+
+
+def disk_path(year, parts, filename=''):
+    return os.path.join(settings.ARCHIVE_BASE_PATH, year, *parts, *([filename] if filename else []))
+
+
+def file_checksum(full_path):
+    digest = hashlib.sha256()
+    with open(full_path, 'rb') as f:
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _node(year, kind, parts, filename='', stat=None, checksum=''):
+    return ArchiveNode(
+        academic_year=year, kind=kind, path=join_path(parts), filename=filename,
+        size=stat.st_size if stat is not None and kind == 'file' else 0,
+        mtime=stat.st_mtime_ns if stat is not None else 0,
+        checksum=checksum, **path_columns(parts))
+
+
+def faculty_folder_ids(user):
+    """
+    None when the user sees the whole archive, otherwise the professor ids their
+    folders may carry (faculty id or username, like the folders created so far)
+    """
+    if user.is_staff or user.is_superuser:
+        return None
+    faculty = getattr(user, 'faculty_profile', None)
+    if faculty is None:
+        return []
+    return [str(faculty.id), user.username]
+
+
+# ---- Reads -------------------------------------------------------------------
+
+def indexed_years():
+    return list(ArchiveNode.objects.order_by('academic_year').values_list(
+        'academic_year', flat=True).distinct())
+
+
+def folder_structure(year, professor_ids=None):
+    """Nested {folder: {subfolder: ...}} for a year, as the directory walk used to return"""
+    folders = ArchiveNode.objects.filter(academic_year=year, kind='dir').exclude(path='')
+    if professor_ids is not None:
+        folders = folders.filter(professor_id__in=professor_ids)
+    tree = {}
+    for path in folders.order_by('path').values_list('path', flat=True).iterator():
+        node = tree
+        for part in path.split('/'):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def folder_files(year, path, professor_ids=None):
+    """Filenames in one folder, None when the folder is not in the index"""
+    parts = split_path(path)
+    nodes = ArchiveNode.objects.filter(academic_year=year, path=join_path(parts), **path_columns(parts))
+    if professor_ids is not None:
+        nodes = nodes.filter(professor_id__in=professor_ids)
+    rows = list(nodes.order_by('kind', 'filename').values_list('kind', 'filename'))
+    if not rows:
+        return None
+    return [filename for kind, filename in rows if kind == 'file']
+
+
+# ---- Writes ------------------------------------------------------------------
+
+def index_folders(year, path):
+    """Make sure the year folder and every folder down to path are indexed"""
+    parts = split_path(path)
+    prefixes = [parts[:depth] for depth in range(len(parts) + 1)]
+    existing = set(ArchiveNode.objects.filter(
+        academic_year=year, kind='dir', path__in=[join_path(p) for p in prefixes]).values_list('path', flat=True))
+    missing = []
+    for prefix in prefixes:
+        if join_path(prefix) not in existing:
+            full_path = disk_path(year, prefix)
+            stat = os.stat(full_path) if os.path.isdir(full_path) else None
+            missing.append(_node(year, 'dir', prefix, stat=stat))
+    # Another upload may index the same folders in between, the unique entry constraint keeps one
+    ArchiveNode.objects.bulk_create(missing, ignore_conflicts=True)
+
+
+def index_file(year, path, filename):
+    """Index, or refresh, a file that was just written"""
+    parts = split_path(path)
+    full_path = disk_path(year, parts, filename)
+    stat = os.stat(full_path)
+    checksum = file_checksum(full_path)
+    with transaction.atomic():
+        index_folders(year, path)
+        ArchiveNode.objects.update_or_create(
+            academic_year=year, kind='file', path=join_path(parts), filename=filename,
+            defaults={'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'checksum': checksum,
+                      **path_columns(parts)})
+
+
+def unindex_file(year, path, filename):
+    ArchiveNode.objects.filter(
+        academic_year=year, kind='file', path=join_path(split_path(path)), filename=filename).delete()
+
+
+def unindex_year(year):
+    ArchiveNode.objects.filter(academic_year=year).delete()
+
+
+# ---- Reconcile ---------------------------------------------------------------
+#
+# Folders are scanned on a thread pool, one task per folder. A folder whose
+# mtime matches the index had no entries added, removed or renamed since it was
+# indexed, so its files are not listed or stat'ed again and only its indexed
+# subfolders are visited. Files rewritten in place do not touch the folder
+# mtime, full=True rescans everything. Only the differences are written.
+
+class _FolderScan:
+    def __init__(self, parts, stat=None, skipped=False):
+        self.parts = parts
+        self.stat = stat
+        self.skipped = skipped
+        self.subfolders = []
+        self.files = {}  # filename -> (stat, checksum or None when unchanged)
+
+
+def _scan_folder(year, parts, dir_node, indexed_files, indexed_subfolders, full):
+    """Filesystem work for one folder, runs in a worker thread and does not touch the database"""
+    full_path = disk_path(year, parts)
+    try:
+        stat = os.stat(full_path)
+    except FileNotFoundError:
+        return None
+    if not full and dir_node is not None and dir_node.mtime == stat.st_mtime_ns:
+        scan = _FolderScan(parts, stat, skipped=True)
+        scan.subfolders = indexed_subfolders
+        return scan
+
+    scan = _FolderScan(parts, stat)
+    with os.scandir(full_path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                scan.subfolders.append(entry.name)
+            # .part files are uploads still being encrypted
+            elif entry.is_file() and not entry.name.endswith('.part'):
+                file_stat = entry.stat()
+                node = indexed_files.get(entry.name)
+                changed = node is None or node.mtime != file_stat.st_mtime_ns or node.size != file_stat.st_size
+                scan.files[entry.name] = (file_stat, file_checksum(entry.path) if changed else None)
+    return scan
+
+
+def _disk_years():
+    try:
+        with os.scandir(settings.ARCHIVE_BASE_PATH) as entries:
+            return [entry.name for entry in entries if entry.is_dir()]
+    except FileNotFoundError:
+        return []
+
+
+def reconcile_year(year, pool, full=False):
+    """Bring the index of one year in line with the disk, returns (created, updated, deleted, skipped)"""
+    dirs, files, stale = {}, defaultdict(dict), []
+    for node in ArchiveNode.objects.filter(academic_year=year):
+        if node.kind == 'dir':
+            dirs[node.path] = node
+        else:
+            files[node.path][node.filename] = node
+    children = defaultdict(list)
+    for path in dirs:
+        if path:
+            parent, _, name = path.rpartition('/')
+            children[parent].append(name)
+
+    def submit(parts):
+        path = join_path(parts)
+        return pool.submit(_scan_folder, year, parts, dirs.get(path), files.get(path, {}),
+                           children.get(path, []), full)
+
+    now = timezone.now()
+    create, update = [], []
+    seen_dirs = set()
+    skipped = 0
+    pending = {submit([])}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            scan = future.result()
+            if scan is None:
+                # Gone since its parent was listed, dropped with everything else not seen
+                continue
+            path = join_path(scan.parts)
+            seen_dirs.add(path)
+            for name in scan.subfolders:
+                pending.add(submit(scan.parts + [name]))
+            if scan.skipped:
+                skipped += 1
+                continue
+
+            node = dirs.get(path)
+            if node is None:
+                create.append(_node(year, 'dir', scan.parts, stat=scan.stat))
+            elif node.mtime != scan.stat.st_mtime_ns:
+                node.mtime = scan.stat.st_mtime_ns
+                node.indexed_at = now
+                update.append(node)
+
+            indexed_files = files.pop(path, {})
+            for filename, (stat, checksum) in scan.files.items():
+                node = indexed_files.pop(filename, None)
+                if node is None:
+                    create.append(_node(year, 'file', scan.parts, filename, stat, checksum))
+                elif checksum is not None:
+                    node.size, node.mtime, node.checksum = stat.st_size, stat.st_mtime_ns, checksum
+                    node.indexed_at = now
+                    update.append(node)
+            stale += [node.pk for node in indexed_files.values()]
+
+    # Folders that were not reached no longer exist, nor does anything indexed below them
+    stale += [node.pk for path, node in dirs.items() if path not in seen_dirs]
+    stale += [node.pk for path, by_name in files.items() if path not in seen_dirs for node in by_name.values()]
+
+    if stale or create or update:
+        with transaction.atomic():
+            ArchiveNode.objects.filter(pk__in=stale).delete()
+            # Uploads index their files too, whichever writes first wins
+            ArchiveNode.objects.bulk_create(create, batch_size=BATCH_SIZE, ignore_conflicts=True)
+            ArchiveNode.objects.bulk_update(update, ['size', 'mtime', 'checksum', 'indexed_at'],
+                                            batch_size=BATCH_SIZE)
+    return len(create), len(update), len(stale), skipped
+
+
+def sync_syllabus_status(years):
+    """
+    Set SyllabusUploadStatus.has_files for every professor/course folder of the given
+    years from the index, creating the missing rows. Returns the number of rows written.
+    """
+    semesters = {label: value for value, label in SyllabusUploadStatus.SEMESTER_CHOICES}
+    course_folders = set(ArchiveNode.objects.filter(
+        academic_year__in=years, kind='dir', folder_type='').exclude(course='').values_list(
+        'academic_year', 'semester', 'professor_id', 'course'))
+    with_syllabus = set(ArchiveNode.objects.filter(
+        academic_year__in=years, kind='file', folder_type__iexact='Syllabus').values_list(
+        'academic_year', 'semester', 'professor_id', 'course').distinct())
+
+    # Folder ids are faculty ids, or usernames for some older folders
+    folder_ids = {professor_id for _, _, professor_id, _ in course_folders}
+    faculty = {str(pk): pk for pk in Faculty.objects.filter(
+        id__in=[i for i in folder_ids if i.isdigit()]).values_list('id', flat=True)}
+    faculty.update(Faculty.objects.filter(user__username__in=folder_ids).values_list('user__username', 'id'))
+
+    flags = {}
+    for folder in course_folders:
+        year, semester, professor_id, course = folder
+        if semester in semesters and professor_id in faculty:
+            key = (year, semesters[semester], faculty[professor_id], course)
+            flags[key] = flags.get(key, False) or folder in with_syllabus
+
+    now = timezone.now()
+    update = []
+    for status in SyllabusUploadStatus.objects.filter(academic_year__in=years):
+        has_files = flags.pop((status.academic_year, status.semester, status.professor_id, status.course_name), False)
+        if status.has_files != has_files:
+            status.has_files = has_files
+            status.updated_at = now
+            update.append(status)
+    create = [SyllabusUploadStatus(academic_year=year, semester=semester, professor_id=professor_id,
+                                   course_name=course, has_files=has_files)
+              for (year, semester, professor_id, course), has_files in flags.items()]
+
+    with transaction.atomic():
+        SyllabusUploadStatus.objects.bulk_update(update, ['has_files', 'updated_at'], batch_size=BATCH_SIZE)
+        SyllabusUploadStatus.objects.bulk_create(create, batch_size=BATCH_SIZE)
+    return len(update) + len(create)
+
+
+def reconcile(years=None, full=False, workers=None):
+    """
+    Reconcile the given years, or every year on disk or in the index, then the syllabus
+    statuses. Returns {'years': {year: (created, updated, deleted, skipped)},
+    'syllabus_statuses': rows written}.
+    """
+    if not years:
+        years = sorted(set(_disk_years()) | set(indexed_years()))
+    workers = workers or getattr(settings, 'ARCHIVE_RECONCILE_WORKERS', 4)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='archive-reconcile') as pool:
+        totals = {year: reconcile_year(year, pool, full) for year in years}
+    return {'years': totals, 'syllabus_statuses': sync_syllabus_status(years)}
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from archive.index import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Bring the archive index (ArchiveNode) in line with the files under ARCHIVE_BASE_PATH'
+
+    def add_arguments(self, parser):
+        parser.add_argument('years', nargs='*', help='Academic years to reconcile, e.g. 2024-2025 (default: all)')
+        parser.add_argument('--full', action='store_true',
+                            help='Rescan every folder, also those whose mtime did not change')
+        parser.add_argument('--workers', type=int, help='Scanner threads (default: ARCHIVE_RECONCILE_WORKERS)')
+
+    def handle(self, *args, **options):
+        result = reconcile(options['years'], full=options['full'], workers=options['workers'])
+        totals = result['years']
+        for year, (created, updated, deleted, skipped) in totals.items():
+            self.stdout.write(f'{year}: {created} added, {updated} updated, {deleted} removed, '
+                              f'{skipped} unchanged folders skipped')
+        created, updated, deleted = (sum(counts[i] for counts in totals.values()) for i in range(3))
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {len(totals)} year(s): {created} added, {updated} updated, {deleted} removed, '
+            f'{result["syllabus_statuses"]} syllabus upload statuses updated'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archive', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(help_text='e.g., 2024-2025', max_length=20)),
+                ('kind', models.CharField(choices=[('dir', 'Folder'), ('file', 'File')], max_length=4)),
+                ('path', models.CharField(blank=True, help_text="Folder path inside the year, '' for the year itself", max_length=500)),
+                ('filename', models.CharField(blank=True, help_text='Empty for folders', max_length=255)),
+                ('semester', models.CharField(blank=True, max_length=50)),
+                ('professor_id', models.CharField(blank=True, help_text="ID part of the 'Name - ID' folder", max_length=150)),
+                ('course', models.CharField(blank=True, max_length=255)),
+                ('folder_type', models.CharField(blank=True, max_length=50)),
+                ('size', models.BigIntegerField(default=0, help_text='Bytes on disk')),
+                ('mtime', models.BigIntegerField(default=0, help_text='st_mtime_ns of the file or folder')),
+                ('checksum', models.CharField(blank=True, help_text='SHA-256 of the stored (encrypted) bytes', max_length=64)),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['academic_year', 'path', 'filename'],
+                'indexes': [models.Index(fields=['academic_year', 'kind'], name='archive_node_year_kind_idx'), models.Index(fields=['academic_year', 'semester', 'professor_id', 'course', 'folder_type'], name='archive_node_folder_idx'), models.Index(fields=['professor_id', 'academic_year'], name='archive_node_professor_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:01
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.db.models.functions import Length
+
+
+def delete_duplicate_entries(apps, schema_editor):
+    """Keep the oldest row of every entry indexed twice, and drop paths too long for the new column"""
+    ArchiveNode = apps.get_model('archive', 'ArchiveNode')
+    duplicates = ArchiveNode.objects.values('academic_year', 'kind', 'path', 'filename').annotate(
+        keep=Min('id'), rows=Count('id')).filter(rows__gt=1).order_by()
+    for entry in duplicates:
+        keep = entry.pop('keep')
+        entry.pop('rows')
+        ArchiveNode.objects.filter(**entry).exclude(id=keep).delete()
+    ArchiveNode.objects.annotate(path_length=Length('path')).filter(path_length__gt=480).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archive', '0002_archive_node'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_entries, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='archivenode',
+            name='path',
+            field=models.CharField(blank=True, help_text="Folder path inside the year, '' for the year itself", max_length=480),
+        ),
+        migrations.AddConstraint(
+            model_name='archivenode',
+            constraint=models.UniqueConstraint(fields=('academic_year', 'kind', 'path', 'filename'), name='archive_node_unique_entry'),
+        ),
+    ]
@@ -37,3 +37,48 @@ class SyllabusUploadStatus(models.Model):
     
     def __str__(self):
         return f"{self.professor.name} - {self.course_name} ({self.academic_year} {self.semester})"
+
+
+class ArchiveNode(models.Model):
+    """
+    Index of the folders and files under ARCHIVE_BASE_PATH, one row per entry.
+    Paths are relative to the year folder and '/' separated; the semester,
+    professor, course and folder type columns are parsed from the first four
+    path components ("First Semester/Dr. Name - 12/Course/Syllabus").
+    """
+    KIND_CHOICES = [
+        ('dir', 'Folder'),
+        ('file', 'File'),
+    ]
+
+    academic_year = models.CharField(max_length=20, help_text="e.g., 2024-2025")
+    kind = models.CharField(max_length=4, choices=KIND_CHOICES)
+    # 480 keeps the unique key of the four columns under MySQL's 3072 bytes in utf8mb4
+    path = models.CharField(max_length=480, blank=True, help_text="Folder path inside the year, '' for the year itself")
+    filename = models.CharField(max_length=255, blank=True, help_text="Empty for folders")
+
+    semester = models.CharField(max_length=50, blank=True)
+    professor_id = models.CharField(max_length=150, blank=True, help_text="ID part of the 'Name - ID' folder")
+    course = models.CharField(max_length=255, blank=True)
+    folder_type = models.CharField(max_length=50, blank=True)
+
+    size = models.BigIntegerField(default=0, help_text="Bytes on disk")
+    mtime = models.BigIntegerField(default=0, help_text="st_mtime_ns of the file or folder")
+    checksum = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the stored (encrypted) bytes")
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['academic_year', 'path', 'filename']
+        constraints = [
+            models.UniqueConstraint(fields=['academic_year', 'kind', 'path', 'filename'],
+                                    name='archive_node_unique_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['academic_year', 'kind'], name='archive_node_year_kind_idx'),
+            models.Index(fields=['academic_year', 'semester', 'professor_id', 'course', 'folder_type'],
+                         name='archive_node_folder_idx'),
+            models.Index(fields=['professor_id', 'academic_year'], name='archive_node_professor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.academic_year}/{self.path}/{self.filename}".rstrip('/')
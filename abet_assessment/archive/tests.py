@@ -1,3 +1,294 @@
-from django.test import TestCase
+import io
+import os
+import shutil
 
-# Create your tests here.
+import pytest
+from cryptography.fernet import Fernet
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from rest_framework.test import APIClient
+
+from archive.crypto import (
+    HEADER_SIZE, TAG_SIZE, InvalidArchiveFile, encrypt_chunks, open_archive_file
+)
+from archive import index
+from archive.index import index_file, reconcile
+from archive.models import ArchiveNode, SyllabusUploadStatus
+from programs.models import Faculty
+
+# Query budget for the professor/course listing, see conftest.py.
+
+
+def test_professor_courses_query_budget(assert_query_budget):
+    assert_query_budget('/api/professor-courses/?year=2024-2025&semester=First', budget=3)
+
+
+SEGMENT = 16
+
+
+def encrypt(tmp_path, data, chunk=7):
+    path = tmp_path / 'file.bin'
+    encrypt_chunks((data[i:i + chunk] for i in range(0, len(data), chunk)), path, segment_size=SEGMENT)
+    return path
+
+
+@pytest.mark.parametrize('size', [0, 1, SEGMENT - 1, SEGMENT, SEGMENT + 1, 3 * SEGMENT + 5])
+def test_chunked_encryption_round_trip(tmp_path, size):
+    data = os.urandom(size)
+    path = encrypt(tmp_path, data)
+
+    segments = max(-(-size // SEGMENT), 1)
+    assert path.stat().st_size == HEADER_SIZE + size + segments * TAG_SIZE
+    assert not (tmp_path / 'file.bin.part').exists()
+    with open_archive_file(path) as archive_file:
+        assert archive_file.size == size
+        assert b''.join(archive_file.iter_chunks()) == data
+        assert b''.join(archive_file.iter_chunks(5, 2 * SEGMENT + 3)) == data[5:2 * SEGMENT + 3]
+
+
+@pytest.mark.parametrize('tamper', ['flip', 'truncate', 'swap', 'append'])
+def test_chunked_encryption_detects_tampering(tmp_path, tamper):
+    path = encrypt(tmp_path, os.urandom(3 * SEGMENT))
+    raw = bytearray(path.read_bytes())
+    sealed = SEGMENT + TAG_SIZE
+    if tamper == 'flip':
+        raw[HEADER_SIZE + sealed + 3] ^= 1
+    elif tamper == 'truncate':
+        # Drop the last segment and shrink the stored length to match
+        del raw[-sealed:]
+        raw[13:21] = (2 * SEGMENT).to_bytes(8, 'big')
+    elif tamper == 'swap':
+        first = raw[HEADER_SIZE:HEADER_SIZE + sealed]
+        raw[HEADER_SIZE:HEADER_SIZE + sealed] = raw[HEADER_SIZE + sealed:HEADER_SIZE + 2 * sealed]
+        raw[HEADER_SIZE + sealed:HEADER_SIZE + 2 * sealed] = first
+    else:
+        raw += b'x'
+    path.write_bytes(bytes(raw))
+
+    with pytest.raises(InvalidArchiveFile):
+        with open_archive_file(path) as archive_file:
+            b''.join(archive_file.iter_chunks())
+
+
+def test_legacy_fernet_and_plain_files_are_readable(tmp_path, settings):
+    fernet_path, plain_path = tmp_path / 'fernet.pdf', tmp_path / 'plain.pdf'
+    fernet_path.write_bytes(Fernet(settings.ENCRYPTION_KEY).encrypt(b'old encrypted'))
+    plain_path.write_bytes(b'never encrypted')
+
+    with open_archive_file(fernet_path) as archive_file:
+        assert archive_file.encrypted and b''.join(archive_file.iter_chunks()) == b'old encrypted'
+    with open_archive_file(plain_path) as archive_file:
+        assert not archive_file.encrypted and b''.join(archive_file.iter_chunks()) == b'never encrypted'
+
+
+def test_upload_is_stored_encrypted_and_downloads_decrypted(api_client, settings, tmp_path):
+    settings.ARCHIVE_BASE_PATH = str(tmp_path)
+    content = os.urandom(200 * 1024)
+    params = 'year=2024-2025&path=First Semester/Prof - 1/Syllabus'
+
+    response = api_client.post(f'/api/upload/?{params}',
+                               {'file': SimpleUploadedFile('syllabus.pdf', content)}, format='multipart')
+    assert response.status_code == 200
+
+    stored = (tmp_path / '2024-2025' / 'First Semester' / 'Prof - 1' / 'Syllabus' / 'syllabus.pdf').read_bytes()
+    assert stored.startswith(b'ABETARC1') and content[:64] not in stored
+
+    response = api_client.get(f'/api/download/?{params}&filename=syllabus.pdf')
+    assert response.status_code == 200 and response.streaming
+    assert int(response['Content-Length']) == len(content)
+    assert b''.join(response.streaming_content) == content
+
+
+def test_download_of_damaged_file_fails_before_streaming(api_client, settings, tmp_path):
+    settings.ARCHIVE_BASE_PATH = str(tmp_path)
+    folder = tmp_path / '2024-2025' / 'Syllabus'
+    folder.mkdir(parents=True)
+    path = encrypt(folder, os.urandom(3 * SEGMENT))
+    raw = bytearray(path.read_bytes())
+    raw[HEADER_SIZE + 1] ^= 1
+    path.write_bytes(bytes(raw))
+
+    response = api_client.get('/api/download/?year=2024-2025&path=Syllabus&filename=file.bin')
+    assert response.status_code == 500
+
+
+@pytest.fixture
+def archived_file(settings, tmp_path):
+    settings.ARCHIVE_BASE_PATH = str(tmp_path)
+    folder = tmp_path / '2024-2025' / 'Slides'
+    folder.mkdir(parents=True)
+    data = os.urandom(5 * SEGMENT + 3)
+    encrypt(folder, data)
+    return '/api/download/?year=2024-2025&path=Slides&filename=file.bin', data
+
+
+@pytest.mark.parametrize('header, start, stop', [
+    ('bytes=0-0', 0, 1),
+    ('bytes=20-50', 20, 51),
+    ('bytes=70-', 70, 83),
+    ('bytes=-10', 73, 83),
+    ('bytes=80-1000', 80, 83),
+])
+def test_download_range(api_client, archived_file, header, start, stop):
+    url, data = archived_file
+    response = api_client.get(url, HTTP_RANGE=header)
+    assert response.status_code == 206
+    assert response['Content-Range'] == f'bytes {start}-{stop - 1}/{len(data)}'
+    assert int(response['Content-Length']) == stop - start
+    assert b''.join(response.streaming_content) == data[start:stop]
+
+
+@pytest.mark.parametrize('header', ['bytes=83-', 'bytes=100-200', 'bytes=-0'])
+def test_download_unsatisfiable_range(api_client, archived_file, header):
+    url, data = archived_file
+    response = api_client.get(url, HTTP_RANGE=header)
+    assert response.status_code == 416
+    assert response['Content-Range'] == f'bytes */{len(data)}'
+
+
+def test_download_if_range(api_client, archived_file):
+    url, data = archived_file
+    full = api_client.get(url)
+    assert full['Accept-Ranges'] == 'bytes'
+    b''.join(full.streaming_content)
+
+    for validator in (full['ETag'], full['Last-Modified']):
+        response = api_client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=validator)
+        assert response.status_code == 206
+        assert b''.join(response.streaming_content) == data[10:20]
+
+    # A stale validator means the file changed, so the whole file is sent
+    response = api_client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == data
+
+
+def test_archive_index_follows_uploads_and_deletes(api_client, settings, tmp_path):
+    settings.ARCHIVE_BASE_PATH = str(tmp_path)
+    params = 'year=2024-2025&path=First Semester/Prof - 1/Course 1/Syllabus'
+    api_client.post(f'/api/upload/?{params}', {'file': SimpleUploadedFile('a.pdf', b'a')}, format='multipart')
+    api_client.post(f'/api/upload/?{params}', {'file': SimpleUploadedFile('b.pdf', b'b')}, format='multipart')
+
+    assert api_client.get('/api/years/').data == {'years': ['2024-2025']}
+    assert api_client.get('/api/structure/2024-2025/').data['structure'] == {
+        'First Semester': {'Prof - 1': {'Course 1': {'Syllabus': {}}}}}
+    assert api_client.get(f'/api/files/?{params}').data == {'files': ['a.pdf', 'b.pdf']}
+
+    assert api_client.delete(f'/api/delete-file/?{params}&filename=a.pdf').status_code == 200
+    assert api_client.get(f'/api/files/?{params}').data == {'files': ['b.pdf']}
+    node = ArchiveNode.objects.get(filename='b.pdf')
+    assert node.professor_id == '1' and node.folder_type == 'Syllabus' and len(node.checksum) == 64
+
+    assert api_client.delete('/api/structure/2024-2025/delete/').status_code == 200
+    assert not ArchiveNode.objects.exists()
+
+
+def test_archive_structure_is_filtered_for_faculty(dataset, settings, tmp_path):
+    settings.ARCHIVE_BASE_PATH = str(tmp_path)
+    dataset.grow(2)
+    mine, other = Faculty.objects.filter(user__username__in=['prof1', 'prof2']).order_by('id')
+    for faculty in (mine, other):
+        (tmp_path / '2024-2025' / 'First Semester' / f'{faculty.name} - {faculty.id}' / 'Course' / 'Exams').mkdir(
+            parents=True)
+    (tmp_path / '2024-2025' / 'Second Semester').mkdir()
+    reconcile()
+
+    client = APIClient()
+    client.force_authenticate(mine.user)
+    assert client.get('/api/structure/2024-2025/').data['structure'] == {
+        'First Semester': {f'{mine.name} - {mine.id}': {'Course': {'Exams': {}}}}}
+    other_folder = f'First Semester/{other.name} - {other.id}/Course/Exams'
+    assert client.get(f'/api/files/?year=2024-2025&path={other_folder}').status_code == 400
+
+
+def test_reconcile_archive_picks_up_external_changes(settings, tmp_path, db):
+    settings.ARCHIVE_BASE_PATH = str(tmp_path)
+    folder = tmp_path / '2024-2025' / 'First Semester' / 'Prof - 1' / 'Course' / 'Slides'
+    folder.mkdir(parents=True)
+    (folder / 'copied.pdf').write_bytes(b'copied by hand')
+    (folder / 'upload.pdf.part').write_bytes(b'half written')
+    out = io.StringIO()
+    call_command('reconcile_archive', stdout=out)
+    assert '2024-2025: 6 added, 0 updated, 0 removed, 0 unchanged folders skipped' in out.getvalue()
+    assert list(ArchiveNode.objects.filter(kind='file').values_list('filename', 'size')) == [('copied.pdf', 14)]
+
+    (folder / 'copied.pdf').write_bytes(b'changed')
+    os.utime(folder / 'copied.pdf', ns=(0, 10 ** 9))
+    (folder / 'new.pdf').write_bytes(b'new')
+    # the file and its folder, the four folders above it did not change
+    assert reconcile(['2024-2025'])['years'] == {'2024-2025': (1, 2, 0, 4)}
+    assert ArchiveNode.objects.get(filename='copied.pdf').size == 7
+
+    (folder / 'new.pdf').unlink()
+    assert reconcile()['years']['2024-2025'][2] == 1
+    assert not ArchiveNode.objects.filter(filename='new.pdf').exists()
+
+
+def test_reconcile_skips_unchanged_folders(settings, tmp_path, db):
+    settings.ARCHIVE_BASE_PATH = str(tmp_path)
+    year = tmp_path / '2024-2025'
+    for course in ('Course 1', 'Course 2'):
+        folder = year / 'First Semester' / 'Prof - 1' / course / 'Exams'
+        folder.mkdir(parents=True)
+        (folder / 'exam.pdf').write_bytes(b'exam')
+    reconcile()
+    assert reconcile()['years'] == {'2024-2025': (0, 0, 0, 7)}
+
+    # Rewritten in place: the folder mtime does not change, only a full scan notices
+    exam = year / 'First Semester' / 'Prof - 1' / 'Course 1' / 'Exams' / 'exam.pdf'
+    exam.write_bytes(b'exam v2')
+    os.utime(exam, ns=(0, 10 ** 9))
+    assert reconcile()['years'] == {'2024-2025': (0, 0, 0, 7)}
+    assert reconcile(full=True)['years'] == {'2024-2025': (0, 1, 0, 0)}
+    assert ArchiveNode.objects.get(path__contains='Course 1', filename='exam.pdf').size == 7
+
+    shutil.rmtree(year / 'First Semester' / 'Prof - 1' / 'Course 2')
+    created, updated, deleted, skipped = reconcile()['years']['2024-2025']
+    assert (created, deleted) == (0, 3)
+    assert not ArchiveNode.objects.filter(course='Course 2').exists()
+
+
+def test_archive_index_keeps_one_row_per_entry(settings, tmp_path, db, monkeypatch):
+    settings.ARCHIVE_BASE_PATH = str(tmp_path)
+    folder = tmp_path / '2024-2025' / 'Slides'
+    folder.mkdir(parents=True)
+    (folder / 'slides.pdf').write_bytes(b'slides')
+
+    # An upload indexes the file after reconcile listed the folder but before it writes
+    wait = index.wait
+
+    def wait_then_upload(pending, **kwargs):
+        done, pending = wait(pending, **kwargs)
+        if any(future.result() and future.result().parts == ['Slides'] for future in done):
+            index_file('2024-2025', 'Slides', 'slides.pdf')
+        return done, pending
+
+    monkeypatch.setattr(index, 'wait', wait_then_upload)
+    reconcile()
+
+    assert ArchiveNode.objects.filter(filename='slides.pdf').count() == 1
+    assert ArchiveNode.objects.filter(kind='dir', path='Slides').count() == 1
+    with pytest.raises(IntegrityError), transaction.atomic():
+        ArchiveNode.objects.create(academic_year='2024-2025', kind='file', path='Slides', filename='slides.pdf')
+
+
+def test_reconcile_updates_syllabus_status(dataset, settings, tmp_path):
+    settings.ARCHIVE_BASE_PATH = str(tmp_path)
+    dataset.grow(1)
+    faculty = Faculty.objects.get(user__username='prof1')
+    professor = tmp_path / '2024-2025' / 'First Semester' / f'{faculty.name} - {faculty.id}'
+    for course in ('Course 1', 'Course 2'):
+        (professor / course / 'Syllabus').mkdir(parents=True)
+    (professor / 'Course 1' / 'Syllabus' / 'syllabus.pdf').write_bytes(b'syllabus')
+    SyllabusUploadStatus.objects.create(
+        academic_year='2024-2025', semester='First', professor=faculty, course_name='Course 2', has_files=True)
+    assert reconcile()['syllabus_statuses'] == 2
+
+    statuses = dict(SyllabusUploadStatus.objects.filter(professor=faculty).values_list('course_name', 'has_files'))
+    assert statuses == {'Course 1': True, 'Course 2': False}
+    assert set(SyllabusUploadStatus.objects.values_list('semester', flat=True)) == {'First'}
+
+    (professor / 'Course 1' / 'Syllabus' / 'syllabus.pdf').unlink()
+    reconcile()
+    assert not SyllabusUploadStatus.objects.get(course_name='Course 1').has_files
@@ -9,6 +9,7 @@ urlpatterns = [
     path("files/", ListFilesView.as_view()),
     path("upload/", FileUploadView.as_view()),
     path("download/", DownloadFileView.as_view()),
+    path("delete-file/", DeleteFileView.as_view()),
     path("professor-courses/", ProfessorCoursesView.as_view()),
     path("assign-course/", AssignCourseView.as_view()),
 ]
\ No newline at end of file
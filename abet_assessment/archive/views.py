@@ -4,12 +4,23 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.conf import settings
-from django.http import FileResponse
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+import logging
+import mimetypes
 import shutil
 # import shutil  # duplicate removed
 import os
 from programs.models import SemesterCourseAssignment, Course, Faculty, Program, Department
 from rest_framework import status
+from .index import (
+    faculty_folder_ids, folder_files, folder_structure, index_file, indexed_years, reconcile,
+    unindex_file, unindex_year
+)
+
+logger = logging.getLogger(__name__)
+
+
 class AutoGenerateArchiveView(APIView):
     permission_classes = [IsAdminUser]
 
@@ -43,6 +54,8 @@ class AutoGenerateArchiveView(APIView):
                         final_path = os.path.join(course_folder, sub)
                         os.makedirs(final_path, exist_ok=True)
 
+        # The year was rebuilt from scratch, index exactly what is on disk now
+        reconcile([academic_year])
         return Response({"status": "ok", "created": year_folder})
 
 
@@ -51,62 +64,8 @@ class ArchiveStructureView(APIView):
 
     def get(self, request, year):
         # year expected as "2025-2026"
-        base = os.path.join(settings.ARCHIVE_BASE_PATH, year)
-        structure = {}
-
-        def dir_tree(root):
-            tree = {}
-            try:
-                entries = os.listdir(root)
-            except FileNotFoundError:
-                return tree
-            for entry in entries:
-                path = os.path.join(root, entry)
-                if os.path.isdir(path):
-                    tree[entry] = dir_tree(path)
-            return tree
-
-        structure = dir_tree(base)
-
-        # Filter structure based on user permissions
-        user = request.user
-        if not user.is_staff and not user.is_superuser:
-            # Assuming faculty have a related 'faculty_profile'
-            try:
-                faculty = user.faculty_profile
-                faculty_id = str(faculty.id)
-                username = user.username
-                
-                filtered_structure = {}
-                
-                # Iterate through semesters
-                for semester, professors in structure.items():
-                    if isinstance(professors, dict):
-                        filtered_professors = {}
-                        for prof_folder, contents in professors.items():
-                            # Check if folder matches faculty ID or Username
-                            # Folder format: "Name - ID"
-                            parts = prof_folder.split(" - ")
-                            folder_id = parts[-1].strip() if len(parts) > 1 else ""
-                            
-                            print(f"DEBUG: Checking folder '{prof_folder}' -> ID '{folder_id}' against Faculty ID '{faculty_id}' and Username '{username}'")
-                            
-                            if folder_id == faculty_id or folder_id == username:
-                                filtered_professors[prof_folder] = contents
-                                print("DEBUG: Match found!")
-                        
-                        if filtered_professors:
-                            filtered_structure[semester] = filtered_professors
-                
-                structure = filtered_structure
-            except Exception as e:
-                print(f"DEBUG: Error in filtering: {e}")
-                import traceback
-                traceback.print_exc()
-                # If user is not faculty or other error, return empty or handle appropriately
-                # For now, if not faculty profile found, return empty
-                structure = {}
-
+        # Faculty only see their own "Name - ID" folders, matched on the ID in SQL
+        structure = folder_structure(year, faculty_folder_ids(request.user))
         return Response({"year": year, "structure": structure})
 
 
@@ -117,6 +76,7 @@ class DeleteAcademicYearView(APIView):
         year_folder = os.path.join(settings.ARCHIVE_BASE_PATH, year)
         if os.path.exists(year_folder):
             shutil.rmtree(year_folder)
+            unindex_year(year)
             return Response({"deleted": True, "year": year})
         return Response({"deleted": False, "error": "Not found"}, status=404)
 
@@ -125,14 +85,7 @@ class ListAcademicYearsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        base = settings.ARCHIVE_BASE_PATH
-        try:
-            years = [d for d in os.listdir(
-                base) if os.path.isdir(os.path.join(base, d))]
-        except FileNotFoundError:
-            years = []
-        # Optionally add sorting logic: years.sort(reverse=True)
-        return Response({"years": years})
+        return Response({"years": indexed_years()})
 
 
 class ListFilesView(APIView):
@@ -143,20 +96,13 @@ class ListFilesView(APIView):
         year = request.query_params.get("year")
         # E.g., "First Semester/Dr. Placeholder1 - ID1/Syllabus"
         path = request.query_params.get("path", "")
-        root = os.path.join(settings.ARCHIVE_BASE_PATH, year, path)
-        files = []
-        try:
-            for entry in os.listdir(root):
-                full = os.path.join(root, entry)
-                if os.path.isfile(full):
-                    files.append(entry)
-        except Exception as e:
-            return Response({"error": str(e)}, status=400)
+        files = folder_files(year, path, faculty_folder_ids(request.user))
+        if files is None:
+            return Response({"error": f"Folder not found: {path}"}, status=400)
         return Response({"files": files})
 
 
-from cryptography.fernet import Fernet
-import io
+from .crypto import InvalidArchiveFile, encrypt_chunks, open_archive_file
 
 class FileUploadView(APIView):
     parser_classes = [MultiPartParser, FormParser]
@@ -174,28 +120,81 @@ class FileUploadView(APIView):
         file_path = os.path.join(upload_dir, file_obj.name)
         
         try:
-            # Initialize Fernet with the key from settings
-            fernet = Fernet(settings.ENCRYPTION_KEY)
-            
-            # Read original file data
-            file_data = file_obj.read()
-            
-            # Encrypt data
-            encrypted_data = fernet.encrypt(file_data)
-            
-            # Write encrypted data to file
-            with open(file_path, "wb+") as dest:
-                dest.write(encrypted_data)
-                
+            # Encrypted segment by segment straight to disk, memory stays at one segment
+            encrypt_chunks(file_obj.chunks(), file_path)
+            index_file(year, path, file_obj.name)
             return Response({"uploaded": True, "filename": file_obj.name})
         except Exception as e:
-            print(f"Encryption Error: {e}")
+            logger.exception("Encrypting %s failed", file_path)
             return Response({"error": f"Encryption failed: {str(e)}"}, status=500)
 
 
+def _stream_archive_file(archive_file, first_chunk, chunks):
+    """Yield the decrypted chunks, closing the file when the response is done with it"""
+    try:
+        yield first_chunk
+        yield from chunks
+    except InvalidArchiveFile as e:
+        # Headers are already sent, dropping the connection short of Content-Length
+        # is the only way left to tell the client the body is incomplete
+        logger.info("Download aborted: %s", e)
+        raise
+    finally:
+        archive_file.close()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _parse_range(header, size):
+    """
+    (start, stop) for a single "bytes=" range, None when the whole file should be
+    sent instead (no header, a syntax we ignore or several ranges)
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, sep, last = header[len('bytes='):].strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not first:
+            # Suffix range, the last N bytes
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size
+        start = int(first)
+        stop = int(last) + 1 if last else max(size, start + 1)
+    except ValueError:
+        return None
+    if stop <= start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(stop, size)
+
+
+def _file_validators(file_path):
+    stat = os.stat(file_path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return etag, int(stat.st_mtime)
+
+
+def _if_range_matches(header, etag, mtime):
+    """If-Range holds either a strong ETag or the Last-Modified date, anything else fails"""
+    if header is None:
+        return True
+    header = header.strip()
+    if header.startswith('"') or header.startswith('W/'):
+        return header == etag
+    return parse_http_date_safe(header) == mtime
+
+
 class DownloadFileView(APIView):
     permission_classes = [IsAuthenticated]
     # GET /api/download/?year=2025-2026&path=First Semester/Dr. Placeholder1 - ID1/Syllabus&filename=exam1.pdf
+    # Honors a single "Range: bytes=..." (with If-Range) and answers 206 with just those bytes
 
     def get(self, request):
         year = request.query_params.get("year")
@@ -206,34 +205,54 @@ class DownloadFileView(APIView):
         
         if os.path.exists(file_path):
             try:
-                # Initialize Fernet
-                fernet = Fernet(settings.ENCRYPTION_KEY)
-                
-                with open(file_path, "rb") as f:
-                    file_data = f.read()
-                
+                etag, mtime = _file_validators(file_path)
+                archive_file = open_archive_file(file_path)
+            except Exception as e:
+                logger.exception("Opening %s for download failed", file_path)
+                return Response({"error": f"Download failed: {str(e)}"}, status=500)
+
+            size = archive_file.size
+            byte_range = None
+            if _if_range_matches(request.headers.get('If-Range'), etag, mtime):
                 try:
-                    # Attempt to decrypt
-                    decrypted_data = fernet.decrypt(file_data)
-                    print(f"Successfully decrypted file: {filename}, size: {len(decrypted_data)} bytes")
-                except Exception as decrypt_err:
-                    # If decryption fails, assume it's a legacy (unencrypted) file
-                    print(f"Decryption failed (legacy file?): {decrypt_err}")
-                    decrypted_data = file_data
-                
-                # Return decrypted data as HTTP response with proper headers
-                from django.http import HttpResponse
-                response = HttpResponse(decrypted_data, content_type='application/octet-stream')
-                response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                response['Content-Length'] = len(decrypted_data)
-                response['Access-Control-Expose-Headers'] = 'Content-Disposition'
-                return response
-                
+                    byte_range = _parse_range(request.headers.get('Range'), size)
+                except RangeNotSatisfiable:
+                    archive_file.close()
+                    response = Response({"error": "Requested range not satisfiable"},
+                                        status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                    response['Content-Range'] = f'bytes */{size}'
+                    response['Accept-Ranges'] = 'bytes'
+                    return response
+            start, stop = byte_range or (0, size)
+
+            try:
+                if not archive_file.encrypted:
+                    logger.info("Serving unencrypted legacy file: %s", file_path)
+                # Decrypt the first segment before answering, so a damaged file or a
+                # wrong key still gets a proper error instead of a cut off download.
+                # Only the segments covering [start, stop) are ever decrypted.
+                chunks = archive_file.iter_chunks(start, stop)
+                first_chunk = next(chunks, b'')
             except Exception as e:
-                print(f"Download Error: {e}")
-                import traceback
-                traceback.print_exc()
+                archive_file.close()
+                logger.exception("Reading %s for download failed", file_path)
                 return Response({"error": f"Download failed: {str(e)}"}, status=500)
+
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = StreamingHttpResponse(
+                _stream_archive_file(archive_file, first_chunk, chunks),
+                content_type=content_type,
+                status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK)
+            if byte_range:
+                response['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            response['Content-Length'] = stop - start
+            response['Accept-Ranges'] = 'bytes'
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(mtime)
+            response['Access-Control-Expose-Headers'] = (
+                'Content-Disposition, Content-Range, Accept-Ranges, ETag, Last-Modified')
+            return response
                 
         return Response({"error": "File not found"}, status=404)
 
@@ -252,6 +271,7 @@ class DeleteFileView(APIView):
             settings.ARCHIVE_BASE_PATH, year, path, filename)
         if os.path.exists(file_path):
             os.remove(file_path)
+            unindex_file(year, path, filename)
             return Response({"deleted": True})
         return Response({"error": "File not found"}, status=404)
 
@@ -281,12 +301,15 @@ class ProfessorCoursesView(APIView):
             prof_courses[prof_id]["courses"].append(assign.course.name)
         # Fallback: include courses directly linked to faculty if no semester assignment exists
         faculty_qs = Faculty.objects.filter(department_id=department_id) if department_id else Faculty.objects.all()
+        # One query for all linked courses instead of one per professor
+        linked_courses = {}
+        for instructor_id, course_name in Course.objects.filter(
+                instructor__in=faculty_qs).values_list('instructor_id', 'name'):
+            linked_courses.setdefault(instructor_id, []).append(course_name)
         for faculty in faculty_qs:
             fid = str(faculty.id)
-            if fid not in prof_courses:
-                courses = Course.objects.filter(instructor=faculty)
-                if courses.exists():
-                    prof_courses[fid] = {"name": faculty.name, "courses": [c.name for c in courses]}
+            if fid not in prof_courses and faculty.id in linked_courses:
+                prof_courses[fid] = {"name": faculty.name, "courses": linked_courses[faculty.id]}
         return Response(prof_courses)
 
 # New API view to create a new course (if needed) and assign it to a professor for a semester
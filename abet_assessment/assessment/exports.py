@@ -0,0 +1,169 @@
+"""
+Excel export of assessment results for accreditation reviewers.
+
+Every sheet is filled from a queryset read with .iterator(chunk_size=...) into
+an openpyxl write-only workbook, which spills rows to temporary files instead
+of keeping them in memory. An xlsx file is a zip archive that can only be
+finished once the last row is written, so the workbook is saved to a
+temporary file and that file is then streamed to the client.
+"""
+import datetime
+import logging
+import tempfile
+
+from django.db.models import Prefetch
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from .models import (
+    ABETOutcome, AcademicPerformance, Assessment, AssessmentLearningOutcome_ABET,
+    AssessmentQuestion, AssessmentScore, ContinuousImprovement
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+# Academic years run from September to August, "2023-2024" starts on 2023-09-01
+ACADEMIC_YEAR_START_MONTH = 9
+
+
+class ExportFilterError(ValueError):
+    pass
+
+
+def academic_year_range(academic_year):
+    """(first day, first day of the next year) for "2023-2024" """
+    try:
+        start, end = (int(part) for part in academic_year.split('-'))
+    except ValueError:
+        raise ExportFilterError('academic_year must look like 2023-2024')
+    if end != start + 1:
+        raise ExportFilterError('academic_year must span two consecutive years, e.g. 2023-2024')
+    try:
+        return (datetime.date(start, ACADEMIC_YEAR_START_MONTH, 1),
+                datetime.date(end, ACADEMIC_YEAR_START_MONTH, 1))
+    except ValueError:
+        # 0-1 or 9999-10000, outside the years a date can hold
+        raise ExportFilterError(f'academic_year {academic_year} is out of range')
+
+
+def filter_assessments(program_id=None, academic_year=None, course_id=None):
+    assessments = Assessment.objects.all()
+    if program_id:
+        assessments = assessments.filter(course__program_id=program_id)
+    if course_id:
+        assessments = assessments.filter(course_id=course_id)
+    if academic_year:
+        start, end = academic_year_range(academic_year)
+        assessments = assessments.filter(date__gte=start, date__lt=end)
+    return assessments
+
+
+def _header(sheet, titles):
+    cells = []
+    for title in titles:
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    sheet.append(cells)
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def _assessment_rows(assessments):
+    rows = assessments.select_related(
+        'course__program', 'course__instructor', 'score_summary').order_by('id')
+    for assessment in rows.iterator(chunk_size=CHUNK_SIZE):
+        course = assessment.course
+        try:
+            ci, ap, lo = assessment.score_summary.component_scores()
+            total = assessment.score_summary.total_score
+        except AssessmentScore.DoesNotExist:
+            ci = ap = lo = total = None
+        yield (assessment.id, assessment.name, assessment.date, course.code, course.name,
+               course.program.name, course.instructor.name if course.instructor else None,
+               _round(ci), _round(ap), _round(lo), _round(total),
+               'Yes' if total is not None and total >= 90 else 'No')
+
+
+def _component_rows(queryset, fields):
+    yield from queryset.order_by('id').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _question_rows(assessments):
+    questions = AssessmentQuestion.objects.filter(
+        academic_performance__assessment_id__in=assessments.values('id')).select_related(
+        'academic_performance').prefetch_related(
+        Prefetch('mapped_outcomes', queryset=ABETOutcome.objects.order_by('label'))).order_by(
+        'academic_performance__assessment_id', 'academic_performance_id', 'question_no')
+    # Prefetching with iterator() needs a chunk size, it runs one prefetch per chunk
+    for question in questions.iterator(chunk_size=CHUNK_SIZE):
+        performance = question.academic_performance
+        yield (performance.assessment_id_id, performance.id, performance.assessmentType,
+               question.question_no, question.question_text, question.weight,
+               ', '.join(outcome.label for outcome in question.mapped_outcomes.all()))
+
+
+def build_assessment_workbook(fileobj, program_id=None, academic_year=None, course_id=None):
+    """Write the export workbook to fileobj, returns the number of assessments exported"""
+    assessments = filter_assessments(program_id, academic_year, course_id)
+    assessment_ids = assessments.values('id')
+    workbook = Workbook(write_only=True)
+
+    sheets = [
+        ('Assessments',
+         ('Assessment ID', 'Assessment', 'Date', 'Course Code', 'Course', 'Program', 'Instructor',
+          'Continuous Improvement Score', 'Academic Performance Score', 'Learning Outcome Score',
+          'Total Score', 'ABET Accredited'),
+         _assessment_rows(assessments)),
+        ('Academic Performance',
+         ('ID', 'Assessment ID', 'Type', 'High', 'Mean', 'Low', 'Grade', 'Weight', 'Description'),
+         _component_rows(AcademicPerformance.objects.filter(assessment_id__in=assessment_ids),
+                         ('id', 'assessment_id', 'assessmentType', 'high', 'mean', 'low',
+                          'grade', 'weight', 'description'))),
+        ('Continuous Improvement',
+         ('ID', 'Assessment ID', 'Action Taken', 'Implementation Date', 'Effectiveness Measure',
+          'Weight', 'Score'),
+         _component_rows(ContinuousImprovement.objects.filter(assessment_id__in=assessment_ids),
+                         ('id', 'assessment_id', 'action_taken', 'implementation_date',
+                          'effectiveness_measure', 'weight', 'score'))),
+        ('Outcome Scores',
+         ('ID', 'Assessment ID', 'Learning Outcome ID', 'Learning Outcome', 'ABET Outcome',
+          'Score', 'Level', 'Evidence Type'),
+         _component_rows(AssessmentLearningOutcome_ABET.objects.filter(
+             assessment_lo__assessment_id__in=assessment_ids),
+             ('id', 'assessment_lo__assessment_id', 'assessment_lo_id', 'assessment_lo__description',
+              'abet_outcome__label', 'score', 'level_description', 'evidence_type'))),
+        ('Question Mappings',
+         ('Assessment ID', 'Academic Performance ID', 'Academic Performance', 'Question No',
+          'Question', 'Weight', 'Mapped Outcomes'),
+         _question_rows(assessments)),
+    ]
+
+    exported = 0
+    for title, columns, rows in sheets:
+        sheet = workbook.create_sheet(title)
+        _header(sheet, columns)
+        for row in rows:
+            sheet.append(row)
+            if title == 'Assessments':
+                exported += 1
+
+    workbook.save(fileobj)
+    logger.info('Exported %s assessments to Excel', exported)
+    return exported
+
+
+def export_assessments_file(program_id=None, academic_year=None, course_id=None):
+    """Build the workbook in an anonymous temporary file, rewound and ready to stream"""
+    tmp = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        build_assessment_workbook(tmp, program_id, academic_year, course_id)
+    except Exception:
+        tmp.close()
+        raise
+    tmp.seek(0)
+    return tmp
@@ -1,7 +1,7 @@
 # In your app's filters.py (or views.py)
 
 from django_filters import rest_framework as filters
-from .models import AcademicPerformance
+from .models import AcademicPerformance, AssessmentEvent, AuditLog
 
 class AcademicPerformanceFilter(filters.FilterSet):
     """
@@ -13,3 +13,30 @@ class AcademicPerformanceFilter(filters.FilterSet):
         model = AcademicPerformance
         # 3. List the filters that this FilterSet will expose.
         fields = ['course','assessment_id']
+
+
+class ActivityFeedFilter(filters.FilterSet):
+    """
+    Shared filters for the audit log and assessment event feeds.
+    since/until accept an ISO date or datetime, user accepts an id or a username.
+    """
+    since = filters.DateTimeFilter(field_name='timestamp', lookup_expr='gte')
+    until = filters.DateTimeFilter(field_name='timestamp', lookup_expr='lt')
+    user = filters.CharFilter(method='filter_user')
+
+    def filter_user(self, queryset, name, value):
+        if value.isdigit():
+            return queryset.filter(user_id=int(value))
+        return queryset.filter(user__username=value)
+
+
+class AuditLogFilter(ActivityFeedFilter):
+    class Meta:
+        model = AuditLog
+        fields = ['since', 'until', 'user', 'action', 'target_model']
+
+
+class AssessmentEventFilter(ActivityFeedFilter):
+    class Meta:
+        model = AssessmentEvent
+        fields = ['since', 'until', 'user', 'event_type', 'assessment_id']
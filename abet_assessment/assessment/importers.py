@@ -0,0 +1,426 @@
+"""
+Bulk import of academic performance rows, assessment questions and ABET
+outcome scores from .xlsx or .csv files.
+
+Files are read in chunks (pandas for CSV, a read-only openpyxl workbook for
+Excel). Each chunk is validated column by column with pandas and one lookup
+query per referenced table, then written with bulk_create. The whole import
+runs in one transaction, so by default a file with any invalid row writes
+nothing and the report lists every rejected row.
+"""
+import logging
+import os
+
+import openpyxl
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max
+
+from .models import (
+    ABETOutcome, AcademicPerformance, Assessment, AssessmentLearningOutcome,
+    AssessmentLearningOutcome_ABET, AssessmentQuestion
+)
+from .services import AssessmentService
+from .snapshots import invalidate_snapshots
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 2000
+# The report keeps the first errors only, the total is always returned
+MAX_REPORTED_ERRORS = 1000
+# bulk_create skips AssessmentLearningOutcome_ABET.save(), which fills this in
+LEVEL_MAP = {
+    4: "Exceeds Expectations",
+    3: "Meets Expectations",
+    2: "Approaching Expectations",
+    1: "Does Not Meet Expectations",
+}
+# Whole numbers go to BIGINT columns, anything beyond cannot be stored
+MAX_INTEGER = 2 ** 63 - 1
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be imported (format, sheet or header problems)"""
+
+
+def normalize_column(name):
+    return str(name).strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def read_chunks(fileobj, filename, chunk_rows=CHUNK_ROWS, sheet=None):
+    """
+    Yield DataFrames of at most chunk_rows rows with normalized column names.
+    Every frame has a _row column holding the line number in the file (header = 1).
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        yield from _read_csv_chunks(fileobj, chunk_rows)
+    elif extension in ('.xlsx', '.xlsm'):
+        yield from _read_workbook_chunks(fileobj, chunk_rows, sheet)
+    else:
+        raise ImportFileError(f'Unsupported file type "{extension}", use .xlsx or .csv')
+
+
+def _read_csv_chunks(fileobj, chunk_rows):
+    try:
+        reader = pd.read_csv(fileobj, chunksize=chunk_rows, dtype=str, keep_default_na=False,
+                             skip_blank_lines=False, encoding='utf-8-sig')
+        for frame in reader:
+            frame.columns = [normalize_column(column) for column in frame.columns]
+            # The index keeps counting across chunks, blank lines are kept until here so it
+            # matches the line number
+            frame['_row'] = frame.index + 2
+            blank = (frame.drop(columns='_row').apply(lambda column: column.str.strip()) == '').all(axis=1)
+            if not blank.all():
+                yield frame[~blank].reset_index(drop=True)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise ImportFileError(f'Could not read CSV file: {e}')
+
+
+def _read_workbook_chunks(fileobj, chunk_rows, sheet):
+    try:
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f'Could not read Excel file: {e}')
+    try:
+        if sheet:
+            if sheet not in workbook.sheetnames:
+                raise ImportFileError(f'Sheet "{sheet}" not found, available: {", ".join(workbook.sheetnames)}')
+            worksheet = workbook[sheet]
+        else:
+            worksheet = workbook.worksheets[0]
+
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [normalize_column(name) if name is not None else f'column_{index}'
+                   for index, name in enumerate(header)]
+
+        batch, line_numbers = [], []
+        for line_number, values in enumerate(rows, start=2):
+            if all(value is None or str(value).strip() == '' for value in values):
+                continue
+            batch.append((list(values) + [None] * len(columns))[:len(columns)])
+            line_numbers.append(line_number)
+            if len(batch) >= chunk_rows:
+                yield _workbook_frame(batch, columns, line_numbers)
+                batch, line_numbers = [], []
+        if batch:
+            yield _workbook_frame(batch, columns, line_numbers)
+    finally:
+        workbook.close()
+
+
+def _workbook_frame(batch, columns, line_numbers):
+    frame = pd.DataFrame(batch, columns=columns)
+    frame['_row'] = line_numbers
+    return frame
+
+
+class BaseImporter:
+    kind = None
+    required = ()
+    optional = ()
+    # Alternative header names, mapped to the canonical column name
+    aliases = {}
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.errors = []
+        self.error_count = 0
+        self.rows = 0
+        self.created = 0
+        self.assessment_ids = set()
+
+    def run(self, chunks, dry_run=False, partial=False):
+        """
+        Validate and write every chunk in one transaction. Without partial, any
+        invalid row rolls the whole import back; dry_run always rolls back.
+        """
+        with transaction.atomic():
+            for frame in chunks:
+                frame = self.prepare(frame)
+                self.rows += len(frame)
+                self.invalid = pd.Series(False, index=frame.index)
+                objects = self.build(frame)
+                if objects:
+                    self.created += self.write(objects)
+
+            committed = not dry_run and (partial or not self.error_count)
+            if committed:
+                if self.assessment_ids:
+                    # bulk_create bypasses the signals that keep scores and snapshots current
+                    AssessmentService.store_scores_bulk(
+                        Assessment.objects.filter(id__in=self.assessment_ids))
+                invalidate_snapshots()
+            else:
+                transaction.set_rollback(True)
+
+        return {
+            'kind': self.kind,
+            'rows': self.rows,
+            'created': self.created if committed else 0,
+            'valid': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'dry_run': dry_run,
+            'committed': committed,
+        }
+
+    def prepare(self, frame):
+        frame = frame.rename(columns={alias: column for alias, column in self.aliases.items()
+                                      if alias in frame.columns and column not in frame.columns})
+        missing = [column for column in self.required if column not in frame.columns]
+        if missing:
+            raise ImportFileError(f'Missing column(s): {", ".join(missing)}')
+        for column in self.optional:
+            if column not in frame.columns:
+                frame[column] = ''
+        frame = frame[list(self.required) + list(self.optional) + ['_row']].copy()
+        # openpyxl gives None and numbers, CSV gives strings, work on trimmed strings
+        for column in self.required + self.optional:
+            frame[column] = frame[column].map(lambda value: '' if value is None or pd.isna(value)
+                                              else str(value).strip())
+        return frame
+
+    # Vectorized checks, each one flags the failing rows and records an error per row
+
+    def reject(self, frame, mask, column, message):
+        for line_number, value in zip(frame.loc[mask, '_row'], frame.loc[mask, column]):
+            self.error_count += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({'row': int(line_number), 'column': column,
+                                    'value': value, 'message': message})
+        self.invalid |= mask
+
+    def number(self, frame, column, integer=False, minimum=None, maximum=None, required=True):
+        values = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+        blank = frame[column] == ''
+        if required:
+            self.reject(frame, blank, column, 'This value is required')
+        self.reject(frame, ~blank & values.isna(), column, 'Not a number')
+        # inf or 1e30 would overflow int() further down, drop them after rejecting
+        out_of_range = values.abs() >= (MAX_INTEGER if integer else float('inf'))
+        self.reject(frame, out_of_range, column, 'Out of range')
+        values = values.mask(out_of_range)
+        if integer:
+            self.reject(frame, values.notna() & (values % 1 != 0), column, 'Must be a whole number')
+        if minimum is not None:
+            self.reject(frame, values < minimum, column, f'Must be at least {minimum}')
+        if maximum is not None:
+            self.reject(frame, values > maximum, column, f'Must be at most {maximum}')
+        return values
+
+    def text(self, frame, column, max_length=None):
+        self.reject(frame, frame[column] == '', column, 'This value is required')
+        if max_length:
+            self.reject(frame, frame[column].str.len() > max_length, column,
+                        f'At most {max_length} characters')
+        return frame[column]
+
+    def lookup(self, frame, column, ids, queryset, *fields):
+        """
+        One query for every id referenced by a still valid row of the chunk,
+        {id: (fields...)}. Rows pointing at a missing row are rejected.
+        """
+        pk_name = queryset.model._meta.pk.name
+        checked = ids.notna() & ~self.invalid
+        wanted = {int(value) for value in ids[checked].unique()}
+        found = {row[0]: row[1:] for row in queryset.filter(
+            **{f'{pk_name}__in': wanted}).values_list(pk_name, *fields)} if wanted else {}
+        self.reject(frame, checked & ~ids.isin(list(found)), column, 'Does not exist')
+        return found
+
+    def build(self, frame):
+        raise NotImplementedError
+
+    def write(self, objects):
+        objects = objects[0].__class__.objects.bulk_create(objects, batch_size=self.batch_size)
+        return len(objects)
+
+
+class AcademicPerformanceImporter(BaseImporter):
+    kind = 'academic-performance'
+    required = ('assessment_id', 'assessment_type', 'high', 'mean', 'low', 'grade', 'weight')
+    optional = ('description', 'course_id', 'instructor_id')
+    aliases = {'assessment': 'assessment_id', 'assessmenttype': 'assessment_type', 'type': 'assessment_type'}
+
+    def build(self, frame):
+        assessment_ids = self.number(frame, 'assessment_id', integer=True, minimum=1)
+        self.text(frame, 'assessment_type', max_length=50)
+        high = self.number(frame, 'high')
+        mean = self.number(frame, 'mean')
+        low = self.number(frame, 'low')
+        grade = self.number(frame, 'grade', integer=True)
+        weight = self.number(frame, 'weight', integer=True, minimum=0)
+        course_ids = self.number(frame, 'course_id', integer=True, required=False)
+        instructor_ids = self.number(frame, 'instructor_id', integer=True, required=False)
+        self.reject(frame, (low > mean) | (mean > high), 'mean', 'Expected low <= mean <= high')
+
+        assessments = self.lookup(frame, 'assessment_id', assessment_ids, Assessment.objects,
+                                  'course_id', 'course__instructor_id')
+        # Course and instructor default to the assessment's course and its instructor
+        course_ids = course_ids.fillna(assessment_ids.map(lambda pk: assessments.get(pk, (None,))[0]))
+        instructor_ids = instructor_ids.fillna(
+            assessment_ids.map(lambda pk: assessments.get(pk, (None, None))[1]))
+        self.reject(frame, ~self.invalid & instructor_ids.isna(), 'instructor_id',
+                    'Required, the course has no instructor')
+
+        objects = []
+        valid = ~self.invalid
+        for index in frame.index[valid]:
+            assessment_id = int(assessment_ids[index])
+            self.assessment_ids.add(assessment_id)
+            objects.append(AcademicPerformance(
+                assessmentType=frame.at[index, 'assessment_type'],
+                high=float(high[index]), mean=float(mean[index]), low=float(low[index]),
+                grade=int(grade[index]), weight=int(weight[index]),
+                course_id=int(course_ids[index]), instructor_id=int(instructor_ids[index]),
+                description=frame.at[index, 'description'],
+                assessment_id_id=assessment_id))
+        return objects
+
+
+class AssessmentQuestionImporter(BaseImporter):
+    kind = 'assessment-questions'
+    required = ('academic_performance_id', 'question_text', 'weight')
+    optional = ('question_no', 'mapped_outcomes')
+    aliases = {'academic_performance': 'academic_performance_id', 'question': 'question_text',
+               'outcomes': 'mapped_outcomes'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outcomes = outcome_lookup()
+
+    def build(self, frame):
+        performance_ids = self.number(frame, 'academic_performance_id', integer=True, minimum=1)
+        self.text(frame, 'question_text')
+        weight = self.number(frame, 'weight', minimum=0, maximum=100)
+        numbers = self.number(frame, 'question_no', integer=True, minimum=1, required=False)
+
+        performances = self.lookup(frame, 'academic_performance_id', performance_ids,
+                                   AcademicPerformance.objects, 'course_id')
+
+        explicit = numbers.notna() & performance_ids.notna()
+        self.reject(frame, explicit & frame.duplicated(['academic_performance_id', 'question_no'], keep=False),
+                    'question_no', 'Duplicate question number in the file')
+        taken = set(AssessmentQuestion.objects.filter(
+            academic_performance_id__in=list(performances),
+            question_no__in=[int(n) for n in numbers[explicit].unique()],
+        ).values_list('academic_performance_id', 'question_no'))
+        self.reject(frame, explicit & pd.Series(
+            [(pk, no) in taken for pk, no in zip(performance_ids, numbers)], index=frame.index),
+            'question_no', 'Question number already exists')
+
+        outcome_ids = frame['mapped_outcomes'].map(self.parse_outcomes)
+        self.reject(frame, outcome_ids.isna(), 'mapped_outcomes', 'Unknown ABET outcome')
+
+        # Questions without a number continue after the highest existing or listed one
+        next_number = {row['academic_performance']: row['last'] for row in AssessmentQuestion.objects.filter(
+            academic_performance_id__in=list(performances)).values('academic_performance').annotate(
+            last=Max('question_no'))}
+        for pk, no in zip(performance_ids[explicit], numbers[explicit]):
+            next_number[int(pk)] = max(next_number.get(int(pk), 0), int(no))
+
+        objects = []
+        for index in frame.index[~self.invalid]:
+            performance_id = int(performance_ids[index])
+            if pd.isna(numbers[index]):
+                next_number[performance_id] = next_number.get(performance_id, 0) + 1
+                question_no = next_number[performance_id]
+            else:
+                question_no = int(numbers[index])
+            question = AssessmentQuestion(
+                course_id=performances[performance_id][0], academic_performance_id=performance_id,
+                question_no=question_no, question_text=frame.at[index, 'question_text'],
+                weight=float(weight[index]))
+            question._outcome_ids = outcome_ids[index]
+            objects.append(question)
+        return objects
+
+    def parse_outcomes(self, value):
+        """ABET outcome ids for "SO1, SO3" or "1,3", None when one is unknown"""
+        ids = []
+        for token in filter(None, (token.strip().lower() for token in value.replace(';', ',').split(','))):
+            if token not in self.outcomes:
+                return None
+            ids.append(self.outcomes[token])
+        return ids
+
+    def write(self, objects):
+        AssessmentQuestion.objects.bulk_create(objects, batch_size=self.batch_size)
+        # MySQL does not return primary keys from bulk_create, find them by their unique key
+        keys = {(question.academic_performance_id, question.question_no): question for question in objects}
+        for pk, performance_id, question_no in AssessmentQuestion.objects.filter(
+                academic_performance_id__in={key[0] for key in keys},
+                question_no__in={key[1] for key in keys}).values_list('id', 'academic_performance_id', 'question_no'):
+            if (performance_id, question_no) in keys:
+                keys[(performance_id, question_no)].pk = pk
+
+        through = AssessmentQuestion.mapped_outcomes.through
+        through.objects.bulk_create([
+            through(assessmentquestion_id=question.pk, abetoutcome_id=outcome_id)
+            for question in objects for outcome_id in question._outcome_ids
+        ], batch_size=self.batch_size)
+        return len(objects)
+
+
+class ABETScoreImporter(BaseImporter):
+    kind = 'abet-scores'
+    required = ('learning_outcome_id', 'abet_outcome', 'score')
+    optional = ('evidence_type',)
+    aliases = {'learning_outcome': 'learning_outcome_id', 'assessment_lo': 'learning_outcome_id',
+               'assessment_lo_id': 'learning_outcome_id', 'abet_outcome_id': 'abet_outcome',
+               'outcome': 'abet_outcome'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outcomes = outcome_lookup()
+
+    def build(self, frame):
+        outcome_ids = self.number(frame, 'learning_outcome_id', integer=True, minimum=1)
+        scores = self.number(frame, 'score', integer=True, minimum=1, maximum=4)
+        abet_ids = frame['abet_outcome'].str.lower().map(self.outcomes)
+        self.reject(frame, abet_ids.isna(), 'abet_outcome', 'Unknown ABET outcome')
+        evidence = frame['evidence_type'].str.lower().replace('', 'direct')
+        self.reject(frame, ~evidence.isin(['direct', 'indirect']), 'evidence_type',
+                    'Must be direct or indirect')
+
+        learning_outcomes = self.lookup(frame, 'learning_outcome_id', outcome_ids,
+                                        AssessmentLearningOutcome.objects, 'assessment_id')
+
+        objects = []
+        for index in frame.index[~self.invalid]:
+            learning_outcome_id = int(outcome_ids[index])
+            score = int(scores[index])
+            self.assessment_ids.add(learning_outcomes[learning_outcome_id][0])
+            objects.append(AssessmentLearningOutcome_ABET(
+                assessment_lo_id=learning_outcome_id, abet_outcome_id=int(abet_ids[index]),
+                score=score, level_description=LEVEL_MAP[score], evidence_type=evidence[index]))
+        return objects
+
+
+def outcome_lookup():
+    """ABET outcomes by lower-cased label and by id, the table only has a handful of rows"""
+    lookup = {}
+    for pk, label in ABETOutcome.objects.values_list('id', 'label'):
+        lookup[label.strip().lower()] = pk
+        lookup[str(pk)] = pk
+    return lookup
+
+
+IMPORTERS = {importer.kind: importer for importer in (
+    AcademicPerformanceImporter, AssessmentQuestionImporter, ABETScoreImporter)}
+
+
+def import_file(kind, fileobj, filename, dry_run=False, partial=False, sheet=None,
+                chunk_rows=CHUNK_ROWS, batch_size=1000):
+    """Import one file, returns the report. Raises ImportFileError for unusable files."""
+    if kind not in IMPORTERS:
+        raise ImportFileError(f'Unknown import "{kind}", expected one of {", ".join(IMPORTERS)}')
+    importer = IMPORTERS[kind](batch_size=batch_size)
+    report = importer.run(read_chunks(fileobj, filename, chunk_rows, sheet), dry_run, partial)
+    logger.info('Imported %s/%s %s rows from %s, %s error(s)', report['created'], report['rows'],
+                kind, filename, report['error_count'])
+    return report
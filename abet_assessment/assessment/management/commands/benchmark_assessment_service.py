@@ -0,0 +1,171 @@
+import contextlib
+import io
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from assessment.middleware import QueryTimer
+from assessment.models import Assessment
+from assessment.services import AssessmentService
+
+# calculate_assessment_score is timed per call over a sample of assessments,
+# its peak memory is the one of the whole sample
+SCORE_SAMPLE_SIZE = 50
+
+BENCHMARKS = {
+    'calculate_assessment_score': None,
+    'get_average_score': AssessmentService.get_average_score,
+    'get_abet_outcomes_dashboard_data': AssessmentService.get_abet_outcomes_dashboard_data,
+    'get_courses_assessment_summary': AssessmentService.get_courses_assessment_summary,
+    'calculatedynamiccompliancemetrics': AssessmentService.calculatedynamiccompliancemetrics,
+    'get_compliance_dashboard_metrics': AssessmentService.get_compliance_dashboard_metrics,
+}
+
+
+class Command(BaseCommand):
+    help = 'Time AssessmentService methods at increasing data scales and compare against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1,2,4',
+                            help='Comma separated generate_benchmark_data scales')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Timed runs per method, the median is reported')
+        parser.add_argument('--method', action='append', choices=list(BENCHMARKS),
+                            help='Only benchmark these methods (can be repeated)')
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--baseline', help='Earlier results file to compare against')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed relative wall time increase over the baseline')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--current-db', action='store_true',
+                            help='Benchmark the data already in the database instead of '
+                                 'generating it in a throwaway test database')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Reuse the test database between runs')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError('--scales must be a comma separated list of integers')
+        methods = options['method'] or list(BENCHMARKS)
+
+        results = {name: [] for name in methods}
+        if options['current_db']:
+            self.run_scale(None, methods, options['repeat'], results)
+        else:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+            try:
+                for scale in scales:
+                    call_command('flush', interactive=False, verbosity=0)
+                    self.stdout.write(f'Generating scale {scale}...')
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        call_command('generate_benchmark_data', scale=scale, seed=options['seed'])
+                    self.run_scale(scale, methods, options['repeat'], results)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'seed': options['seed'],
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f'Results written to {options["output"]}')
+
+        if options['baseline']:
+            regressions = self.compare(results, options['baseline'], options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} benchmark regression(s) against the baseline')
+
+    def run_scale(self, scale, methods, repeat, results):
+        assessment_ids = list(Assessment.objects.order_by('id').values_list('id', flat=True))
+        sample = assessment_ids[::max(len(assessment_ids) // SCORE_SAMPLE_SIZE, 1)][:SCORE_SAMPLE_SIZE]
+
+        self.stdout.write(f"\n{'method':<36} {'scale':>5} {'time ms':>10} {'queries':>8} {'peak KB':>10}")
+        for name in methods:
+            if name == 'calculate_assessment_score':
+                def fn():
+                    for assessment_id in sample:
+                        AssessmentService.calculate_assessment_score(assessment_id)
+                per_call = max(len(sample), 1)
+            else:
+                fn = BENCHMARKS[name]
+                per_call = 1
+
+            row = self.measure(fn, repeat, per_call)
+            row.update({'scale': scale, 'assessments': len(assessment_ids)})
+            results[name].append(row)
+            self.stdout.write(f"{name:<36} {scale if scale is not None else '-':>5} "
+                              f"{row['wall_time_ms']:>10} {row['queries']:>8} "
+                              f"{row['peak_memory_kb']:>10}")
+
+    def measure(self, fn, repeat, per_call):
+        """
+        Median wall time over repeat runs and the queries of one run, both divided
+        by per_call, and the peak memory of a separate run as measured
+        """
+        # The services print progress, keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Counted with a wrapper, connection.queries stops at 9000 entries
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                fn()
+
+            tracemalloc.start()
+            try:
+                fn()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - started)
+
+        return {
+            'wall_time_ms': round(statistics.median(timings) * 1000 / per_call, 3),
+            'queries': round(timer.count / per_call, 2),
+            # A peak does not add up per call, it is the peak of the whole run
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def compare(self, results, baseline_path, threshold):
+        try:
+            with open(baseline_path) as f:
+                baseline = json.load(f)['results']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not read baseline {baseline_path}: {e}')
+
+        regressions = []
+        self.stdout.write(f"\nCompared to {baseline_path} (threshold {threshold:.0%}):")
+        for name, rows in results.items():
+            previous = {row['scale']: row for row in baseline.get(name, [])}
+            for row in rows:
+                before = previous.get(row['scale'])
+                if before is None:
+                    continue
+                ratio = row['wall_time_ms'] / before['wall_time_ms'] if before['wall_time_ms'] else 1
+                slower = ratio > 1 + threshold
+                more_queries = row['queries'] > before['queries']
+                marker = 'REGRESSION' if slower or more_queries else 'ok'
+                if marker != 'ok':
+                    regressions.append((name, row['scale']))
+                line = (f"  {name:<36} scale {row['scale']}: {before['wall_time_ms']} -> "
+                        f"{row['wall_time_ms']} ms ({ratio:.2f}x), queries {before['queries']} -> "
+                        f"{row['queries']}  {marker}")
+                self.stdout.write(self.style.ERROR(line) if marker != 'ok' else line)
+        return regressions
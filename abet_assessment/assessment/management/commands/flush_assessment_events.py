@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from assessment.utilsLog.event_logger import flush_event_outbox
+
+
+class Command(BaseCommand):
+    help = 'Write queued assessment events from the outbox in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running as a worker instead of flushing once')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds between flushes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_event_outbox(batch_size=options['batch_size'])
+            if flushed or not options['loop']:
+                self.stdout.write(f'Flushed {flushed} assessment events')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,272 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from assessment.models import (
+    ABETOutcome, AcademicPerformance, Assessment, AssessmentLearningOutcome,
+    AssessmentLearningOutcome_ABET, AssessmentMethod, ContinuousImprovement,
+    CourseAssessmentMethod, CourseSyllabus, FacultyTraining
+)
+from assessment.services import AssessmentService
+from assessment.snapshots import invalidate_snapshots
+from programs.models import (
+    Course, CourseStudent, Department, Faculty, Program, SemesterCourseAssignment, Student
+)
+
+# Rows created per unit of --scale, scale 10 gives production-sized data
+# (2k courses, 20k assessments, ~150k outcome scores, 200k enrollments)
+PER_SCALE = {
+    'departments': 2,
+    'programs_per_department': 2,
+    'faculty': 20,
+    'courses': 200,
+    'students': 1000,
+}
+ENROLLMENTS_PER_COURSE = 100
+ASSESSMENTS_PER_COURSE = 10
+ACADEMIC_YEARS = ['2021-2022', '2022-2023', '2023-2024', '2024-2025']
+SEMESTERS = ['First', 'Second', 'Summer']
+TRAINING_TYPES = [
+    'ABET Assessment Training',
+    'Curriculum Development Workshop',
+    'Student Outcome Evaluation',
+    'Continuous Improvement Methods',
+]
+OUTCOME_SCORE_WEIGHTS = [1, 2, 4, 3]  # levels 1-4, mostly "meets expectations"
+LEVEL_MAP = {
+    4: "Exceeds Expectations",
+    3: "Meets Expectations",
+    2: "Approaching Expectations",
+    1: "Does Not Meet Expectations",
+}
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic, production-sized dataset for performance work'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1,
+                            help='Size multiplier, each unit adds 200 courses and 2000 assessments')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Random seed, the same seed and scale always give the same data')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--chunk-courses', type=int, default=100,
+                            help='Courses whose dependent rows are built and written together')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        seed = options['seed']
+        if scale < 1:
+            raise CommandError('--scale must be at least 1')
+
+        self.rnd = random.Random(seed)
+        self.batch_size = options['batch_size']
+        self.seed = seed
+        self.prefix = f'Benchmark {seed}'
+        self.counts = {}
+
+        if Department.objects.filter(name__startswith=f'{self.prefix} ').exists():
+            raise CommandError(f'Benchmark data for seed {seed} already exists, '
+                               f'use another --seed or a fresh database')
+
+        started = time.perf_counter()
+        # bulk_create does not return primary keys on MySQL, so they are assigned up front
+        self.next_pk = {}
+
+        outcomes = self.ensure_outcomes()
+        methods = self.ensure_assessment_methods()
+
+        with transaction.atomic():
+            programs, faculty = self.create_organisation(scale)
+            students = self.create_students(scale)
+
+        course_count = PER_SCALE['courses'] * scale
+        chunk = options['chunk_courses']
+        for start in range(0, course_count, chunk):
+            with transaction.atomic():
+                self.create_course_chunk(
+                    start, min(chunk, course_count - start), programs, faculty,
+                    students, outcomes, methods)
+            self.stdout.write(f'  {min(start + chunk, course_count)}/{course_count} courses')
+
+        self.stdout.write('Materializing assessment scores...')
+        AssessmentService.store_scores_bulk(batch_size=self.batch_size)
+        invalidate_snapshots()
+
+        for label, count in self.counts.items():
+            self.stdout.write(f'{label:<32} {count:>9}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated scale {scale} (seed {seed}) in {time.perf_counter() - started:.1f}s'))
+
+    def allocate(self, model, objects):
+        """Give new objects explicit primary keys following the current maximum"""
+        if model not in self.next_pk:
+            current = model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+            self.next_pk[model] = current + 1
+        for obj in objects:
+            obj.pk = self.next_pk[model]
+            self.next_pk[model] += 1
+        return objects
+
+    def write(self, model, objects, label=None):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        label = label or model.__name__
+        self.counts[label] = self.counts.get(label, 0) + len(objects)
+        return objects
+
+    def ensure_outcomes(self):
+        outcomes = []
+        for i in range(1, 8):
+            outcome = ABETOutcome.objects.filter(label=f'SO{i}').first()
+            if outcome is None:
+                outcome = ABETOutcome.objects.create(label=f'SO{i}', description=f'Student Outcome {i}')
+            outcomes.append(outcome)
+        return outcomes
+
+    def ensure_assessment_methods(self):
+        methods = []
+        direct = {'exam_questions', 'project_rubrics', 'lab_reports', 'capstone_projects'}
+        for name, label in AssessmentMethod.METHOD_TYPES:
+            method = AssessmentMethod.objects.filter(name=name).first()
+            if method is None:
+                method = AssessmentMethod.objects.create(
+                    name=name,
+                    assessment_type='direct' if name in direct else 'indirect',
+                    description=label)
+            methods.append(method)
+        return methods
+
+    def create_organisation(self, scale):
+        rnd = self.rnd
+        departments = self.write(Department, self.allocate(Department, [
+            Department(name=f'{self.prefix} Department {d}', email=f'dept{d}@bench.example.edu')
+            for d in range(PER_SCALE['departments'] * scale)
+        ]))
+
+        programs = self.write(Program, self.allocate(Program, [
+            Program(name=f'{self.prefix} Program {dept.pk}-{p}', description='Benchmark program',
+                    department=dept, level=rnd.choice(['B', 'B', 'M']))
+            for dept in departments for p in range(PER_SCALE['programs_per_department'])
+        ]))
+
+        faculty = self.write(Faculty, self.allocate(Faculty, [
+            Faculty(name=f'{self.prefix} Professor {f}', department=rnd.choice(departments),
+                    email=f'prof{f}@bench.example.edu', qualifications='PhD',
+                    expertise=rnd.choice(['Systems', 'Networks', 'Software', 'Signals', 'Power']))
+            for f in range(PER_SCALE['faculty'] * scale)
+        ]))
+
+        trainings = []
+        for member in faculty:
+            for training_type in TRAINING_TYPES:
+                completed = rnd.random() < 0.7
+                trainings.append(FacultyTraining(
+                    faculty=member, training_type=training_type, is_completed=completed,
+                    completion_date=self.random_date() if completed else None,
+                    academic_year=rnd.choice(ACADEMIC_YEARS)))
+        self.write(FacultyTraining, self.allocate(FacultyTraining, trainings))
+
+        return programs, faculty
+
+    def create_students(self, scale):
+        students = []
+        for s in range(PER_SCALE['students'] * scale):
+            students.append(Student(
+                first_name=f'Student{s}', last_name=self.prefix.replace(' ', ''),
+                email=f'student{s}@bench.example.edu', enrollment_date=self.random_date()))
+            if len(students) >= self.batch_size:
+                self.write(Student, self.allocate(Student, students))
+                students = []
+        self.write(Student, self.allocate(Student, students))
+
+        first = self.next_pk[Student] - PER_SCALE['students'] * scale
+        return list(range(first, self.next_pk[Student]))
+
+    def create_course_chunk(self, start, count, programs, faculty, student_ids, outcomes, methods):
+        rnd = self.rnd
+        courses = self.allocate(Course, [
+            Course(code=f'B{self.seed}-{n:06d}', name=f'{self.prefix} Course {n}',
+                   description='Benchmark course', credits=rnd.choice([2, 3, 3, 4]),
+                   program=rnd.choice(programs), instructor=rnd.choice(faculty))
+            for n in range(start, start + count)
+        ])
+
+        syllabi, assignments, enrollments = [], [], []
+        assessments, improvements, performances, outcomes_lo = [], [], [], []
+        outcome_links, outcome_scores, course_methods = [], [], []
+
+        for course in courses:
+            syllabi.append(CourseSyllabus(
+                course=course, is_updated=rnd.random() < 0.75, last_updated=None,
+                academic_year=rnd.choice(ACADEMIC_YEARS)))
+            for year in rnd.sample(ACADEMIC_YEARS, 2):
+                assignments.append(SemesterCourseAssignment(
+                    academic_year=year, semester=rnd.choice(SEMESTERS), course=course,
+                    instructor=course.instructor, program=course.program))
+            for student_id in rnd.sample(student_ids, min(ENROLLMENTS_PER_COURSE, len(student_ids))):
+                enrollments.append(CourseStudent(course=course, student_id=student_id))
+
+            course_assessments = self.allocate(Assessment, [
+                Assessment(name=f'{course.name} Assessment {a + 1}', date=self.random_date(),
+                           course=course)
+                for a in range(ASSESSMENTS_PER_COURSE)
+            ])
+            assessments.extend(course_assessments)
+
+            for assessment in course_assessments:
+                for _ in range(rnd.randint(1, 2)):
+                    improvements.append(ContinuousImprovement(
+                        action_taken='Revised course material', implementation_date=assessment.date,
+                        effectiveness_measure='Follow-up survey', weight=rnd.randint(1, 5),
+                        score=round(rnd.uniform(55, 100), 2), assessment=assessment))
+                for _ in range(rnd.randint(1, 3)):
+                    mean = rnd.uniform(60, 85)
+                    performances.append(AcademicPerformance(
+                        assessmentType=rnd.choice(['Final Exam', 'Midterm', 'Project', 'Lab Assessment']),
+                        high=round(rnd.uniform(mean, 100), 2), mean=round(mean, 2),
+                        low=round(rnd.uniform(20, mean), 2), grade=rnd.randint(40, 100),
+                        weight=rnd.randint(1, 5), course_id=course.pk,
+                        instructor_id=course.instructor.pk, description='Benchmark assessment',
+                        assessment_id=assessment))
+
+                course_methods.append(CourseAssessmentMethod(
+                    course=course, assessment_method=rnd.choice(methods), assessment=assessment,
+                    completion_status=rnd.random() < 0.8, score=round(rnd.uniform(2, 4), 2),
+                    completion_date=assessment.date, semester=rnd.choice(SEMESTERS)))
+
+                for learning_outcome in self.allocate(AssessmentLearningOutcome, [
+                    AssessmentLearningOutcome(description=f'Outcome {o + 1} of {assessment.name}',
+                                              program_id=course.program.pk, assessment=assessment)
+                    for o in range(rnd.randint(1, 2))
+                ]):
+                    outcomes_lo.append(learning_outcome)
+                    for outcome in rnd.sample(outcomes, rnd.randint(3, 7)):
+                        score = rnd.choices([1, 2, 3, 4], weights=OUTCOME_SCORE_WEIGHTS)[0]
+                        outcome_links.append(AssessmentLearningOutcome.abet_outcomes.through(
+                            assessmentlearningoutcome_id=learning_outcome.pk, abetoutcome_id=outcome.pk))
+                        outcome_scores.append(AssessmentLearningOutcome_ABET(
+                            assessment_lo=learning_outcome, abet_outcome=outcome, score=score,
+                            level_description=LEVEL_MAP[score],
+                            evidence_type='direct' if rnd.random() < 0.7 else 'indirect'))
+
+        # Parents first, the foreign keys are checked on insert
+        self.write(Course, courses)
+        self.write(CourseSyllabus, self.allocate(CourseSyllabus, syllabi))
+        self.write(SemesterCourseAssignment, self.allocate(SemesterCourseAssignment, assignments))
+        self.write(CourseStudent, self.allocate(CourseStudent, enrollments))
+        self.write(Assessment, assessments)
+        self.write(ContinuousImprovement, self.allocate(ContinuousImprovement, improvements))
+        self.write(AcademicPerformance, self.allocate(AcademicPerformance, performances))
+        self.write(CourseAssessmentMethod, self.allocate(CourseAssessmentMethod, course_methods))
+        self.write(AssessmentLearningOutcome, outcomes_lo)
+        self.write(AssessmentLearningOutcome.abet_outcomes.through, outcome_links,
+                   label='learning outcome links')
+        self.write(AssessmentLearningOutcome_ABET,
+                   self.allocate(AssessmentLearningOutcome_ABET, outcome_scores))
+
+    def random_date(self):
+        return datetime.date(2021, 9, 1) + datetime.timedelta(days=self.rnd.randint(0, 4 * 365))
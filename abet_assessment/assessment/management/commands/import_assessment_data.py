@@ -0,0 +1,52 @@
+import contextlib
+import io
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessment.importers import CHUNK_ROWS, IMPORTERS, ImportFileError, import_file
+
+
+class Command(BaseCommand):
+    help = 'Bulk import academic performance, assessment questions or ABET scores from .xlsx/.csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--sheet', help='Worksheet to read, defaults to the first one')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+        parser.add_argument('--partial', action='store_true',
+                            help='Write the valid rows even when other rows are rejected')
+        parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--show-errors', type=int, default=50,
+                            help='Number of rejected rows to print')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'{path} does not exist')
+
+        try:
+            with open(path, 'rb') as f, contextlib.redirect_stdout(io.StringIO()):
+                report = import_file(
+                    options['kind'], f, os.path.basename(path), dry_run=options['dry_run'],
+                    partial=options['partial'], sheet=options['sheet'],
+                    chunk_rows=options['chunk_rows'], batch_size=options['batch_size'])
+        except ImportFileError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors'][:options['show_errors']]:
+            self.stdout.write(f"  row {error['row']}, {error['column']} = {error['value']!r}: "
+                              f"{error['message']}")
+        if report['error_count'] > options['show_errors']:
+            self.stdout.write(f"  ... {report['error_count'] - options['show_errors']} more")
+
+        summary = (f"{report['rows']} rows read, {report['valid']} valid, "
+                   f"{report['error_count']} error(s)")
+        if report['committed']:
+            self.stdout.write(self.style.SUCCESS(f"✅ Imported {report['created']} rows ({summary})"))
+        elif report['dry_run']:
+            self.stdout.write(f'Dry run, nothing written ({summary})')
+        else:
+            raise CommandError(f'Nothing imported, fix the rows above or use --partial ({summary})')
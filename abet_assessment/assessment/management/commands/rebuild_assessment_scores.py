@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from assessment.models import Assessment
+from assessment.services import AssessmentService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized AssessmentScore rows from their component data'
+
+    def handle(self, *args, **options):
+        count = AssessmentService.store_scores_bulk(Assessment.objects.all())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Rebuilt scores for {count} assessments'))
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from assessment.services import AssessmentService
+
+
+class Command(BaseCommand):
+    help = 'Record the current assessment method compliance as a monthly snapshot (run e.g. daily from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month', help='Month to record as YYYY-MM (default: current month)')
+
+    def handle(self, *args, **options):
+        month = None
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--month must be in YYYY-MM format')
+
+        snapshot = AssessmentService.record_compliance_snapshot(month)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Recorded {snapshot}'))
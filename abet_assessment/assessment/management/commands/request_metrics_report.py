@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from assessment import metrics
+
+
+class Command(BaseCommand):
+    help = 'Print the endpoints with the most queries / DB time / Python time / response size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=list(metrics.BUCKETS), default='queries')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--path', action='append', default=[],
+                            help='Request this path in-process first and report only these requests '
+                                 '(can be repeated)')
+        parser.add_argument('--user', help='Username to log in as for --path requests')
+        parser.add_argument('--repeat', type=int, default=1,
+                            help='Number of times each --path is requested')
+
+    def handle(self, *args, **options):
+        if options['path']:
+            endpoints = self.exercise(options['path'], options['user'], options['repeat'])
+        else:
+            endpoints = metrics.collect_metrics()
+            if not endpoints:
+                self.stdout.write('No request metrics recorded yet. Set REQUEST_METRICS_ENABLED = True '
+                                  '(and a shared cache backend to see other processes) or use --path.')
+                return
+
+        rows = metrics.summarize(endpoints, options['sort'], options['limit'])
+        self.stdout.write(f"{'endpoint':<45} {'count':>6} {'queries':>9} {'max q':>6} "
+                          f"{'db ms':>9} {'py ms':>9} {'p95 py':>7} {'KB':>9}")
+        for row in rows:
+            p95 = row['python_ms']['p95']
+            self.stdout.write(
+                f"{row['endpoint'][:45]:<45} {row['count']:>6} {row['queries']['avg']:>9} "
+                f"{row['queries']['max']:>6} {row['db_ms']['avg']:>9} {row['python_ms']['avg']:>9} "
+                f"{p95 if p95 is not None else '>5000':>7} "
+                f"{round(row['response_bytes']['avg'] / 1024, 1):>9}")
+
+    def exercise(self, paths, username, repeat):
+        client = Client()
+        if username:
+            try:
+                client.force_login(get_user_model().objects.get(username=username))
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'User "{username}" does not exist')
+
+        # The middleware is wired up when the client's handler loads, so enable it first
+        with override_settings(REQUEST_METRICS_ENABLED=True,
+                               ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            metrics.reset_local()
+            for path in paths:
+                for _ in range(repeat):
+                    response = client.get(path)
+                    if response.status_code >= 400:
+                        self.stderr.write(f'{path} returned {response.status_code}')
+            endpoints = metrics.local_metrics()
+            metrics.reset_local()
+        return endpoints
@@ -0,0 +1,175 @@
+"""
+In-process request metrics collected by QueryMetricsMiddleware.
+
+Every resolved URL name keeps a request count plus sum, max and a histogram
+of query count, DB time, Python time and response size. Each process
+periodically publishes its numbers to the cache, so the admin endpoint and
+the request_metrics_report command can merge them across workers when a
+shared cache backend is configured. A reset is shared the same way: it
+drops every published aggregate and starts a new generation in the cache,
+and each process clears its own numbers the next time it publishes or
+reads (within REQUEST_METRICS_PUBLISH_INTERVAL).
+"""
+import copy
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Upper bounds of the histogram buckets, the last bucket counts everything above
+BUCKETS = {
+    'queries': (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    'db_ms': (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'python_ms': (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'response_bytes': (1024, 10240, 102400, 1048576, 10485760),
+}
+
+PROCESS_KEY = 'request-metrics:process:{pid}'
+PROCESS_INDEX_KEY = 'request-metrics:processes'
+GENERATION_KEY = 'request-metrics:generation'
+
+_lock = threading.Lock()
+_endpoints = {}
+_last_publish = 0.0
+_generation = None
+
+
+def _empty_stats():
+    return {
+        'count': 0,
+        'sum': {metric: 0 for metric in BUCKETS},
+        'max': {metric: 0 for metric in BUCKETS},
+        'histogram': {metric: [0] * (len(bounds) + 1) for metric, bounds in BUCKETS.items()},
+    }
+
+
+def record_request(endpoint, **values):
+    """Add one request to the endpoint's aggregates, values are keyed by BUCKETS metric names"""
+    with _lock:
+        stats = _endpoints.setdefault(endpoint, _empty_stats())
+        stats['count'] += 1
+        for metric, value in values.items():
+            stats['sum'][metric] += value
+            stats['max'][metric] = max(stats['max'][metric], value)
+            stats['histogram'][metric][bisect_left(BUCKETS[metric], value)] += 1
+    _maybe_publish()
+
+
+def reset_local():
+    """Clear this process's aggregates only"""
+    global _last_publish, _generation
+    generation = cache.get(GENERATION_KEY)
+    with _lock:
+        _endpoints.clear()
+        _last_publish = 0.0
+        _generation = generation
+    cache.delete(PROCESS_KEY.format(pid=os.getpid()))
+
+
+def reset():
+    """Clear the aggregates of every process sharing the cache"""
+    cache.set(GENERATION_KEY, time.time(), None)
+    for pid in cache.get(PROCESS_INDEX_KEY) or []:
+        cache.delete(PROCESS_KEY.format(pid=pid))
+    cache.delete(PROCESS_INDEX_KEY)
+    reset_local()
+
+
+def _sync_generation():
+    """Drop the local aggregates if another process reset the metrics since we last looked"""
+    global _generation
+    generation = cache.get(GENERATION_KEY)
+    with _lock:
+        if generation != _generation:
+            # A process that never looked before only adopts the current generation
+            if _generation is not None:
+                _endpoints.clear()
+            _generation = generation
+
+
+def local_metrics():
+    with _lock:
+        return copy.deepcopy(_endpoints)
+
+
+def _maybe_publish():
+    global _last_publish
+    interval = getattr(settings, 'REQUEST_METRICS_PUBLISH_INTERVAL', 30)
+    now = time.monotonic()
+    if now - _last_publish < interval:
+        return
+    _last_publish = now
+    publish()
+
+
+def publish():
+    """Store this process's aggregates in the cache for other processes to read"""
+    _sync_generation()
+    pid = os.getpid()
+    cache.set(PROCESS_KEY.format(pid=pid), local_metrics(),
+              getattr(settings, 'REQUEST_METRICS_TTL', 24 * 60 * 60))
+    pids = cache.get(PROCESS_INDEX_KEY) or []
+    if pid not in pids:
+        cache.set(PROCESS_INDEX_KEY, pids + [pid], None)
+
+
+def _merge_into(target, endpoints):
+    for endpoint, stats in endpoints.items():
+        merged = target.setdefault(endpoint, _empty_stats())
+        merged['count'] += stats['count']
+        for metric in BUCKETS:
+            merged['sum'][metric] += stats['sum'][metric]
+            merged['max'][metric] = max(merged['max'][metric], stats['max'][metric])
+            merged['histogram'][metric] = [
+                a + b for a, b in zip(merged['histogram'][metric], stats['histogram'][metric])]
+
+
+def collect_metrics():
+    """This process's live aggregates merged with the ones published by other processes"""
+    _sync_generation()
+    merged = local_metrics()
+    own_pid = os.getpid()
+    for pid in cache.get(PROCESS_INDEX_KEY) or []:
+        if pid == own_pid:
+            continue
+        published = cache.get(PROCESS_KEY.format(pid=pid))
+        if published is not None:
+            _merge_into(merged, published)
+    return merged
+
+
+def _percentile(histogram, bounds, count, fraction):
+    """Upper bound of the bucket holding the given fraction of requests (None = above the last bound)"""
+    threshold = count * fraction
+    seen = 0
+    for index, bucket_count in enumerate(histogram):
+        seen += bucket_count
+        if seen >= threshold:
+            return bounds[index] if index < len(bounds) else None
+    return None
+
+
+def summarize(endpoints, sort_by='queries', limit=None):
+    """Per-endpoint averages, maxima and p50/p95 bucket bounds, worst offenders first"""
+    rows = []
+    for endpoint, stats in endpoints.items():
+        count = stats['count']
+        if not count:
+            continue
+        row = {'endpoint': endpoint, 'count': count}
+        for metric, bounds in BUCKETS.items():
+            histogram = stats['histogram'][metric]
+            row[metric] = {
+                'avg': round(stats['sum'][metric] / count, 2),
+                'max': round(stats['max'][metric], 2),
+                'p50': _percentile(histogram, bounds, count, 0.5),
+                'p95': _percentile(histogram, bounds, count, 0.95),
+                'histogram': dict(zip([str(b) for b in bounds] + ['+Inf'], histogram)),
+            }
+        rows.append(row)
+
+    rows.sort(key=lambda row: row[sort_by]['avg'], reverse=True)
+    return rows[:limit] if limit else rows
@@ -1,5 +1,12 @@
 import threading
+import time
+
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics
 
 _thread_local = threading.local()
 
@@ -20,4 +27,55 @@ class CurrentUserMiddleware:
         response = self.get_response(request)
         return response
 
-# Middleware file
+
+class QueryTimer:
+    """connection.execute_wrapper hook counting queries and the time spent in them"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryMetricsMiddleware:
+    """
+    Records query count, DB time, Python time and response size per resolved URL name.
+    Only active when REQUEST_METRICS_ENABLED is set, see assessment/metrics.py.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        metrics.record_request(
+            self._endpoint_name(request),
+            queries=timer.count,
+            db_ms=timer.duration * 1000,
+            python_ms=max(elapsed - timer.duration, 0) * 1000,
+            response_bytes=0 if response.streaming else len(response.content)
+        )
+        return response
+
+    @staticmethod
+    def _endpoint_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return '<unresolved>'
+        # Router views are named (e.g. course-list), plain paths fall back to their route
+        name = match.url_name or match.route
+        return f'{match.namespace}:{name}' if match.namespace else name
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0017_rename_assessment_id_continuousimprovement_assessment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentScore',
+            fields=[
+                ('assessment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_summary', serialize=False, to='assessment.assessment')),
+                ('ci_score_sum', models.FloatField(default=0.0)),
+                ('ci_weight_sum', models.FloatField(default=0.0)),
+                ('ap_score_sum', models.FloatField(default=0.0)),
+                ('ap_weight_sum', models.FloatField(default=0.0)),
+                ('lo_score_sum', models.FloatField(default=0.0)),
+                ('lo_weight_sum', models.FloatField(default=0.0)),
+                ('total_score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0018_assessmentscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the recorded month', unique=True)),
+                ('compliance_rate', models.FloatField(default=0.0)),
+                ('direct_assessment_compliance', models.FloatField(default=0.0)),
+                ('indirect_assessment_compliance', models.FloatField(default=0.0)),
+                ('compliant_methods', models.IntegerField(default=0)),
+                ('total_methods', models.IntegerField(default=0)),
+                ('methods_summary', models.JSONField(default=list)),
+                ('recorded_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-month'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0020_assessmenteventoutbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assessmentevent',
+            index=models.Index(fields=['timestamp', 'id'], name='event_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessmentevent',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='event_user_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessmentevent',
+            index=models.Index(fields=['event_type', 'timestamp', 'id'], name='event_type_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp', 'id'], name='auditlog_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='auditlog_user_ts_id_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+def backfill_assessment_labels(apps, schema_editor):
+    """Store the names of assessments that still exist, deleted ones keep the fallback label"""
+    AuditLog = apps.get_model('assessment', 'AuditLog')
+    Assessment = apps.get_model('assessment', 'Assessment')
+    pending = AuditLog.objects.filter(target_model='Assessment', target_label='').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:2000])
+        if not batch:
+            break
+        names = dict(Assessment.objects.filter(
+            id__in={log.target_id for log in batch}).values_list('id', 'name'))
+        for log in batch:
+            log.target_label = (names.get(log.target_id) or '')[:255]
+        AuditLog.objects.bulk_update([log for log in batch if log.target_label], ['target_label'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0021_activity_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='target_label',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(backfill_assessment_labels, migrations.RunPython.noop),
+    ]
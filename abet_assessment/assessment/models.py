@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from .middleware import get_current_user
 
 
@@ -138,6 +139,61 @@ class AssessmentLearningOutcome_ABET(models.Model):
         super().save(*args, **kwargs)
 
 
+class AssessmentScore(models.Model):
+    """
+    Materialized score for a single assessment.
+    Component sums are kept up to date by the signals in signals.py so readers
+    only need one lookup instead of re-reading every component row.
+    """
+    COMPONENTS = ('ci', 'ap', 'lo')
+
+    assessment = models.OneToOneField(
+        Assessment, on_delete=models.CASCADE, primary_key=True, related_name='score_summary')
+    ci_score_sum = models.FloatField(default=0.0)
+    ci_weight_sum = models.FloatField(default=0.0)
+    ap_score_sum = models.FloatField(default=0.0)
+    ap_weight_sum = models.FloatField(default=0.0)
+    # LO scores are normalized to a percentage and every ABET score counts once
+    lo_score_sum = models.FloatField(default=0.0)
+    lo_weight_sum = models.FloatField(default=0.0)
+    total_score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def component_scores(self):
+        """Return the normalized (ci, ap, lo) scores, 0 for components without data"""
+        ci = self.ci_score_sum / self.ci_weight_sum if self.ci_weight_sum > 0 else 0
+        ap = self.ap_score_sum / self.ap_weight_sum if self.ap_weight_sum > 0 else 0
+        lo = self.lo_score_sum / self.lo_weight_sum if self.lo_weight_sum > 0 else 0
+        return ci, ap, lo
+
+    def update_total(self):
+        component_count = sum(1 for weight in (
+            self.ci_weight_sum, self.ap_weight_sum, self.lo_weight_sum) if weight > 0)
+        self.total_score = sum(self.component_scores()) / \
+            component_count if component_count > 0 else 0
+        return self.total_score
+
+    def as_score_dict(self):
+        """Same shape as AssessmentService.calculate_assessment_score"""
+        ci, ap, lo = self.component_scores()
+        is_accredited = self.total_score >= 90
+        return {
+            'total_score': self.total_score,
+            'totalscore': self.total_score,
+            'continuous_improvement_score': ci,
+            'continuousimprovementscore': ci,
+            'academic_performance_score': ap,
+            'academicperformancescore': ap,
+            'learning_outcome_score': lo,
+            'learningoutcomescore': lo,
+            'is_abet_accredited': is_accredited,
+            'isabetaccredited': is_accredited
+        }
+
+    def __str__(self):
+        return f"Score for Assessment {self.assessment_id}: {self.total_score:.2f}"
+
+
 class AuditLog(models.Model):
     ACTION_CHOICES = (
         ('CREATE', 'Create'),
@@ -149,9 +205,18 @@ class AuditLog(models.Model):
     action = models.CharField(max_length=10, choices=ACTION_CHOICES)
     target_model = models.CharField(max_length=100)
     target_id = models.BigIntegerField()
+    # Target name at write time, still readable after the target is deleted
+    target_label = models.CharField(max_length=255, blank=True, default='')
     changes = models.TextField(blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Keyset pagination walks (timestamp, id), optionally within one user
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='auditlog_ts_id_idx'),
+            models.Index(fields=['user', 'timestamp', 'id'], name='auditlog_user_ts_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} {self.action} on {self.target_model} #{self.target_id}"
 
@@ -168,14 +233,41 @@ class AssessmentEvent(models.Model):
     event_type = models.CharField(max_length=10, choices=EVENT_TYPES)
     # ABET score at time of event
     score = models.FloatField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set explicitly when events are flushed from the outbox
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     user = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True)
     average_score_at_time = models.FloatField(default=0.0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='event_ts_id_idx'),
+            models.Index(fields=['user', 'timestamp', 'id'], name='event_user_ts_id_idx'),
+            models.Index(fields=['event_type', 'timestamp', 'id'], name='event_type_ts_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.event_type} - {self.assessment_name} ({self.timestamp})"
 
 
+class AssessmentEventOutbox(models.Model):
+    """
+    Assessment events waiting to be written to AssessmentEvent.
+    Requests only insert a row here; the flusher in utilsLog/event_logger.py
+    computes the system-wide average once per batch and bulk-inserts the events.
+    """
+    assessment_id = models.BigIntegerField()
+    assessment_name = models.CharField(max_length=255)
+    event_type = models.CharField(
+        max_length=10, choices=AssessmentEvent.EVENT_TYPES)
+    score = models.FloatField(
+        null=True, blank=True, help_text="Empty to use the system-wide average of the batch")
+    user = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Pending {self.event_type} - {self.assessment_name}"
+
+
 class ABETComplianceMetric(models.Model):
     METRIC_TYPES = [
         ('course_syllabi', 'Course Syllabi Updated'),
@@ -289,3 +381,21 @@ class ComplianceMetric(models.Model):
     measurement_date = models.DateField(auto_now_add=True)
     semester = models.CharField(max_length=20, default='Fall 2024')
     is_compliant = models.BooleanField(default=False)
+
+
+class ComplianceSnapshot(models.Model):
+    """Assessment method compliance recorded once per month, used for the trend charts"""
+    month = models.DateField(unique=True, help_text="First day of the recorded month")
+    compliance_rate = models.FloatField(default=0.0)
+    direct_assessment_compliance = models.FloatField(default=0.0)
+    indirect_assessment_compliance = models.FloatField(default=0.0)
+    compliant_methods = models.IntegerField(default=0)
+    total_methods = models.IntegerField(default=0)
+    methods_summary = models.JSONField(default=list)
+    recorded_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"Compliance {self.month:%B %Y}: {self.compliance_rate:.1f}%"
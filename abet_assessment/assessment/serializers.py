@@ -1,22 +1,74 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from .models import (
     Assessment, ContinuousImprovement, AcademicPerformance,
     AssessmentLearningOutcome, AssessmentLearningOutcome_ABET, AuditLog,
     AssessmentEvent, FacultyTraining, AssessmentQuestion
 )
 from .services import AssessmentService
+from .utils import fallback_target_label, resolve_target_labels
 from datetime import date
 from django.db.models import Sum
+from django.db.models.manager import BaseManager
 from .models import ABETOutcome
 
 
-class ABETOutcomeSerializer(serializers.ModelSerializer):
+def _query_paths(request, param):
+    """Dotted field paths from a comma separated query parameter (may be repeated)"""
+    params = getattr(request, 'query_params', request.GET)
+    return {path.strip() for value in params.getlist(param)
+            for path in value.split(',') if path.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for GET requests.
+    ?fields=id,name,course_details.name keeps only the listed fields, dotted names
+    reach into nested serializers. Fields listed in Meta.expandable_fields (expensive
+    computed values and nested relations) are left out of list responses unless
+    asked for with ?expand=average_score,assessments.score or named in ?fields=.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+
+        path = self._field_path()
+        prefix = f'{path}.' if path else ''
+        requested = {name[len(prefix):].split('.')[0]
+                     for name in _query_paths(request, 'fields') if name.startswith(prefix)}
+        # Expanding assessments.score also expands assessments
+        expanded = {name[len(prefix):].split('.')[0]
+                    for name in _query_paths(request, 'expand') if name.startswith(prefix)}
+
+        if requested:
+            for name in set(fields) - requested:
+                fields.pop(name)
+        elif isinstance(self.root, serializers.ListSerializer):
+            for name in getattr(self.Meta, 'expandable_fields', ()):
+                if name not in expanded:
+                    fields.pop(name, None)
+        return fields
+
+    def _field_path(self):
+        parts = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                parts.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(parts))
+
+
+class ABETOutcomeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ABETOutcome
         fields = ['id', 'label', 'description']
 
 
-class AssessmentLearningOutcomeABETSerializer(serializers.ModelSerializer):
+class AssessmentLearningOutcomeABETSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     abetoutcome = ABETOutcomeSerializer(source='abet_outcome', read_only=True)
 
     class Meta:
@@ -24,7 +76,7 @@ class AssessmentLearningOutcomeABETSerializer(serializers.ModelSerializer):
         fields = ['abetoutcome', 'score', 'evidence_type', 'level_description']
 
 
-class FacultyTrainingSerializer(serializers.ModelSerializer):
+class FacultyTrainingSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     faculty_name = serializers.CharField(source='faculty.name', read_only=True)
     faculty_email = serializers.CharField(
         source='faculty.email', read_only=True)
@@ -48,17 +100,62 @@ class FacultyTrainingSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class AssessmentSerializer(serializers.ModelSerializer):
+class AssessmentScoreProvider:
+    """
+    Scores the assessments of a whole response at once and hands them out per object.
+    Kept in the serializer context, so nested serializers share it (see get_score_provider).
+    """
+
+    def __init__(self):
+        self._scores = {}
+
+    def prime(self, assessment_ids):
+        missing = {assessment_id for assessment_id in assessment_ids
+                   if assessment_id not in self._scores}
+        if missing:
+            scores = AssessmentService.get_scores(missing)
+            for assessment_id in missing:
+                self._scores[assessment_id] = scores.get(assessment_id)
+
+    def get(self, assessment_id):
+        self.prime([assessment_id])
+        return self._scores[assessment_id]
+
+    def get_many(self, assessment_ids):
+        assessment_ids = list(assessment_ids)
+        self.prime(assessment_ids)
+        return {assessment_id: self._scores[assessment_id] for assessment_id in assessment_ids
+                if self._scores[assessment_id] is not None}
+
+
+def get_score_provider(context):
+    """The score provider of a serializer context, created on first use"""
+    provider = context.get('score_provider')
+    if provider is None:
+        provider = context['score_provider'] = AssessmentScoreProvider()
+    return provider
+
+
+class AssessmentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        assessments = data.all() if isinstance(data, BaseManager) else data
+        if 'score' in self.child.fields:
+            get_score_provider(self.context).prime(assessment.id for assessment in assessments)
+        return super().to_representation(assessments)
+
+
+class AssessmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     score = serializers.SerializerMethodField()
 
     class Meta:
         model = Assessment
         fields = '__all__'
+        list_serializer_class = AssessmentListSerializer
+        expandable_fields = ('score',)
 
     def get_score(self, obj):
         try:
-            result = AssessmentService.calculate_assessment_score(
-                obj.id)  # ✅ Fixed method name
+            result = get_score_provider(self.context).get(obj.id)
             return round(result.get('total_score', 0), 2)  # ✅ Use correct key
         except Exception as e:
             print(f"Error calculating score for assessment {obj.id}: {e}")
@@ -72,7 +169,7 @@ class ABETOutcomeNestedSerializer(serializers.ModelSerializer):
         fields = ['id', 'label']  # Provide just the ID and label for the badge
 
 
-class AssessmentQuestionSerializer(serializers.ModelSerializer):
+class AssessmentQuestionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     # 2. This read-only field gets the name from the related AcademicPerformance object
     academic_performance_name = serializers.CharField(
         source='academic_performance.assessmentType', read_only=True)
@@ -126,7 +223,7 @@ class AssessmentQuestionSerializer(serializers.ModelSerializer):
         return data
 
 
-class ContinuousImprovementSerializer(serializers.ModelSerializer):
+class ContinuousImprovementSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ContinuousImprovement
         fields = '__all__'
@@ -150,13 +247,13 @@ class ContinuousImprovementSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class AcademicPerformanceSerializer(serializers.ModelSerializer):
+class AcademicPerformanceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = AcademicPerformance
         fields = '__all__'
 
 
-class AssessmentLearningOutcomeSerializer(serializers.ModelSerializer):
+class AssessmentLearningOutcomeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     abet_outcomes_scores = serializers.ListField(
         write_only=True, required=False)
     abetoutcomesscores = AssessmentLearningOutcomeABETSerializer(
@@ -218,6 +315,13 @@ class AssessmentLearningOutcomeSerializer(serializers.ModelSerializer):
         return instance
 
 
+class AuditLogListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        logs = list(data.all() if isinstance(data, BaseManager) else data)
+        self.context['target_labels'] = resolve_target_labels(logs)
+        return super().to_representation(logs)
+
+
 class AuditLogSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     target_name = serializers.SerializerMethodField()
@@ -226,28 +330,20 @@ class AuditLogSerializer(serializers.ModelSerializer):
         model = AuditLog
         fields = ['id', 'username', 'action', 'target_model',
                   'target_id', 'target_name', 'changes', 'timestamp']
+        list_serializer_class = AuditLogListSerializer
 
     def get_target_name(self, obj):
-        """Get the name of the target object based on model and ID"""
-        try:
-            if obj.target_model == 'Assessment':
-                from .models import Assessment
-                assessment = Assessment.objects.get(id=obj.target_id)
-                return assessment.name
-            elif obj.target_model == 'ContinuousImprovement':
-                return f"Continuous Improvement #{obj.target_id}"
-            elif obj.target_model == 'AcademicPerformance':
-                return f"Academic Performance #{obj.target_id}"
-            elif obj.target_model == 'AssessmentLearningOutcome':
-                return f"Learning Outcome #{obj.target_id}"
-            else:
-                return f"{obj.target_model} #{obj.target_id}"
-        except Exception:
-            # Fallback if object doesn't exist or any error occurs
-            return f"{obj.target_model} #{obj.target_id}"
-
-
-class AssessmentEventSerializer(serializers.ModelSerializer):
+        """Label stored at write time, else resolved for the whole page by the list serializer"""
+        if obj.target_label:
+            return obj.target_label
+        labels = self.context.get('target_labels')
+        if labels is None:
+            labels = resolve_target_labels([obj])
+        return labels.get((obj.target_model, obj.target_id),
+                          fallback_target_label(obj.target_model, obj.target_id))
+
+
+class AssessmentEventSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
 
     class Meta:
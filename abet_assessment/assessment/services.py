@@ -1,129 +1,208 @@
 from .models import (
     Assessment, ContinuousImprovement, AcademicPerformance,
     AssessmentLearningOutcome, ABETOutcome, AssessmentLearningOutcome_ABET,
-    CourseSyllabus, FacultyTraining, ABETComplianceMetric
+    CourseSyllabus, FacultyTraining, ABETComplianceMetric, AssessmentScore, ComplianceSnapshot
 )
 from programs.models import Course, Faculty, Program, Department, CourseStudent
-from django.db.models import Sum, F, ExpressionWrapper, FloatField, Avg, Count
+from django.db.models import Sum, F, ExpressionWrapper, FloatField, Avg, Count, Q, Max, Min
+from django.db import transaction
 from django.utils import timezone
 
+# Longest trend range that can be requested, ten years of monthly snapshots
+COMPLIANCE_TRENDS_MAX_MONTHS = 120
+
 
 class AssessmentService:
     @staticmethod
     def calculate_assessment_score(assessment_id):
         """Calculate the weighted average score for an assessment"""
         try:
-            # Get all components for this assessment - FIXED field names
-            cicomponents = ContinuousImprovement.objects.filter(
-                assessment_id=assessment_id)
-            apcomponents = AcademicPerformance.objects.filter(
-                assessment_id=assessment_id)
-            locomponents = AssessmentLearningOutcome.objects.filter(
-                assessment=assessment_id)
-
-            # Calculate weighted scores for each component type
-            ciscore = 0
-            ciweightsum = 0
-            for ci in cicomponents:
-                ciscore += ci.score * ci.weight
-                ciweightsum += ci.weight
-
-            apscore = 0
-            apweightsum = 0
-            for ap in apcomponents:
-                apscore += ap.grade * ap.weight
-                apweightsum += ap.weight
-
-            # FIXED: Learning Outcomes scoring logic
-            loscore = 0
-            loweightsum = 0
-
-            # Get all ABET outcome scores for this assessment's learning outcomes
-            for lo in locomponents:
-                # FIXED: Use correct field name 'assessment_lo'
-                abet_scores = AssessmentLearningOutcome_ABET.objects.filter(
-                    assessment_lo=lo)
-                for abet_score in abet_scores:
-                    # Convert 4-point scale to percentage (score/4.0 * 100)
-                    normalized_score = (abet_score.score / 4.0) * 100
-                    loscore += normalized_score
-                    loweightsum += 1
-
-            # Calculate normalized scores with dynamic component counting
-            component_count = 0
-            total_score = 0
-
-            if ciweightsum > 0:
-                cinormalized = ciscore / ciweightsum
-                total_score += cinormalized
-                component_count += 1
-            else:
-                cinormalized = 0
-
-            if apweightsum > 0:
-                apnormalized = apscore / apweightsum
-                total_score += apnormalized
-                component_count += 1
-            else:
-                apnormalized = 0
-
-            if loweightsum > 0:
-                lonormalized = loscore / loweightsum
-                total_score += lonormalized
-                component_count += 1
-            else:
-                lonormalized = 0
-
-            # Calculate final score based on actual components with data
-            finalscore = total_score / component_count if component_count > 0 else 0
-            isabetaccredited = finalscore >= 90
-
-            return {
-                'total_score': finalscore,          # ✅ WITH underscore for new code
-                'totalscore': finalscore,           # ✅ WITHOUT underscore for backward compatibility
-                'continuous_improvement_score': cinormalized,
-                'continuousimprovementscore': cinormalized,
-                'academic_performance_score': apnormalized,
-                'academicperformancescore': apnormalized,
-                'learning_outcome_score': lonormalized,
-                'learningoutcomescore': lonormalized,
-                'is_abet_accredited': isabetaccredited,
-                'isabetaccredited': isabetaccredited
-            }
+            try:
+                score = AssessmentScore.objects.get(assessment_id=assessment_id)
+            except AssessmentScore.DoesNotExist:
+                # Not materialized yet (e.g. data loaded before the score table existed)
+                score = AssessmentService.refresh_assessment_score(
+                    assessment_id)
+
+            if score is not None:
+                return score.as_score_dict()
         except Exception as e:
             print(f"Error in calculate_assessment_score: {e}")
             import traceback
             traceback.print_exc()
-            return {
-                'total_score': 0,
-                'totalscore': 0,
-                'continuous_improvement_score': 0,
-                'continuousimprovementscore': 0,
-                'academic_performance_score': 0,
-                'academicperformancescore': 0,
-                'learning_outcome_score': 0,
-                'learningoutcomescore': 0,
-                'is_abet_accredited': False,
-                'isabetaccredited': False
-            }
+
+        return {
+            'total_score': 0,
+            'totalscore': 0,
+            'continuous_improvement_score': 0,
+            'continuousimprovementscore': 0,
+            'academic_performance_score': 0,
+            'academicperformancescore': 0,
+            'learning_outcome_score': 0,
+            'learningoutcomescore': 0,
+            'is_abet_accredited': False,
+            'isabetaccredited': False
+        }
+
+    @staticmethod
+    def get_scores(assessment_ids):
+        """
+        Score dicts for many assessments, read from the materialized AssessmentScore rows.
+        Assessments without a row yet are aggregated from their components.
+        """
+        assessment_ids = list(assessment_ids)
+        scores = {score.assessment_id: score.as_score_dict()
+                  for score in AssessmentScore.objects.filter(assessment_id__in=assessment_ids)}
+        missing = [assessment_id for assessment_id in assessment_ids if assessment_id not in scores]
+        if missing:
+            rows = AssessmentService._build_score_rows(Assessment.objects.filter(id__in=missing))
+            scores.update((assessment_id, row.as_score_dict()) for assessment_id, row in rows.items())
+        return scores
+
+    @staticmethod
+    def refresh_assessment_score(assessment_id, components=None):
+        """
+        Recompute the stored component sums of one assessment and its final score.
+        Only the given components ('ci', 'ap', 'lo') are re-aggregated, the others
+        are kept from the stored row. Returns None if the assessment no longer exists.
+        """
+        if not Assessment.objects.filter(id=assessment_id).exists():
+            return None
+
+        score, created = AssessmentScore.objects.get_or_create(
+            assessment_id=assessment_id)
+        if created or components is None:
+            components = AssessmentScore.COMPONENTS
+
+        if 'ci' in components:
+            sums = ContinuousImprovement.objects.filter(
+                assessment_id=assessment_id).aggregate(
+                    score_sum=Sum(F('score') * F('weight'),
+                                  output_field=FloatField()),
+                    weight_sum=Sum('weight'))
+            score.ci_score_sum = sums['score_sum'] or 0
+            score.ci_weight_sum = sums['weight_sum'] or 0
+
+        if 'ap' in components:
+            sums = AcademicPerformance.objects.filter(
+                assessment_id=assessment_id).aggregate(
+                    score_sum=Sum(F('grade') * F('weight'),
+                                  output_field=FloatField()),
+                    weight_sum=Sum('weight'))
+            score.ap_score_sum = sums['score_sum'] or 0
+            score.ap_weight_sum = sums['weight_sum'] or 0
+
+        if 'lo' in components:
+            # Every ABET score counts once, converted from the 4-point scale to a percentage
+            sums = AssessmentLearningOutcome_ABET.objects.filter(
+                assessment_lo__assessment_id=assessment_id).aggregate(
+                    raw_sum=Sum('score'), count=Count('id'))
+            score.lo_score_sum = ((sums['raw_sum'] or 0) / 4.0) * 100
+            score.lo_weight_sum = sums['count'] or 0
+
+        score.update_total()
+        score.save()
+        return score
+
+    @staticmethod
+    def _build_score_rows(queryset):
+        """
+        Compute unsaved AssessmentScore rows for every assessment in the queryset
+        using one grouped aggregate query per component type.
+        """
+        assessment_ids = list(queryset.values_list('id', flat=True))
+        rows = {assessment_id: AssessmentScore(assessment_id=assessment_id)
+                for assessment_id in assessment_ids}
+        if not rows:
+            return rows
+
+        # Sliced querysets can't be used as a subquery on MySQL
+        assessment_filter = assessment_ids if queryset.query.is_sliced else queryset.values('id')
+
+        ci_sums = ContinuousImprovement.objects.filter(
+            assessment_id__in=assessment_filter).values('assessment_id').annotate(
+                score_sum=Sum(F('score') * F('weight'), output_field=FloatField()),
+                weight_sum=Sum('weight')).order_by()
+        for item in ci_sums:
+            row = rows[item['assessment_id']]
+            row.ci_score_sum = item['score_sum'] or 0
+            row.ci_weight_sum = item['weight_sum'] or 0
+
+        ap_sums = AcademicPerformance.objects.filter(
+            assessment_id__in=assessment_filter).values('assessment_id').annotate(
+                score_sum=Sum(F('grade') * F('weight'), output_field=FloatField()),
+                weight_sum=Sum('weight')).order_by()
+        for item in ap_sums:
+            row = rows[item['assessment_id']]
+            row.ap_score_sum = item['score_sum'] or 0
+            row.ap_weight_sum = item['weight_sum'] or 0
+
+        lo_sums = AssessmentLearningOutcome_ABET.objects.filter(
+            assessment_lo__assessment_id__in=assessment_filter).values(
+                'assessment_lo__assessment_id').annotate(
+                    raw_sum=Sum('score'), count=Count('id')).order_by()
+        for item in lo_sums:
+            row = rows[item['assessment_lo__assessment_id']]
+            row.lo_score_sum = ((item['raw_sum'] or 0) / 4.0) * 100
+            row.lo_weight_sum = item['count'] or 0
+
+        for row in rows.values():
+            row.update_total()
+        return rows
+
+    @staticmethod
+    def calculate_scores_bulk(queryset=None):
+        """
+        Score many assessments at once in a constant number of queries.
+        Returns {assessment_id: score dict} with the same shape as calculate_assessment_score.
+        Scores are read from the stored AssessmentScore rows, only assessments without
+        a row yet are aggregated from their components.
+        """
+        if queryset is None:
+            queryset = Assessment.objects.all()
+        assessment_ids = list(queryset.values_list('id', flat=True))
+        if not assessment_ids:
+            return {}
+        # Sliced querysets can't be used as a subquery on MySQL
+        assessment_filter = assessment_ids if queryset.query.is_sliced else queryset.values('id')
+        scores = {score.assessment_id: score.as_score_dict()
+                  for score in AssessmentScore.objects.filter(assessment_id__in=assessment_filter)}
+        missing = [assessment_id for assessment_id in assessment_ids if assessment_id not in scores]
+        if missing:
+            rows = AssessmentService._build_score_rows(Assessment.objects.filter(id__in=missing))
+            scores.update((assessment_id, row.as_score_dict()) for assessment_id, row in rows.items())
+        return scores
+
+    @staticmethod
+    def store_scores_bulk(queryset=None, batch_size=1000):
+        """Recompute and persist the AssessmentScore rows for the given assessments"""
+        if queryset is None:
+            queryset = Assessment.objects.all()
+        assessment_ids = list(queryset.values_list('id', flat=True))
+        stored = 0
+        for start in range(0, len(assessment_ids), batch_size):
+            batch = assessment_ids[start:start + batch_size]
+            rows = AssessmentService._build_score_rows(
+                Assessment.objects.filter(id__in=batch))
+            with transaction.atomic():
+                AssessmentScore.objects.filter(assessment_id__in=batch).delete()
+                AssessmentScore.objects.bulk_create(rows.values())
+            stored += len(rows)
+        return stored
+
+    @staticmethod
+    def average_total_score(scores):
+        """Average total_score over a {assessment_id: score dict} mapping"""
+        if not scores:
+            return 0.0
+        return sum(score['total_score'] for score in scores.values()) / len(scores)
 
     @staticmethod
     def get_average_score():
         """Calculate the average total score across all assessments."""
         try:
-            assessments = Assessment.objects.all().only('id').iterator()
-            total = 0
-            count = 0
-
-            for assessment in assessments:
-                scores = AssessmentService.calculate_assessment_score(
-                    assessment.id)  # ✅ Fixed method name
-                total += scores['total_score']  # ✅ Use consistent key
-                count += 1
-
-            if count == 0:
-                return 0.0
-            return round(total / count, 2)
+            scores = AssessmentService.calculate_scores_bulk()
+            return round(AssessmentService.average_total_score(scores), 2)
         except Exception as e:
             print(f"Error in get_average_score: {e}")
             return 0.0
@@ -142,106 +221,145 @@ class AssessmentService:
         return basic_stats
 
     @staticmethod
-    def get_abet_outcomes_dashboard_data():
-        """Get ABET outcomes data formatted for dashboard"""
-        outcomes = []
-
-        print("🎯 Calculating ABET outcomes...")
-
-        for abet_outcome in ABETOutcome.objects.all():
-            outcome_scores = AssessmentLearningOutcome_ABET.objects.filter(
-                abet_outcome=abet_outcome
-            )
-
-            if outcome_scores.exists():
-                scores = [score.score for score in outcome_scores]
-                avg_score = sum(scores) / len(scores)
-                percentage = (avg_score / 4.0) * 100
-
-                if percentage >= 85:
-                    status = "exceeded"
-                elif percentage >= 75:
-                    status = "met"
-                else:
-                    status = "below"
+    def get_outcome_attainment(program_id=None):
+        """
+        Attainment of every ABET outcome from one grouped aggregate over the outcome scores:
+        count, mean on the 4 point scale, percentage, status, distribution of levels 1-4
+        and the direct/indirect split. Outcomes without scores are included with zeros.
+        Pass program_id to only count the scores of that program's courses.
+        """
+        direct = Q(evidence_type='direct')
+        indirect = Q(evidence_type='indirect')
+        scores = AssessmentLearningOutcome_ABET.objects.all()
+        if program_id:
+            scores = scores.filter(assessment_lo__assessment__course__program_id=program_id)
+        rows = scores.values('abet_outcome').annotate(
+            count=Count('id'),
+            mean=Avg('score'),
+            direct_count=Count('id', filter=direct),
+            direct_mean=Avg('score', filter=direct),
+            indirect_count=Count('id', filter=indirect),
+            indirect_mean=Avg('score', filter=indirect),
+            **{f'level_{level}': Count('id', filter=Q(score=level)) for level in range(1, 5)}
+        ).order_by()
+        by_outcome = {row['abet_outcome']: row for row in rows}
+
+        attainment = []
+        for outcome in ABETOutcome.objects.order_by('id'):
+            row = by_outcome.get(outcome.id)
+            if row:
+                mean = row['mean']
+                percentage = (mean / 4.0) * 100
             else:
-                avg_score = 0
+                mean = 0
                 percentage = 0
+
+            if percentage >= 85:
+                status = "exceeded"
+            elif percentage >= 75:
+                status = "met"
+            else:
                 status = "below"
 
-            outcomes.append({
-                'id': abet_outcome.label,
-                'label': abet_outcome.description,
-                'score': avg_score,  # Raw score (2.92)
-                'current_score': percentage,  # Percentage (72.9)
-                'target': 4.0,
-                'target_score': 75.0,
-                'status': status
+            attainment.append({
+                'id': outcome.id,
+                'label': outcome.label,
+                'description': outcome.description,
+                'count': row['count'] if row else 0,
+                'mean': mean,
+                'percentage': percentage,
+                'status': status,
+                'distribution': {level: row[f'level_{level}'] if row else 0 for level in range(1, 5)},
+                'direct': {'count': row['direct_count'] if row else 0,
+                           'mean': (row['direct_mean'] or 0) if row else 0},
+                'indirect': {'count': row['indirect_count'] if row else 0,
+                             'mean': (row['indirect_mean'] or 0) if row else 0},
             })
 
-        return outcomes
+        return attainment
 
     @staticmethod
-    def get_courses_assessment_summary():
-        """Get course assessment summary with enhanced ABET outcome mapping"""
-        from programs.models import CourseStudent
+    def get_abet_outcomes_dashboard_data():
+        """Get ABET outcomes data formatted for dashboard"""
+        print("🎯 Calculating ABET outcomes...")
 
-        courses_data = []
-        print("📚 Calculating course assessment summary with outcome mapping...")
+        return [{
+            'id': outcome['label'],
+            'label': outcome['description'],
+            'score': outcome['mean'],  # Raw score (2.92)
+            'current_score': outcome['percentage'],  # Percentage (72.9)
+            'target': 4.0,
+            'target_score': 75.0,
+            'status': outcome['status']
+        } for outcome in AssessmentService.get_outcome_attainment()]
 
-        for course in Course.objects.select_related('program', 'instructor'):
-            assessments = Assessment.objects.filter(course=course)
-            enrollment = CourseStudent.objects.filter(course=course).count()
+    @staticmethod
+    def get_courses_assessment_summary(program_id=None, page=None, page_size=None):
+        """
+        Get course assessment summary with enhanced ABET outcome mapping.
+        Everything is fetched for all selected courses at once (a fixed number of
+        queries) and assembled per course in memory. Pass page_size to get one
+        page of courses (page is 1-based) and program_id to limit it to a program.
+        """
+        courses = AssessmentService.get_summary_courses(program_id).select_related('instructor')
+        if page_size:
+            start = (max(page or 1, 1) - 1) * page_size
+            courses = courses[start:start + page_size]
+        courses = list(courses)
+
+        print(f"📚 Calculating course assessment summary for {len(courses)} courses...")
+        if not courses:
+            return []
+
+        # A page is a short id list, the full set stays a subquery
+        if page_size:
+            course_filter = [course.id for course in courses]
+        else:
+            course_filter = AssessmentService.get_summary_courses(program_id).values('id')
+
+        enrollments = dict(CourseStudent.objects.filter(course_id__in=course_filter).values(
+            'course_id').annotate(count=Count('id')).order_by().values_list('course_id', 'count'))
+
+        assessments = Assessment.objects.filter(course_id__in=course_filter)
+        course_of = dict(assessments.values_list('id', 'course_id'))
+        total_scores = {}
+        for assessment_id, score in AssessmentService.calculate_scores_bulk(assessments).items():
+            total_scores.setdefault(course_of[assessment_id], []).append(score['total_score'])
+
+        # Best score per (course, outcome), the evidence type is the one seen first
+        outcome_groups = AssessmentLearningOutcome_ABET.objects.filter(
+            assessment_lo__assessment__course_id__in=course_filter).values(
+                'assessment_lo__assessment__course_id', 'abet_outcome__label', 'evidence_type'
+        ).annotate(score=Max('score'), first_id=Min('id')).order_by('first_id')
+        mapped_by_course = {}
+        for group in outcome_groups:
+            mapped_outcomes = mapped_by_course.setdefault(
+                group['assessment_lo__assessment__course_id'], {})
+            outcome_data = mapped_outcomes.get(group['abet_outcome__label'])
+            if outcome_data is None:
+                mapped_outcomes[group['abet_outcome__label']] = {
+                    'score': group['score'],
+                    'status': 'assessed',
+                    'evidence_type': group['evidence_type']
+                }
+            elif group['score'] > outcome_data['score']:
+                outcome_data['score'] = group['score']
+
+        total_possible_outcomes = ABETOutcome.objects.count()
 
+        courses_data = []
+        for course in courses:
             if course.instructor:
                 instructor_name = course.instructor.name
             else:
                 instructor_name = "TBD"
 
-            if assessments.exists():
-                total_scores = []
-                mapped_outcomes = {}
-
-                print(
-                    f"  📖 Analyzing {course.name} with {assessments.count()} assessments...")
-
-                for assessment in assessments:
-                    score_data = AssessmentService.calculate_assessment_score(
-                        assessment.id)
-                    total_scores.append(score_data['total_score'])
-
-                    # FIX: Initialize outcome_scores before the loop
-                    all_outcome_scores = []
-
-                    for learning_outcome in assessment.learning_outcomes.all():
-                        outcome_scores = learning_outcome.outcome_scores.all()
-                        all_outcome_scores.extend(
-                            outcome_scores)  # Collect all scores
-
-                        for outcome_score in outcome_scores:
-                            outcome_label = outcome_score.abet_outcome.label
-                            outcome_score_value = outcome_score.score
-
-                            if outcome_label not in mapped_outcomes:
-                                mapped_outcomes[outcome_label] = {
-                                    'score': outcome_score_value,
-                                    'status': 'assessed',
-                                    'evidence_type': outcome_score.evidence_type
-                                }
-                            else:
-                                if outcome_score_value > mapped_outcomes[outcome_label]['score']:
-                                    mapped_outcomes[outcome_label]['score'] = outcome_score_value
-
-                    # FIX: Use all_outcome_scores which is always defined
-                    print(
-                        f"    Assessment {assessment.name}: Found {len(all_outcome_scores)} outcome scores")
+            scores = total_scores.get(course.id)
+            mapped_outcomes = mapped_by_course.get(course.id, {})
 
+            if scores:
                 # Calculate average assessment score
-                avg_score = sum(total_scores) / \
-                    len(total_scores) if total_scores else 0
-
-                # Get total possible outcomes from database
-                total_possible_outcomes = ABETOutcome.objects.count()
+                avg_score = sum(scores) / len(scores)
                 outcome_coverage_percentage = (
                     len(mapped_outcomes) / max(total_possible_outcomes, 1)) * 100
 
@@ -267,39 +385,51 @@ class AssessmentService:
 
             else:
                 avg_score = 0
-                mapped_outcomes = {}
                 outcomes_list = []
                 status = "needs_assessment"
                 outcome_coverage_percentage = 0
-                total_possible_outcomes = ABETOutcome.objects.count()
 
-            course_data = {
+            courses_data.append({
                 'code': f"COURSE-{course.id}",
                 'name': course.name,
                 'course_name': course.name,
                 'instructor': instructor_name,
                 'instructor_name': instructor_name,
-                'enrollment': enrollment,
+                'enrollment': enrollments.get(course.id, 0),
                 'outcomes': [outcome['label'] for outcome in outcomes_list],
                 'mapped_outcomes': outcomes_list,
                 'outcome_coverage': round(outcome_coverage_percentage, 1),
                 'assessmentScore': round(avg_score, 1),
                 'assessment_score': round(avg_score, 1),
                 'status': status
-            }
-
-            print(f"    ✅ {course.name}: Score={avg_score:.1f}, Outcomes={len(mapped_outcomes)}/{total_possible_outcomes}, Coverage={outcome_coverage_percentage:.1f}%, Status={status}")
-            courses_data.append(course_data)
+            })
 
         print(
             f"✅ Returning {len(courses_data)} courses with enhanced outcome mapping")
         return courses_data
 
     @staticmethod
-    def calculatedynamiccompliancemetrics():
-        """Calculate real-time compliance metrics"""
+    def get_summary_courses(program_id=None):
+        """Courses covered by the assessment summary, in a stable order for paging"""
+        courses = Course.objects.order_by('id')
+        if program_id:
+            courses = courses.filter(program_id=program_id)
+        return courses
+
+    @staticmethod
+    def calculatedynamiccompliancemetrics(program_id=None):
+        """Calculate real-time compliance metrics, for one program when program_id is given"""
         from programs.models import Course, Faculty
 
+        courses = Course.objects.all()
+        assessments = Assessment.objects.all()
+        # Faculty are not tied to a program, count the members of its department
+        faculty = Faculty.objects.all()
+        if program_id:
+            courses = courses.filter(program_id=program_id)
+            assessments = assessments.filter(course__program_id=program_id)
+            faculty = faculty.filter(department__programs__id=program_id)
+
         print("Calculating dynamic compliance metrics...")
 
         # Define status function locally
@@ -314,68 +444,42 @@ class AssessmentService:
                 return 'critical'
 
         # 1. Course Syllabi Updated
-        totalcourses = Course.objects.count()
+        totalcourses = courses.count()
         updatedsyllabi = CourseSyllabus.objects.filter(
+            course__in=courses,
             is_updated=True,
             academic_year='2024-2025'
         ).count()
         syllabipercentage = (updatedsyllabi / max(totalcourses, 1)) * 100
 
         # 2. Assessment Data Collected
-        all_assessments = Assessment.objects.all()
-        if all_assessments.exists():
-            total_score = 0
-            assessment_count = 0
-
-            for assessment in all_assessments:
-                try:
-                    score_data = AssessmentService.calculate_assessment_score(
-                        assessment.id)
-                    if score_data and score_data.get('total_score', 0) > 0:
-                        total_score += score_data['total_score']
-                        assessment_count += 1
-                except Exception as e:
-                    print(
-                        f"Error calculating score for assessment {assessment.id}: {e}")
-                    continue
-
-            if assessment_count > 0:
-                average_score = total_score / assessment_count
-                assessmentpercentage = round(average_score, 1)
-            else:
-                assessmentpercentage = 0
+        all_scores = AssessmentService.calculate_scores_bulk(assessments)
+        scored = [score['total_score']
+                  for score in all_scores.values() if score['total_score'] > 0]
+        assessment_count = len(scored)
+        if assessment_count > 0:
+            assessmentpercentage = round(sum(scored) / assessment_count, 1)
         else:
             assessmentpercentage = 0
 
-        # 3. Student Outcomes Met - ENHANCED WITH DEBUGGING
-        totalabetoutcomes = ABETOutcome.objects.count()
+        # 3. Student Outcomes Met
+        attainment = AssessmentService.get_outcome_attainment(program_id)
+        totalabetoutcomes = len(attainment)
         outcomesmeetingthreshold = 0
 
         print(
             f"📊 Analyzing {totalabetoutcomes} ABET outcomes for compliance...")
 
-        for abetoutcome in ABETOutcome.objects.all():
-            outcomescores = AssessmentLearningOutcome_ABET.objects.filter(
-                abet_outcome=abetoutcome
-            )
-
-            if outcomescores.exists():
-                scores = [score.score for score in outcomescores]
-                avgscore = sum(scores) / len(scores)
-                percentage = (avgscore / 4.0) * 100
-
+        for outcome in attainment:
+            if outcome['count']:
                 print(
-                    f"  📈 {abetoutcome.label} ({abetoutcome.description[:50]}...)")
-                print(f"      Scores: {scores}")
-                print(f"      Average: {avgscore:.2f}/4.0 = {percentage:.1f}%")
+                    f"  📈 {outcome['label']}: {outcome['count']} scores, "
+                    f"average {outcome['mean']:.2f}/4.0 = {outcome['percentage']:.1f}%")
 
-                if percentage >= 75.0:
+                if outcome['percentage'] >= 75.0:
                     outcomesmeetingthreshold += 1
-                    print(f"      ✅ MEETS threshold (≥75%)")
-                else:
-                    print(f"      ❌ Below threshold (<75%)")
             else:
-                print(f"  📊 {abetoutcome.label}: No assessment scores found")
+                print(f"  📊 {outcome['label']}: No assessment scores found")
 
         outcomespercentage = (outcomesmeetingthreshold /
                               max(totalabetoutcomes, 1)) * 100
@@ -383,8 +487,9 @@ class AssessmentService:
             f"📊 FINAL: {outcomesmeetingthreshold}/{totalabetoutcomes} outcomes meet threshold = {outcomespercentage:.1f}%")
 
         # 4. Faculty Training Complete
-        totalfaculty = Faculty.objects.count()
+        totalfaculty = faculty.count()
         trainedfaculty = FacultyTraining.objects.filter(
+            faculty__in=faculty,
             is_completed=True,
             academic_year='2024-2025'
         ).values('faculty').distinct().count()
@@ -402,8 +507,8 @@ class AssessmentService:
             'assessment_data': {
                 'name': 'Assessment Data Collected',
                 'percentage': round(assessmentpercentage, 1),
-                'current': assessment_count if 'assessment_count' in locals() else 0,
-                'total': all_assessments.count() if 'all_assessments' in locals() else 0,
+                'current': assessment_count,
+                'total': len(all_scores),
                 'target': 90,  # Just the number
                 'status': get_status(assessmentpercentage)
             },
@@ -452,8 +557,8 @@ class AssessmentService:
             return "needs_review"
 
     @staticmethod
-    def get_assessment_methods_summary():
-        """Get comprehensive assessment methods compliance summary"""
+    def get_assessment_methods_summary(program_id=None):
+        """Get comprehensive assessment methods compliance summary, optionally for one program"""
         from .models import AssessmentMethod, CourseAssessmentMethod
 
         methods_summary = []
@@ -464,6 +569,8 @@ class AssessmentService:
                 assessment_method=method,
                 semester='Fall 2024'
             )
+            if program_id:
+                course_assessments = course_assessments.filter(course__program_id=program_id)
 
             total_courses = course_assessments.values(
                 'course').distinct().count()
@@ -502,10 +609,8 @@ class AssessmentService:
         return methods_summary
 
     @staticmethod
-    def get_compliance_dashboard_metrics():
-        """Get overall compliance metrics for dashboard"""
-        methods_summary = AssessmentService.get_assessment_methods_summary()
-
+    def summarize_compliance(methods_summary):
+        """Overall, direct and indirect compliance rates for a methods summary"""
         if not methods_summary:
             return {
                 'overall_compliance_rate': 0,
@@ -513,7 +618,6 @@ class AssessmentService:
                 'indirect_assessment_compliance': 0,
                 'total_methods': 0,
                 'compliant_methods': 0,
-                'methods_summary': []
             }
 
         # Calculate overall compliance
@@ -543,44 +647,83 @@ class AssessmentService:
             'indirect_assessment_compliance': round(indirect_compliance, 1),
             'total_methods': total_methods,
             'compliant_methods': compliant_methods,
-            'methods_summary': methods_summary,
-            'compliance_trends': AssessmentService.get_compliance_trends()
         }
 
     @staticmethod
-    def get_compliance_trends():
-        """Get compliance trends over time"""
-        from django.utils import timezone
-        from datetime import timedelta
-
-        # Get compliance data for last 6 months
-        six_months_ago = timezone.now().date() - timedelta(days=180)
-
-        trends = []
-        current_date = six_months_ago
+    def get_compliance_dashboard_metrics():
+        """Get overall compliance metrics for dashboard"""
+        methods_summary = AssessmentService.get_assessment_methods_summary()
 
-        while current_date <= timezone.now().date():
-            month_name = current_date.strftime('%B %Y')
+        return {
+            **AssessmentService.summarize_compliance(methods_summary),
+            'methods_summary': methods_summary,
+            'compliance_trends': AssessmentService.get_compliance_trends(
+                current_summary=methods_summary)
+        }
 
-            # Calculate compliance for this month (simplified)
-            methods_summary = AssessmentService.get_assessment_methods_summary()
-            compliant_methods = sum(
-                1 for method in methods_summary if method['is_compliant'])
-            total_methods = len(methods_summary) if methods_summary else 1
-            compliance_rate = (compliant_methods / total_methods) * 100
+    @staticmethod
+    def record_compliance_snapshot(month=None):
+        """Store the current assessment method compliance as the snapshot of a month"""
+        month = (month or timezone.now().date()).replace(day=1)
+        methods_summary = AssessmentService.get_assessment_methods_summary()
+        summary = AssessmentService.summarize_compliance(methods_summary)
+
+        snapshot, _ = ComplianceSnapshot.objects.update_or_create(
+            month=month,
+            defaults={
+                'compliance_rate': summary['overall_compliance_rate'],
+                'direct_assessment_compliance': summary['direct_assessment_compliance'],
+                'indirect_assessment_compliance': summary['indirect_assessment_compliance'],
+                'compliant_methods': summary['compliant_methods'],
+                'total_methods': summary['total_methods'],
+                'methods_summary': methods_summary,
+            }
+        )
+        return snapshot
 
+    @staticmethod
+    def get_compliance_trends(months=6, max_points=12, current_summary=None):
+        """
+        Get compliance trends over time from the stored monthly snapshots.
+        When current_summary is given and this month has no snapshot yet, the live
+        value is appended as the last point. Ranges longer than max_points are
+        downsampled by averaging consecutive months.
+        """
+        if not 1 <= months <= COMPLIANCE_TRENDS_MAX_MONTHS:
+            raise ValueError(f'months must be between 1 and {COMPLIANCE_TRENDS_MAX_MONTHS}')
+        snapshots = list(ComplianceSnapshot.objects.only(
+            'month', 'compliance_rate').order_by('-month')[:months])
+        snapshots.reverse()
+
+        trends = [{
+            'month': snapshot.month.strftime('%B %Y'),
+            'compliance_rate': round(snapshot.compliance_rate, 1),
+            'date': snapshot.month.isoformat()
+        } for snapshot in snapshots]
+
+        current_month = timezone.now().date().replace(day=1)
+        if current_summary is not None and (not snapshots or snapshots[-1].month < current_month):
+            summary = AssessmentService.summarize_compliance(current_summary)
             trends.append({
-                'month': month_name,
-                'compliance_rate': round(compliance_rate, 1),
-                'date': current_date.isoformat()
+                'month': current_month.strftime('%B %Y'),
+                'compliance_rate': summary['overall_compliance_rate'],
+                'date': current_month.isoformat()
             })
-
-            # Move to next month
-            if current_date.month == 12:
-                current_date = current_date.replace(
-                    year=current_date.year + 1, month=1)
-            else:
-                current_date = current_date.replace(
-                    month=current_date.month + 1)
-
-        return trends[-6:]  # Return last 6 months
+            trends = trends[-months:]
+
+        if len(trends) <= max_points:
+            return trends
+
+        # Downsample long ranges into max_points buckets of consecutive months
+        bucket_size = -(-len(trends) // max_points)
+        downsampled = []
+        for start in range(0, len(trends), bucket_size):
+            bucket = trends[start:start + bucket_size]
+            downsampled.append({
+                'month': bucket[-1]['month'],
+                'compliance_rate': round(
+                    sum(point['compliance_rate'] for point in bucket) / len(bucket), 1),
+                'date': bucket[-1]['date'],
+                'months': len(bucket)
+            })
+        return downsampled
@@ -1,33 +1,133 @@
-from django.db.models.signals import post_save
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
-from .models import AssessmentEvent, ContinuousImprovement, AcademicPerformance, AssessmentLearningOutcome, Assessment
+from .models import (
+    ContinuousImprovement, AcademicPerformance, AssessmentLearningOutcome, Assessment,
+    AssessmentLearningOutcome_ABET, ABETOutcome, CourseSyllabus, FacultyTraining, AssessmentMethod,
+    CourseAssessmentMethod, ComplianceSnapshot
+)
 from .services import AssessmentService
+from .snapshots import invalidate_snapshots
+from .utilsLog.event_logger import queue_assessment_event
+from programs.models import Course, CourseStudent, Department, Faculty, Program
+
+_pending_scores = threading.local()
 
 def calculate_overall_abet_score():
-    assessment_ids = Assessment.objects.values_list('id', flat=True)
-    all_scores = []
-    for assessment_id in assessment_ids:
-        try:
-            assessment_result = AssessmentService.calculate_assessment_score(assessment_id)
-            all_scores.append(assessment_result.get('total_score', 0))
-        except Exception:
-            pass
-    return round(sum(all_scores) / len(all_scores), 2) if all_scores else 0.0
+    return AssessmentService.get_average_score()
 
 @receiver(post_save, sender=ContinuousImprovement)
 def ci_event(sender, instance, created, **kwargs):
     user = getattr(instance, '_current_user', None)
-    if user and user.is_authenticated:
-        overall_score = AssessmentService.get_average_score()
-        AssessmentEvent.objects.create(
-            assessment_id=instance.assessment_id.id,
-            assessment_name=f"{instance.assessment_id.name} - Continuous Improvement",
-            event_type='UPDATE',
-            score=overall_score,
-            average_score_at_time=overall_score,
-            user=user
+    if created and user and user.is_authenticated:
+        # Queued in the outbox, the flusher records the overall score of its batch
+        queue_assessment_event(
+            instance.assessment_id,
+            f"{instance.assessment.name} - Continuous Improvement",
+            'UPDATE',
+            user
         )
+        instance._event_queued = True
+
+
+# Keep the materialized AssessmentScore rows in sync with their components
+
+def _flush_score_refreshes():
+    pending = getattr(_pending_scores, 'items', None)
+    if not pending:
+        return
+    _pending_scores.items = {}
+    for assessment_id, components in pending.items():
+        AssessmentService.refresh_assessment_score(assessment_id, components)
+
+
+def schedule_score_refresh(assessment_id, component):
+    """
+    Queue a refresh of one score component until the current transaction commits.
+    Several writes to the same assessment (e.g. a cascade delete of all its ABET
+    scores) are collapsed into a single refresh.
+    """
+    if assessment_id is None:
+        return
+    pending = getattr(_pending_scores, 'items', None)
+    if pending is None:
+        pending = _pending_scores.items = {}
+    pending.setdefault(assessment_id, set()).add(component)
+    transaction.on_commit(_flush_score_refreshes)
+
+
+# Score component models and the FK that ties each row to its assessment
+# (AssessmentLearningOutcome_ABET only reaches it through its learning outcome).
+# Queryset .update() and bulk writes bypass these signals, code doing those has to
+# refresh the scores itself (AssessmentService.refresh_assessment_score or
+# store_scores_bulk, as the importers do).
+SCORE_COMPONENTS = {
+    ContinuousImprovement: ('assessment_id', 'ci'),
+    # The FK on AcademicPerformance is named assessment_id, so its column is assessment_id_id
+    AcademicPerformance: ('assessment_id_id', 'ap'),
+    AssessmentLearningOutcome: ('assessment_id', 'lo'),
+    AssessmentLearningOutcome_ABET: ('assessment_lo_id', 'lo'),
+}
+
+
+def _assessment_of(sender, instance):
+    if sender is AssessmentLearningOutcome_ABET:
+        return instance.assessment_lo.assessment_id
+    return getattr(instance, SCORE_COMPONENTS[sender][0])
+
+
+def _previous_assessment(sender, parent_id):
+    if sender is not AssessmentLearningOutcome_ABET:
+        return parent_id
+    return AssessmentLearningOutcome.objects.filter(
+        pk=parent_id).values_list('assessment_id', flat=True).first()
+
+
+def remember_score_parent(sender, instance, **kwargs):
+    # Only when loaded, reading a deferred field here would cost a query per row
+    instance._score_parent = instance.__dict__.get(SCORE_COMPONENTS[sender][0])
+
+
+def score_component_saved(sender, instance, created, **kwargs):
+    attname, component = SCORE_COMPONENTS[sender]
+    schedule_score_refresh(_assessment_of(sender, instance), component)
+    previous = None if created else getattr(instance, '_score_parent', None)
+    if previous is not None and previous != getattr(instance, attname):
+        # Moved to another assessment, the one it left needs a refresh too
+        schedule_score_refresh(_previous_assessment(sender, previous), component)
+    instance._score_parent = getattr(instance, attname)
+
+
+def score_component_deleted(sender, instance, **kwargs):
+    try:
+        assessment_id = _assessment_of(sender, instance)
+    except AssessmentLearningOutcome.DoesNotExist:
+        # Parent learning outcome is being deleted, its own signal refreshes the score
+        return
+    schedule_score_refresh(assessment_id, SCORE_COMPONENTS[sender][1])
+
+
+for model in SCORE_COMPONENTS:
+    post_init.connect(remember_score_parent, sender=model)
+    post_save.connect(score_component_saved, sender=model)
+    post_delete.connect(score_component_deleted, sender=model)
+
+
+# Models whose rows end up in the dashboard snapshots
+DASHBOARD_SOURCE_MODELS = [
+    Assessment, ContinuousImprovement, AcademicPerformance, AssessmentLearningOutcome,
+    AssessmentLearningOutcome_ABET, ABETOutcome, CourseSyllabus, FacultyTraining,
+    AssessmentMethod, CourseAssessmentMethod, ComplianceSnapshot,
+    Course, CourseStudent, Department, Faculty, Program,
+]
+
 
+def dashboard_data_changed(sender, **kwargs):
+    invalidate_snapshots()
 
 
-#         )
+for model in DASHBOARD_SOURCE_MODELS:
+    post_save.connect(dashboard_data_changed, sender=model)
+    post_delete.connect(dashboard_data_changed, sender=model)
@@ -0,0 +1,92 @@
+"""
+Single-flight execution of expensive computations.
+
+Concurrent calls with the same key share one run: inside a process the
+followers wait on the leader's thread, across processes a cache lock elects
+one leader and the others poll the cache until its result shows up.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+LOCK_KEY = 'singleflight:lock:{key}'
+RESULT_KEY = 'singleflight:result:{key}'
+
+_calls_lock = threading.Lock()
+_calls = {}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def single_flight(key, fn, result_key=None, result_timeout=30):
+    """
+    Run fn() once for all concurrent callers using the same key and return its result.
+    The result is published in the cache under result_key (kept for result_timeout
+    seconds) so waiting processes can pick it up; fn must not return None.
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        is_leader = call is None
+        if is_leader:
+            call = _calls[key] = _Call()
+
+    if not is_leader:
+        if not call.done.wait(_setting('SINGLE_FLIGHT_WAIT_TIMEOUT', 60)):
+            # The leader is stuck, don't keep the request hanging forever
+            return fn()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _run_across_processes(
+            key, fn, result_key or RESULT_KEY.format(key=key), result_timeout)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
+
+
+def _run_across_processes(key, fn, result_key, result_timeout):
+    lock_key = LOCK_KEY.format(key=key)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + _setting('SINGLE_FLIGHT_WAIT_TIMEOUT', 60)
+    poll_interval = _setting('SINGLE_FLIGHT_POLL_INTERVAL', 0.1)
+
+    while time.monotonic() < deadline:
+        result = cache.get(result_key)
+        if result is not None:
+            return result
+
+        if cache.add(lock_key, token, _setting('SINGLE_FLIGHT_LOCK_TIMEOUT', 120)):
+            try:
+                # Another leader may have finished between our read and the lock
+                result = cache.get(result_key)
+                if result is None:
+                    result = fn()
+                    cache.set(result_key, result, result_timeout)
+                return result
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+
+        time.sleep(poll_interval)
+
+    # Whoever holds the lock is taking too long, compute it ourselves
+    return fn()
@@ -0,0 +1,170 @@
+"""
+Cached snapshots of expensive dashboard payloads.
+
+Every snapshot is stored in Django's cache under the current data version.
+Writes to the models that feed the dashboards bump the version (see signals.py),
+so the next read misses and rebuilds. With DASHBOARD_SNAPSHOT_MAX_STALENESS set
+the previous payload keeps being served, marked stale, during that rebuild.
+Only plain get/set/add/incr are used, so any cache backend works
+(LocMem, file based, Redis, ...).
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .singleflight import single_flight
+
+DATA_VERSION_KEY = 'dashboard:data-version'
+SNAPSHOT_KEY = 'dashboard:snapshot:{name}:v{version}'
+# Last good build of a snapshot regardless of version, served while rebuilding
+LATEST_KEY = 'dashboard:snapshot:{name}:latest'
+# When a data version was replaced by the next one, i.e. since when its snapshots are stale
+SUPERSEDED_AT_KEY = 'dashboard:data-version:{version}:superseded-at'
+
+logger = logging.getLogger(__name__)
+
+_pending_bump = threading.local()
+_refreshing_lock = threading.Lock()
+_refreshing = set()
+
+
+def _snapshot_timeout():
+    return getattr(settings, 'DASHBOARD_SNAPSHOT_TIMEOUT', 60 * 60)
+
+
+def _max_staleness():
+    return getattr(settings, 'DASHBOARD_SNAPSHOT_MAX_STALENESS', 0)
+
+
+def get_data_version():
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        # Start from the clock instead of 1 so an evicted counter can never
+        # come back to a version that still has snapshots stored under it
+        cache.add(DATA_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    try:
+        version = cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        # Counter is missing (first write or evicted), a fresh one is already newer
+        return get_data_version()
+    cache.set(SUPERSEDED_AT_KEY.format(version=version - 1), time.time(), _snapshot_timeout())
+    return version
+
+
+def _stale_since(entry):
+    """
+    When the data behind entry changed. Falls back to its build time when the
+    bump was not recorded (evicted, or the counter itself was reset).
+    """
+    superseded_at = cache.get(SUPERSEDED_AT_KEY.format(version=entry['version']))
+    return superseded_at if superseded_at is not None else entry['built_at']
+
+
+def _flush_data_version_bump():
+    if getattr(_pending_bump, 'pending', False):
+        _pending_bump.pending = False
+        bump_data_version()
+
+
+def invalidate_snapshots():
+    """
+    Bump the data version once the current transaction commits.
+    Bumping before the commit would let a reader rebuild from the old rows
+    and store them under the new version.
+    """
+    _pending_bump.pending = True
+    transaction.on_commit(_flush_data_version_bump)
+
+
+def _rebuild(name, builder, version):
+    """Build the snapshot for the given version, sharing concurrent builds"""
+    key = SNAPSHOT_KEY.format(name=name, version=version)
+
+    def build_entry():
+        entry = {'version': version, 'built_at': time.time(),
+                 'payload': builder()}
+        latest = cache.get(LATEST_KEY.format(name=name))
+        if latest is None or latest['version'] <= version:
+            cache.set(LATEST_KEY.format(name=name), entry, timeout=None)
+        return entry
+
+    return single_flight(key, build_entry, result_key=key, result_timeout=_snapshot_timeout())
+
+
+def _rebuild_in_background(name, builder, version):
+    key = SNAPSHOT_KEY.format(name=name, version=version)
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            _rebuild(name, builder, version)
+        except Exception:
+            logger.exception("Background rebuild of snapshot %s failed", name)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+            connection.close()
+
+    threading.Thread(target=run, name=f'snapshot-{name}', daemon=True).start()
+
+
+def _snapshot_meta(entry, stale):
+    return {
+        'version': entry['version'],
+        'built_at': datetime.fromtimestamp(entry['built_at'], tz=dt_timezone.utc).isoformat(),
+        'age': round(max(time.time() - entry['built_at'], 0), 1),
+        'stale': stale,
+    }
+
+
+def get_snapshot_entry(name, builder):
+    """
+    Return (payload, meta) for the named snapshot.
+    On a miss the last good payload is served as stale while a background thread
+    rebuilds it, unless the data changed more than DASHBOARD_SNAPSHOT_MAX_STALENESS
+    seconds ago (or there is none), in which case the rebuild happens synchronously.
+    Concurrent builds are shared (see singleflight.py).
+    """
+    version = get_data_version()
+    entry = cache.get(SNAPSHOT_KEY.format(name=name, version=version))
+
+    if entry is None:
+        latest = cache.get(LATEST_KEY.format(name=name))
+        max_staleness = _max_staleness()
+
+        if latest is not None and latest['version'] == version:
+            entry = latest
+        elif (latest is not None and max_staleness > 0
+              and time.time() - _stale_since(latest) <= max_staleness):
+            _rebuild_in_background(name, builder, version)
+            return latest['payload'], _snapshot_meta(latest, stale=True)
+        else:
+            entry = _rebuild(name, builder, version)
+
+    return entry['payload'], _snapshot_meta(entry, stale=False)
+
+
+def get_snapshot(name, builder):
+    """Return only the payload of the named snapshot"""
+    return get_snapshot_entry(name, builder)[0]
+
+
+def snapshot_headers(meta):
+    """HTTP headers describing how old a served snapshot is"""
+    return {
+        'Age': str(int(meta['age'])),
+        'X-Snapshot-Stale': 'true' if meta['stale'] else 'false',
+    }
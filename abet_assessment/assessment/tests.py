@@ -1,3 +1,585 @@
-from django.test import TestCase
+import datetime
+import io
+import threading
+import time
 
-# Create your tests here.
+import openpyxl
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from assessment import metrics
+from assessment.models import (
+    AcademicPerformance, Assessment, AssessmentEvent, AssessmentEventOutbox, AssessmentLearningOutcome,
+    AssessmentLearningOutcome_ABET, AssessmentScore, AuditLog, ComplianceSnapshot, ContinuousImprovement
+)
+from assessment.services import COMPLIANCE_TRENDS_MAX_MONTHS, AssessmentService
+from assessment.signals import DASHBOARD_SOURCE_MODELS
+from assessment.singleflight import LOCK_KEY, _run_across_processes, single_flight
+from assessment.snapshots import (
+    LATEST_KEY, SUPERSEDED_AT_KEY, bump_data_version, get_data_version, get_snapshot_entry
+)
+from assessment.utilsLog import event_logger
+from assessment.views import build_dashboard_stats
+from programs.models import Program
+
+# Query budgets for the hot assessment endpoints, see conftest.py.
+# The same number of queries must be issued for 2 and 8 courses.
+
+
+def test_dashboard_stats_query_budget(assert_query_budget):
+    assert_query_budget('/api/dashboard-stats/', budget=30)
+
+
+def test_course_assessment_summary_query_budget(assert_query_budget):
+    assert_query_budget('/api/course-assessment-summary/?page_size=5', budget=12)
+
+
+def test_assessment_list_query_budget(assert_query_budget):
+    assert_query_budget('/api/assessments/', budget=5)
+
+
+def test_audit_log_list_query_budget(assert_query_budget):
+    assert_query_budget('/api/audit-logs/', budget=5)
+
+
+def test_audit_log_cursor_walks_every_row_once(dataset, api_client):
+    dataset.grow(4)
+    # Rows sharing a timestamp must still be ordered and paged by id
+    AuditLog.objects.update(timestamp=timezone.now())
+    expected = list(AuditLog.objects.order_by('-id').values_list('id', flat=True))
+
+    seen, url = [], '/api/audit-logs/?page_size=3'
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == 200
+        assert len(response.data['results']) <= 3
+        seen.extend(row['id'] for row in response.data['results'])
+        url = response.data['next']
+    assert seen == expected
+
+
+def test_audit_log_filters(dataset, api_client):
+    dataset.grow(2)
+    log = AuditLog.objects.order_by('id').first()
+    AuditLog.objects.filter(pk=log.pk).update(timestamp=timezone.now() - datetime.timedelta(days=30))
+    since = (timezone.now() - datetime.timedelta(days=1)).date().isoformat()
+
+    response = api_client.get(f'/api/audit-logs/?user={log.user.username}')
+    assert [row['id'] for row in response.data['results']] == list(
+        AuditLog.objects.filter(user=log.user).order_by('-id').values_list('id', flat=True))
+
+    response = api_client.get(f'/api/audit-logs/?since={since}')
+    assert log.id not in [row['id'] for row in response.data['results']]
+
+    response = api_client.get(f'/api/audit-logs/?until={since}&user={log.user_id}')
+    assert [row['id'] for row in response.data['results']] == [log.id]
+
+
+def test_invalid_cursor_is_not_found(api_client):
+    assert api_client.get('/api/assessment-events/?cursor=bm9wZQ').status_code == 404
+
+
+def test_audit_log_target_names(dataset, api_client):
+    dataset.grow(2)
+    stored, legacy, deleted = AuditLog.objects.order_by('id')[:3]
+    AuditLog.objects.filter(pk=stored.pk).update(target_label='Stored label')
+    Assessment.objects.filter(pk=deleted.target_id).delete()
+
+    names = {row['id']: row['target_name'] for row in api_client.get('/api/audit-logs/').data['results']}
+    assert names[stored.id] == 'Stored label'
+    assert names[legacy.id] == Assessment.objects.get(pk=legacy.target_id).name
+    assert names[deleted.id] == f'Assessment #{deleted.target_id}'
+
+
+def upload(name, content):
+    return SimpleUploadedFile(name, content if isinstance(content, bytes) else content.encode())
+
+
+def test_import_academic_performance_csv(dataset, api_client):
+    dataset.grow(1)
+    assessment = Assessment.objects.first()
+    before = AcademicPerformance.objects.count()
+    csv = ('Assessment ID,Assessment Type,High,Mean,Low,Grade,Weight,Description\n'
+           f'{assessment.id},Final,95,70,30,72,4,Final exam\n'
+           '\n'
+           f'{assessment.id},Quiz,10,7,3,80,1,\n')
+
+    response = api_client.post('/api/imports/academic-performance/',
+                               {'file': upload('grades.csv', csv)}, format='multipart')
+
+    assert response.status_code == 200, response.data
+    assert response.data['created'] == 2
+    assert AcademicPerformance.objects.count() == before + 2
+    created = AcademicPerformance.objects.get(assessmentType='Final')
+    assert created.course_id == assessment.course_id
+    assert created.instructor_id == assessment.course.instructor_id
+    # bulk_create skips the signals, the import refreshes the stored score itself
+    assert AssessmentScore.objects.get(assessment=assessment).ap_weight_sum == 3 + 4 + 1
+
+
+def test_import_rejects_the_whole_file_and_reports_rows(dataset, api_client):
+    dataset.grow(1)
+    assessment = Assessment.objects.first()
+    before = AcademicPerformance.objects.count()
+    csv = ('assessment_id,assessment_type,high,mean,low,grade,weight\n'
+           f'{assessment.id},Final,95,70,30,72,4\n'
+           f'999999,Final,95,70,30,72,4\n'
+           f'{assessment.id},Final,50,70,30,abc,4\n')
+
+    response = api_client.post('/api/imports/academic-performance/',
+                               {'file': upload('grades.csv', csv)}, format='multipart')
+
+    assert response.status_code == 400
+    assert not response.data['committed']
+    assert {(error['row'], error['column']) for error in response.data['errors']} == {
+        (3, 'assessment_id'), (4, 'grade'), (4, 'mean')}
+    assert AcademicPerformance.objects.count() == before
+
+
+def test_import_rejects_numbers_that_do_not_fit(dataset, api_client):
+    dataset.grow(1)
+    assessment = Assessment.objects.first()
+    csv = ('assessment_id,assessment_type,high,mean,low,grade,weight\n'
+           'inf,Final,95,70,30,72,4\n'
+           '1e30,Final,95,70,30,72,4\n'
+           f'{assessment.id},Final,95,70,30,-inf,4\n'
+           f'{assessment.id},Final,95,70,30,72,99999999999999999999\n')
+
+    response = api_client.post('/api/imports/academic-performance/',
+                               {'file': upload('grades.csv', csv)}, format='multipart')
+
+    assert response.status_code == 400
+    assert {(error['row'], error['column'], error['message']) for error in response.data['errors']} == {
+        (2, 'assessment_id', 'Out of range'), (3, 'assessment_id', 'Out of range'),
+        (4, 'grade', 'Out of range'), (5, 'weight', 'Out of range')}
+
+
+def test_import_abet_scores_and_questions_from_workbooks(dataset, api_client):
+    dataset.grow(1)
+    learning_outcome = AssessmentLearningOutcome.objects.first()
+    performance = AcademicPerformance.objects.first()
+
+    def workbook(rows):
+        wb = openpyxl.Workbook()
+        for row in rows:
+            wb.active.append(row)
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue()
+
+    scores = workbook([('Learning Outcome', 'ABET Outcome', 'Score', 'Evidence Type'),
+                       (learning_outcome.pk, 'so5', 4, 'Indirect'),
+                       (learning_outcome.pk, 'SO6', 2, None)])
+    response = api_client.post('/api/imports/abet-scores/',
+                               {'file': upload('scores.xlsx', scores)}, format='multipart')
+    assert response.status_code == 200, response.data
+    imported = learning_outcome.outcome_scores.filter(abet_outcome__label__in=['SO5', 'SO6'])
+    assert sorted(imported.values_list('score', 'evidence_type', 'level_description')) == [
+        (2, 'direct', 'Approaching Expectations'), (4, 'indirect', 'Exceeds Expectations')]
+
+    questions = workbook([('academic_performance_id', 'question_no', 'question_text', 'weight', 'mapped_outcomes'),
+                          (performance.pk, 3, 'Design a circuit', 40, 'SO1, SO2'),
+                          (performance.pk, None, 'Explain the result', 60, 'SO3')])
+    response = api_client.post('/api/imports/assessment-questions/',
+                               {'file': upload('questions.xlsx', questions)}, format='multipart')
+    assert response.status_code == 200, response.data
+    assert [(q.question_no, sorted(o.label for o in q.mapped_outcomes.all()))
+            for q in performance.questions.order_by('question_no')] == [
+        (3, ['SO1', 'SO2']), (4, ['SO3'])]
+
+
+def test_export_assessments_workbook(dataset, api_client):
+    dataset.grow(2)
+    Assessment.objects.filter(pk=Assessment.objects.order_by('id').first().pk).update(
+        date=datetime.date(2023, 10, 1))
+
+    response = api_client.get('/api/exports/assessments/?academic_year=2024-2025'
+                              f'&program_id={dataset.program.id}')
+
+    assert response.status_code == 200
+    assert response['Content-Disposition'].endswith(f'program-{dataset.program.id}-2024-2025.xlsx"')
+    workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+    sheets = {sheet.title: list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets}
+    assert len(sheets['Assessments']) == 1 + 3
+    assert len(sheets['Outcome Scores']) == 1 + 3 * 3
+    assert api_client.get('/api/exports/assessments/?academic_year=2024').status_code == 400
+
+
+@pytest.mark.parametrize('academic_year', ['0-1', '9999-10000'])
+def test_export_rejects_years_outside_the_calendar(api_client, academic_year):
+    response = api_client.get(f'/api/exports/assessments/?academic_year={academic_year}')
+
+    assert response.status_code == 400
+
+
+def _create_component(kind, assessment, dataset):
+    if kind == 'ci':
+        return ContinuousImprovement.objects.create(
+            action_taken='Tutoring', implementation_date=datetime.date(2024, 11, 1),
+            effectiveness_measure='Survey', weight=4, score=50, assessment=assessment)
+    if kind == 'ap':
+        return AcademicPerformance.objects.create(
+            assessmentType='Quiz', high=100, mean=60, low=10, grade=30, weight=5,
+            course_id=assessment.course_id, instructor_id=0, description='Quiz', assessment_id=assessment)
+    if kind == 'lo':
+        row = AssessmentLearningOutcome.objects.create(
+            description='Communicate', program_id=dataset.program.id, assessment=assessment)
+        AssessmentLearningOutcome_ABET.objects.create(
+            assessment_lo=row, abet_outcome=dataset.outcomes[3], score=1, evidence_type='direct')
+        return row
+    return AssessmentLearningOutcome_ABET.objects.create(
+        assessment_lo=assessment.learning_outcomes.get(), abet_outcome=dataset.outcomes[3], score=1,
+        evidence_type='direct')
+
+
+def _update_component(kind, row):
+    if kind == 'ci':
+        row.score = 95
+    elif kind == 'ap':
+        row.grade = 99
+    elif kind == 'lo':
+        row.outcome_scores.update(score=4)
+    else:
+        row.score = 4
+
+
+def _move_component(kind, row, assessment):
+    if kind == 'ap':
+        row.assessment_id = assessment
+    elif kind == 'abet':
+        row.assessment_lo = assessment.learning_outcomes.get()
+    else:
+        row.assessment = assessment
+
+
+def _assert_stored_scores_match(*assessments):
+    fresh = AssessmentService._build_score_rows(Assessment.objects.filter(id__in=[a.id for a in assessments]))
+    for assessment in assessments:
+        stored = AssessmentScore.objects.get(assessment=assessment)
+        for field in ('ci_score_sum', 'ci_weight_sum', 'ap_score_sum', 'ap_weight_sum',
+                      'lo_score_sum', 'lo_weight_sum', 'total_score'):
+            assert getattr(stored, field) == pytest.approx(getattr(fresh[assessment.id], field)), field
+
+
+@pytest.mark.parametrize('kind', ['ci', 'ap', 'lo', 'abet'])
+def test_stored_scores_follow_component_writes(dataset, django_capture_on_commit_callbacks, kind):
+    dataset.grow(1)
+    first, second = Assessment.objects.order_by('id')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        row = _create_component(kind, first, dataset)
+    _assert_stored_scores_match(first, second)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        _update_component(kind, row)
+        row.save()
+    _assert_stored_scores_match(first, second)
+
+    # Reassigning the FK of a row loaded from the database refreshes the assessment it left too
+    moved_from = AssessmentScore.objects.get(assessment=first).total_score
+    with django_capture_on_commit_callbacks(execute=True):
+        row = type(row).objects.get(pk=row.pk)
+        _move_component(kind, row, second)
+        row.save()
+    _assert_stored_scores_match(first, second)
+    assert AssessmentScore.objects.get(assessment=first).total_score != moved_from
+
+    with django_capture_on_commit_callbacks(execute=True):
+        row.delete()
+    _assert_stored_scores_match(first, second)
+
+
+def test_bulk_scores_read_stored_rows_and_fall_back_to_components(dataset):
+    dataset.grow(2)
+    first, *others = Assessment.objects.order_by('id')
+    fresh = AssessmentService._build_score_rows(Assessment.objects.all())
+    AssessmentScore.objects.filter(assessment=first).delete()
+    AssessmentScore.objects.filter(assessment=others[0]).update(total_score=12.5)
+
+    scores = AssessmentService.calculate_scores_bulk()
+    assert scores[first.id]['total_score'] == pytest.approx(fresh[first.id].total_score)
+    assert scores[others[0].id]['total_score'] == 12.5
+    assert set(scores) == {first.id, *(a.id for a in others)}
+    assert set(AssessmentService.calculate_scores_bulk(Assessment.objects.order_by('id')[:2])) == {
+        first.id, others[0].id}
+
+
+def test_saving_dashboard_source_models_invalidates_snapshot(dataset, django_capture_on_commit_callbacks):
+    dataset.grow(1)
+    builds = []
+
+    def builder():
+        builds.append(1)
+        return build_dashboard_stats()
+
+    payload, meta = get_snapshot_entry('dashboard-stats', builder)
+    assert get_snapshot_entry('dashboard-stats', builder)[1]['version'] == meta['version']
+    assert len(builds) == 1
+
+    saved = 0
+    for model in DASHBOARD_SOURCE_MODELS:
+        instance = model.objects.first()
+        if instance is None:
+            continue
+        version = get_data_version()
+        with django_capture_on_commit_callbacks(execute=True):
+            instance.save()
+        assert get_data_version() > version, model.__name__
+        saved += 1
+    assert saved >= 8
+
+    # The bump waits for the commit, uncommitted writes leave the version alone
+    version = get_data_version()
+    with django_capture_on_commit_callbacks(execute=False):
+        Program.objects.create(name='Rolled back', description='', department=dataset.department)
+    assert get_data_version() == version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Program.objects.create(name='Civil Engineering', description='Bachelor', department=dataset.department)
+    rebuilt, rebuilt_meta = get_snapshot_entry('dashboard-stats', builder)
+    assert len(builds) == 2 and not rebuilt_meta['stale']
+    assert rebuilt['programs'] == payload['programs'] + 2
+
+
+def _run_concurrently(target, count):
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_single_flight_shares_one_build(settings):
+    settings.SINGLE_FLIGHT_POLL_INTERVAL = 0.01
+    release, runs = threading.Event(), []
+
+    def build():
+        runs.append(1)
+        release.wait(5)
+        return {'built': len(runs)}
+
+    threads, results, errors = _run_concurrently(lambda: single_flight('test-build', build), 8)
+    # Let every caller reach the wait before the leader finishes
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert not errors and len(runs) == 1
+    assert results == [{'built': 1}] * 8
+
+    # Across processes the cache lock elects the leader, the others poll for the result
+    runs.clear()
+    threads, results, errors = _run_concurrently(
+        lambda: _run_across_processes('test-processes', build, 'test-processes-result', 30), 4)
+    for thread in threads:
+        thread.join(5)
+    assert not errors and len(runs) == 1 and results == [{'built': 1}] * 4
+
+
+def test_single_flight_failing_leader_releases_the_lock(settings):
+    settings.SINGLE_FLIGHT_POLL_INTERVAL = 0.01
+    release = threading.Event()
+
+    def failing_build():
+        release.wait(5)
+        raise RuntimeError('build failed')
+
+    threads, results, errors = _run_concurrently(lambda: single_flight('test-fail', failing_build), 4)
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert not results and len(errors) == 4
+    assert all(str(error) == 'build failed' for error in errors)
+    assert cache.get(LOCK_KEY.format(key='test-fail')) is None
+
+    # The next caller leads a fresh build instead of waiting on the failed one
+    assert single_flight('test-fail', lambda: 'ok') == 'ok'
+
+
+def test_stale_snapshot_is_served_while_rebuilt_in_background(settings):
+    settings.DASHBOARD_SNAPSHOT_MAX_STALENESS = 60
+    builds = []
+
+    def builder():
+        builds.append(1)
+        return {'build': len(builds)}
+
+    assert get_snapshot_entry('test-stale', builder)[0] == {'build': 1}
+    # A long quiet period: the snapshot is old, but the data only changes now
+    latest = cache.get(LATEST_KEY.format(name='test-stale'))
+    cache.set(LATEST_KEY.format(name='test-stale'), {**latest, 'built_at': latest['built_at'] - 3600}, None)
+    bump_data_version()
+
+    payload, meta = get_snapshot_entry('test-stale', builder)
+    assert payload == {'build': 1} and meta['stale']
+    for thread in threading.enumerate():
+        if thread.name == 'snapshot-test-stale':
+            thread.join(5)
+    payload, meta = get_snapshot_entry('test-stale', builder)
+    assert payload == {'build': 2} and not meta['stale']
+
+    # Changed longer ago than the limit: rebuilt before answering
+    bump_data_version()
+    cache.set(SUPERSEDED_AT_KEY.format(version=get_data_version() - 1), time.time() - 120)
+    payload, meta = get_snapshot_entry('test-stale', builder)
+    assert payload == {'build': 3} and not meta['stale']
+
+
+def _months_ago(count):
+    month = timezone.now().date().replace(day=1)
+    for _ in range(count):
+        month = (month - datetime.timedelta(days=1)).replace(day=1)
+    return month
+
+
+def test_record_compliance_snapshot_once_per_month(db):
+    first = AssessmentService.record_compliance_snapshot(datetime.date(2024, 3, 17))
+    again = AssessmentService.record_compliance_snapshot(datetime.date(2024, 3, 2))
+    assert first.pk == again.pk and again.month == datetime.date(2024, 3, 1)
+
+    call_command('record_compliance_snapshot', '--month', '2024-04', stdout=io.StringIO())
+    assert list(ComplianceSnapshot.objects.order_by('month').values_list('month', flat=True)) == [
+        datetime.date(2024, 3, 1), datetime.date(2024, 4, 1)]
+
+
+def test_compliance_trends_from_snapshots(db):
+    for count in range(1, 25):
+        ComplianceSnapshot.objects.create(month=_months_ago(count), compliance_rate=count)
+
+    trends = AssessmentService.get_compliance_trends(months=3)
+    assert [point['compliance_rate'] for point in trends] == [3, 2, 1]
+    assert trends[-1]['date'] == _months_ago(1).isoformat()
+
+    # The live value stands in for the current month until it is recorded
+    trends = AssessmentService.get_compliance_trends(months=3, current_summary=[])
+    assert [point['compliance_rate'] for point in trends] == [2, 1, 0]
+
+    trends = AssessmentService.get_compliance_trends(months=24)
+    assert len(trends) == 12 and all(point['months'] == 2 for point in trends)
+    assert trends[0]['compliance_rate'] == 23.5
+
+    with pytest.raises(ValueError):
+        AssessmentService.get_compliance_trends(months=0)
+
+
+def test_compliance_dashboard_months_parameter(api_client):
+    for count in range(1, 13):
+        ComplianceSnapshot.objects.create(month=_months_ago(count), compliance_rate=50)
+
+    response = api_client.get('/api/compliance-dashboard/?months=12')
+    assert response.status_code == 200 and len(response.data['trends']) == 12
+    for months in ('0', '-1', 'abc', str(COMPLIANCE_TRENDS_MAX_MONTHS + 1)):
+        assert api_client.get(f'/api/compliance-dashboard/?months={months}').status_code == 400, months
+
+
+def test_queued_events_request_a_flush_on_commit(admin_user, settings, monkeypatch,
+                                                 django_capture_on_commit_callbacks):
+    settings.ASSESSMENT_EVENT_BACKGROUND_FLUSH = True
+    requested = []
+    monkeypatch.setattr(event_logger, '_request_flush', lambda: requested.append(1))
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        event_logger.queue_assessment_event(1, 'Midterm', 'CREATE', admin_user, score=80)
+        event_logger.queue_assessment_event(2, 'Final', 'UPDATE', admin_user)
+        # Nothing is flushed before the transaction commits
+        assert not requested and AssessmentEventOutbox.objects.count() == 2
+    assert len(callbacks) == 2 and len(requested) == 2
+    assert not AssessmentEvent.objects.exists()
+
+
+def test_flush_event_outbox_moves_batches_and_retries_after_errors(dataset, monkeypatch):
+    dataset.grow(1)
+    for n in range(5):
+        event_logger.queue_assessment_event(n, f'Assessment {n}', 'CREATE', dataset.author,
+                                            score=70 if n == 0 else None)
+
+    original_bulk_create = AssessmentEvent.objects.bulk_create
+
+    def failing_bulk_create(*args, **kwargs):
+        raise RuntimeError('database went away')
+
+    monkeypatch.setattr(AssessmentEvent.objects, 'bulk_create', failing_bulk_create)
+    with pytest.raises(RuntimeError):
+        event_logger.flush_event_outbox(batch_size=2)
+    # The failed batch was rolled back and is still queued
+    assert AssessmentEventOutbox.objects.count() == 5 and not AssessmentEvent.objects.exists()
+
+    monkeypatch.setattr(AssessmentEvent.objects, 'bulk_create', original_bulk_create)
+    assert event_logger.flush_event_outbox(batch_size=2) == 5
+    # Delivered rows are deleted from the outbox
+    assert not AssessmentEventOutbox.objects.exists()
+    events = list(AssessmentEvent.objects.order_by('assessment_id'))
+    average = AssessmentService.get_average_score()
+    assert [event.assessment_id for event in events] == [0, 1, 2, 3, 4]
+    assert events[0].score == 70
+    assert all(event.score == event.average_score_at_time == average for event in events[1:])
+    assert event_logger.flush_event_outbox() == 0
+
+
+@pytest.fixture
+def clean_metrics():
+    metrics.reset_local()
+    yield
+    metrics.reset_local()
+
+
+def test_query_metrics_middleware_records_requests(dataset, admin_user, settings, clean_metrics):
+    settings.REQUEST_METRICS_ENABLED = True
+    dataset.grow(1)
+    # The middleware chain is built on the first request of a new client
+    client = APIClient()
+    client.force_authenticate(admin_user)
+    client.get('/api/assessments/')
+    client.get('/api/assessments/')
+
+    stats = metrics.local_metrics()['assessment-list']
+    assert stats['count'] == 2
+    assert stats['sum']['queries'] > 0 and stats['sum']['response_bytes'] > 0
+    assert sum(stats['histogram']['queries']) == 2
+
+
+def test_metrics_summary_percentiles_and_order(clean_metrics):
+    for queries in (1, 1, 1, 40):
+        metrics.record_request('busy', queries=queries, db_ms=1, python_ms=1, response_bytes=10)
+    metrics.record_request('quiet', queries=0, db_ms=0, python_ms=0, response_bytes=0)
+
+    busy, quiet = metrics.summarize(metrics.local_metrics(), sort_by='queries')
+    assert (busy['endpoint'], quiet['endpoint']) == ('busy', 'quiet')
+    assert busy['queries']['avg'] == 10.75 and busy['queries']['max'] == 40
+    assert busy['queries']['p50'] == 1 and busy['queries']['p95'] == 50
+    assert metrics.summarize(metrics.local_metrics(), limit=1) == [busy]
+
+
+def test_request_metrics_endpoint_reset_reaches_every_process(api_client, clean_metrics):
+    metrics.record_request('local', queries=3, db_ms=1, python_ms=1, response_bytes=1)
+    # Another worker that published its numbers to the shared cache
+    other = {'published': metrics._empty_stats()}
+    other['published']['count'] = 4
+    cache.set(metrics.PROCESS_KEY.format(pid=-1), other)
+    cache.set(metrics.PROCESS_INDEX_KEY, [-1])
+
+    response = api_client.get('/api/request-metrics/?sort=queries')
+    assert {row['endpoint']: row['count'] for row in response.data['endpoints']} == {'local': 1, 'published': 4}
+    assert api_client.get('/api/request-metrics/?sort=bogus').status_code == 400
+
+    assert api_client.delete('/api/request-metrics/').status_code == 204
+    assert api_client.get('/api/request-metrics/').data['endpoints'] == []
+    assert cache.get(metrics.PROCESS_KEY.format(pid=-1)) is None
+
+    # A process that last looked before the reset drops its numbers when it next publishes
+    metrics.record_request('before-reset', queries=1, db_ms=1, python_ms=1, response_bytes=1)
+    metrics._generation = 'older'
+    metrics.publish()
+    assert metrics.local_metrics() == {}
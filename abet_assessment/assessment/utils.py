@@ -1,6 +1,53 @@
-from .models import AuditLog
+from .models import AuditLog, Assessment
 from django.contrib.auth.models import User
 
+# Targets labelled by one of their own fields, looked up with one in_bulk per model
+TARGET_LABEL_FIELDS = {
+    'Assessment': (Assessment, 'name'),
+}
+# Targets labelled with a readable model name and the id
+TARGET_LABEL_PREFIXES = {
+    'ContinuousImprovement': 'Continuous Improvement',
+    'AcademicPerformance': 'Academic Performance',
+    'AssessmentLearningOutcome': 'Learning Outcome',
+}
+
+
+def fallback_target_label(target_model, target_id):
+    return f"{TARGET_LABEL_PREFIXES.get(target_model, target_model)} #{target_id}"
+
+
+def target_label(instance):
+    """Label stored on the audit entry, so listings never read the target table"""
+    target_model = instance.__class__.__name__
+    if target_model in TARGET_LABEL_FIELDS:
+        _, field = TARGET_LABEL_FIELDS[target_model]
+        value = getattr(instance, field, None)
+        if value:
+            return str(value)[:255]
+    return fallback_target_label(target_model, instance.pk)
+
+
+def resolve_target_labels(logs):
+    """
+    {(target_model, target_id): label} for audit entries written before target_label
+    was stored. One in_bulk per target model, deleted targets get the fallback label.
+    """
+    wanted = {}
+    for log in logs:
+        if not log.target_label and log.target_model in TARGET_LABEL_FIELDS:
+            wanted.setdefault(log.target_model, set()).add(log.target_id)
+
+    labels = {}
+    for target_model, target_ids in wanted.items():
+        model, field = TARGET_LABEL_FIELDS[target_model]
+        found = model.objects.only('pk', field).in_bulk(target_ids)
+        for target_id in target_ids:
+            if target_id in found:
+                labels[(target_model, target_id)] = target_label(found[target_id])
+    return labels
+
+
 def log_action(user, action, instance, changes=None):
     # If user is None, use a default system user or skip logging
     if user is None:
@@ -11,5 +58,6 @@ def log_action(user, action, instance, changes=None):
         action=action,
         target_model=instance.__class__.__name__,
         target_id=instance.pk,
+        target_label=target_label(instance),
         changes=changes
-    )
\ No newline at end of file
+    )
@@ -1,6 +1,40 @@
-from assessment.models import Assessment, AssessmentEvent
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from assessment.models import AssessmentEvent, AssessmentEventOutbox
 from assessment.services import AssessmentService
 
+logger = logging.getLogger(__name__)
+
+_flusher_lock = threading.Lock()
+_flusher_thread = None
+_flush_requested = threading.Event()
+
+
+def queue_assessment_event(assessment_id, assessment_name, event_type, user=None, score=None):
+    """
+    Queue an assessment event in the outbox instead of writing it directly.
+    Leave score empty to record the system-wide average score of the flush batch.
+    """
+    if user is not None and not user.is_authenticated:
+        user = None
+
+    AssessmentEventOutbox.objects.create(
+        assessment_id=assessment_id,
+        assessment_name=assessment_name,
+        event_type=event_type,
+        score=score,
+        user=user
+    )
+
+    if getattr(settings, 'ASSESSMENT_EVENT_BACKGROUND_FLUSH', True):
+        transaction.on_commit(_request_flush)
+
+
 def log_assessment_event(instance, user, event_type):
     """
     Log an assessment event with the average system-wide score at the time.
@@ -9,22 +43,79 @@ def log_assessment_event(instance, user, event_type):
     :param event_type: One of 'CREATE' or 'UPDATE'
     """
     try:
-        # Calculate current average ABET score across all assessments
-        average_score = AssessmentService.get_average_score()
-
-        # Calculate individual assessment score
+        # The individual score is a single lookup, the average is filled in by the flusher
         score_data = AssessmentService.calculate_assessment_score(instance.id)
 
-        # Log the event
-        AssessmentEvent.objects.create(
-            assessment_id=instance.id,
-            assessment_name=instance.name,
-            event_type=event_type,
-            score=score_data['total_score'],
-            average_score_at_time=average_score,
-            user=user
-        )
+        queue_assessment_event(
+            instance.id, instance.name, event_type, user, score=score_data['total_score'])
 
     except Exception as e:
         print(f"Error logging assessment event: {e}")
 
+
+def flush_event_outbox(batch_size=500):
+    """
+    Move pending outbox rows to AssessmentEvent in batches.
+    The system-wide average is computed once per batch. Returns the number of events written.
+    """
+    flushed = 0
+    skip_locked = connection.features.has_select_for_update_skip_locked
+
+    while True:
+        with transaction.atomic():
+            batch = list(AssessmentEventOutbox.objects.select_for_update(
+                skip_locked=skip_locked).order_by('id')[:batch_size])
+            if not batch:
+                break
+
+            average_score = AssessmentService.get_average_score()
+            AssessmentEvent.objects.bulk_create([
+                AssessmentEvent(
+                    assessment_id=pending.assessment_id,
+                    assessment_name=pending.assessment_name[:100],
+                    event_type=pending.event_type,
+                    score=pending.score if pending.score is not None else average_score,
+                    average_score_at_time=average_score,
+                    user_id=pending.user_id,
+                    timestamp=pending.created_at
+                ) for pending in batch
+            ])
+            AssessmentEventOutbox.objects.filter(
+                id__in=[pending.id for pending in batch]).delete()
+
+        flushed += len(batch)
+        if len(batch) < batch_size:
+            break
+
+    return flushed
+
+
+def _request_flush():
+    _ensure_flusher()
+    _flush_requested.set()
+
+
+def _ensure_flusher():
+    global _flusher_thread
+    with _flusher_lock:
+        if _flusher_thread is None or not _flusher_thread.is_alive():
+            _flusher_thread = threading.Thread(
+                target=_run_flusher, name='assessment-event-flusher', daemon=True)
+            _flusher_thread.start()
+
+
+def _run_flusher():
+    """Background loop of one process, flushes shortly after events were queued"""
+    window = getattr(settings, 'ASSESSMENT_EVENT_FLUSH_DELAY', 2)
+    while True:
+        _flush_requested.wait()
+        # Give concurrent writes a moment to land in the same batch
+        time.sleep(window)
+        _flush_requested.clear()
+        try:
+            flush_event_outbox()
+        except Exception:
+            # The batch was rolled back and stays in the outbox for the next flush
+            logger.exception("Flushing assessment events failed")
+        finally:
+            connection.close()
@@ -1,5 +1,6 @@
-from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework import generics, viewsets, status, permissions
+from rest_framework.decorators import action, api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -15,7 +16,11 @@ from .serializers import (
     ABETOutcomeSerializer, AssessmentEventSerializer, FacultyTrainingSerializer, AssessmentQuestionSerializer
 )
 
-from .filters import AcademicPerformanceFilter
+from .filters import AcademicPerformanceFilter, AssessmentEventFilter, AuditLogFilter
+from .pagination import KeysetPagination, RecentActivityPagination
+from .utils import target_label
+from .importers import ImportFileError, import_file
+from .exports import ExportFilterError, export_assessments_file
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -24,14 +29,19 @@ from programs.models import Program
 from programs.models import Course
 from programs.models import Department
 
-from .services import AssessmentService
+from .services import COMPLIANCE_TRENDS_MAX_MONTHS, AssessmentService
+from .snapshots import get_snapshot_entry, snapshot_headers
+from . import metrics
 from users.permissions import IsAdminUserType, IsFacultyOrAdmin
 from rest_framework.permissions import IsAuthenticated
-from assessment.utilsLog.event_logger import log_assessment_event
+from assessment.utilsLog.event_logger import log_assessment_event, queue_assessment_event
 
 import traceback
 import sys
 
+from django.conf import settings
+from django.http import FileResponse
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -56,13 +66,88 @@ class FacultyTrainingViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class AuditLogListAPIView(APIView):
+class AuditLogListAPIView(generics.ListAPIView):
+    """Audit log newest first, paged with ?cursor= and filtered by since/until/user/action"""
     permission_classes = [IsAuthenticated, IsAdminUserType]
+    queryset = AuditLog.objects.select_related('user')
+    serializer_class = AuditLogSerializer
+    pagination_class = KeysetPagination
+    filterset_class = AuditLogFilter
 
-    def get(self, request):
-        logs = AuditLog.objects.all().order_by('-timestamp')[:50]  # Latest 50
-        serializer = AuditLogSerializer(logs, many=True)
-        return Response(serializer.data)
+
+def build_dashboard_stats():
+    """Assemble the full dashboard payload, served through the snapshot cache"""
+    # Get basic stats
+    basic_stats = AssessmentService.get_dashboard_statistics()
+
+    # Get ABET outcomes with real calculations
+    abet_outcomes = AssessmentService.get_abet_outcomes_dashboard_data()
+
+    # Get courses data
+    courses_data = AssessmentService.get_courses_assessment_summary()
+
+    # Get dynamic compliance metrics
+    try:
+        compliance_metrics = AssessmentService.calculatedynamiccompliancemetrics()
+
+        # Format progress metrics for your dashboard
+        progress_metrics = [
+            {
+                'title': compliance_metrics['course_syllabi']['name'],
+                'percentage': compliance_metrics['course_syllabi']['percentage'],
+                'target': f"{compliance_metrics['course_syllabi']['target']}",
+                'status': compliance_metrics['course_syllabi']['status'],
+                'current': compliance_metrics['course_syllabi']['current'],
+                'total': compliance_metrics['course_syllabi']['total']
+            },
+            {
+                'title': compliance_metrics['assessment_data']['name'],
+                'percentage': compliance_metrics['assessment_data']['percentage'],
+                'target': f"{compliance_metrics['assessment_data']['target']}",
+                'status': compliance_metrics['assessment_data']['status'],
+                'current': compliance_metrics['assessment_data']['current'],
+                'total': compliance_metrics['assessment_data']['total']
+            },
+            {
+                'title': compliance_metrics['student_outcomes']['name'],
+                'percentage': compliance_metrics['student_outcomes']['percentage'],
+                'target': f"{compliance_metrics['student_outcomes']['target']}",
+                'status': compliance_metrics['student_outcomes']['status'],
+                'current': compliance_metrics['student_outcomes']['current'],
+                'total': compliance_metrics['student_outcomes']['total']
+            },
+            {
+                'title': compliance_metrics['faculty_training']['name'],
+                'percentage': compliance_metrics['faculty_training']['percentage'],
+                'target': f"{compliance_metrics['faculty_training']['target']}",
+                'status': compliance_metrics['faculty_training']['status'],
+                'current': compliance_metrics['faculty_training']['current'],
+                'total': compliance_metrics['faculty_training']['total']
+            }
+        ]
+
+    except Exception:
+        logger.exception("Compliance metrics failed, serving fallback progress metrics")
+
+        # Fallback metrics
+        progress_metrics = [
+            {'title': 'Course Syllabi Updated', 'percentage': 0,
+                'target': 'Target: 100%', 'status': 'critical'},
+            {'title': 'Assessment Data Collected', 'percentage': 0,
+                'target': 'Target: 90%', 'status': 'critical'},
+            {'title': 'Student Outcomes Met', 'percentage': 0,
+                'target': 'Target: 80%', 'status': 'critical'},
+            {'title': 'Faculty Training Complete', 'percentage': 0,
+                'target': 'Target: 95%', 'status': 'critical'}
+        ]
+
+    return {
+        **basic_stats,
+        'abet_outcomes': abet_outcomes,
+        'courses_data': courses_data,
+        'progress_metrics': progress_metrics,
+        'status': 'success'
+    }
 
 
 class DashboardStatsView(APIView):
@@ -70,89 +155,10 @@ class DashboardStatsView(APIView):
 
     def get(self, request):
         try:
-            print("🔍 DashboardStatsView started...")
-
-            # Get basic stats
-            basic_stats = AssessmentService.get_dashboard_statistics()
-            print(f"📊 Basic stats: {basic_stats}")
-
-            # Get ABET outcomes with real calculations
-            abet_outcomes = AssessmentService.get_abet_outcomes_dashboard_data()
-            print(f"🎯 ABET outcomes: {len(abet_outcomes)}")
-
-            # Get courses data
-            courses_data = AssessmentService.get_courses_assessment_summary()
-            print(f"📚 Courses data: {len(courses_data)}")
-
-            # Get dynamic compliance metrics
-            try:
-                compliance_metrics = AssessmentService.calculatedynamiccompliancemetrics()
-                print(f"📈 Compliance metrics calculated successfully")
-
-                # Format progress metrics for your dashboard
-                progress_metrics = [
-                    {
-                        'title': compliance_metrics['course_syllabi']['name'],
-                        'percentage': compliance_metrics['course_syllabi']['percentage'],
-                        'target': f"{compliance_metrics['course_syllabi']['target']}",
-                        'status': compliance_metrics['course_syllabi']['status'],
-                        'current': compliance_metrics['course_syllabi']['current'],
-                        'total': compliance_metrics['course_syllabi']['total']
-                    },
-                    {
-                        'title': compliance_metrics['assessment_data']['name'],
-                        'percentage': compliance_metrics['assessment_data']['percentage'],
-                        'target': f"{compliance_metrics['assessment_data']['target']}",
-                        'status': compliance_metrics['assessment_data']['status'],
-                        'current': compliance_metrics['assessment_data']['current'],
-                        'total': compliance_metrics['assessment_data']['total']
-                    },
-                    {
-                        'title': compliance_metrics['student_outcomes']['name'],
-                        'percentage': compliance_metrics['student_outcomes']['percentage'],
-                        'target': f"{compliance_metrics['student_outcomes']['target']}",
-                        'status': compliance_metrics['student_outcomes']['status'],
-                        'current': compliance_metrics['student_outcomes']['current'],
-                        'total': compliance_metrics['student_outcomes']['total']
-                    },
-                    {
-                        'title': compliance_metrics['faculty_training']['name'],
-                        'percentage': compliance_metrics['faculty_training']['percentage'],
-                        'target': f"{compliance_metrics['faculty_training']['target']}",
-                        'status': compliance_metrics['faculty_training']['status'],
-                        'current': compliance_metrics['faculty_training']['current'],
-                        'total': compliance_metrics['faculty_training']['total']
-                    }
-                ]
-
-                print(
-                    f"✅ Progress metrics: {[m['percentage'] for m in progress_metrics]}")
-
-            except Exception as e:
-                print(f"❌ Compliance metrics failed: {e}")
-                import traceback
-                traceback.print_exc()
-
-                # Fallback metrics
-                progress_metrics = [
-                    {'title': 'Course Syllabi Updated', 'percentage': 0,
-                        'target': 'Target: 100%', 'status': 'critical'},
-                    {'title': 'Assessment Data Collected', 'percentage': 0,
-                        'target': 'Target: 90%', 'status': 'critical'},
-                    {'title': 'Student Outcomes Met', 'percentage': 0,
-                        'target': 'Target: 80%', 'status': 'critical'},
-                    {'title': 'Faculty Training Complete', 'percentage': 0,
-                        'target': 'Target: 95%', 'status': 'critical'}
-                ]
-
-            return Response({
-                **basic_stats,
-                'abet_outcomes': abet_outcomes,
-                'courses_data': courses_data,
-                'progress_metrics': progress_metrics,
-                'status': 'success'
-            })
-
+            payload, snapshot = get_snapshot_entry(
+                'dashboard-stats', build_dashboard_stats)
+            return Response({**payload, 'snapshot': snapshot},
+                            headers=snapshot_headers(snapshot))
         except Exception as e:
             print(f"❌ DashboardStatsView Error: {e}")
             import traceback
@@ -201,20 +207,11 @@ class AssessmentViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='average-score')
     def average_score(self, request):
-        all_assessments = Assessment.objects.all()
-        if not all_assessments.exists():
+        scores = AssessmentService.calculate_scores_bulk()
+        if not scores:
             return Response({'average_score': 0})
 
-        total = 0
-        count = 0
-
-        for assessment in all_assessments:
-            result = AssessmentService.calculate_assessment_score(
-                assessment.id)
-            total += result['total_score']
-            count += 1
-
-        avg = total / count if count > 0 else 0
+        avg = AssessmentService.average_total_score(scores)
         return Response({'average_score': avg})
 
     @action(detail=False, methods=['get'], url_path='program/(?P<program_id>[^/.]+)/average')
@@ -226,19 +223,9 @@ class AssessmentViewSet(viewsets.ModelViewSet):
         except Program.DoesNotExist:
             return Response({'error': 'Program not found'}, status=404)
 
-        courses = program.courses.all()
-        assessments = Assessment.objects.filter(course__in=courses)
-
-        total_score = 0
-        count = 0
-
-        for assessment in assessments:
-            score_data = AssessmentService.calculate_assessment_score(
-                assessment.id)
-            total_score += score_data['total_score']
-            count += 1
-
-        average_score = total_score / count if count > 0 else 0
+        scores = AssessmentService.calculate_scores_bulk(
+            Assessment.objects.filter(course__program=program))
+        average_score = AssessmentService.average_total_score(scores)
 
         return Response({
             'program_id': program.id,
@@ -253,20 +240,17 @@ class AssessmentViewSet(viewsets.ModelViewSet):
         result = []
         programs = Program.objects.all()
 
-        for program in programs:
-            courses = program.courses.all()
-            assessments = Assessment.objects.filter(course__in=courses)
-
-            total_score = 0
-            count = 0
+        # Score the whole institution once and group the results per program
+        scores = AssessmentService.calculate_scores_bulk()
+        program_totals = {}
+        for assessment_id, program_id in Assessment.objects.values_list('id', 'course__program_id'):
+            if assessment_id in scores:
+                program_totals.setdefault(program_id, []).append(
+                    scores[assessment_id]['total_score'])
 
-            for assessment in assessments:
-                score_data = AssessmentService.calculate_assessment_score(
-                    assessment.id)
-                total_score += score_data['total_score']
-                count += 1
-
-            average_score = total_score / count if count > 0 else 0
+        for program in programs:
+            totals = program_totals.get(program.id, [])
+            average_score = sum(totals) / len(totals) if totals else 0
 
             result.append({
                 'program_id': program.id,
@@ -286,6 +270,7 @@ class AssessmentViewSet(viewsets.ModelViewSet):
                 action='DELETE',
                 target_model='Assessment',
                 target_id=instance.id,  # ✅ Now it's still available
+                target_label=target_label(instance),
                 changes=f"Deleted {instance.name}"
             )
 
@@ -325,20 +310,15 @@ class ContinuousImprovementViewSet(viewsets.ModelViewSet):
         instance._current_user = user
         instance.save()
 
-        # 👇 Move this here: AFTER saving, so data exists now
-        try:
-            pre_score = AssessmentService.get_average_score()
-        except Exception:
-            pre_score = 0.0
-
-        AssessmentEvent.objects.create(
-            assessment_id=instance.assessment.id,
-            assessment_name=f"{instance.assessment.name} - Continuous Improvement",
-            event_type='UPDATE',
-            score=pre_score,
-            average_score_at_time=pre_score,
-            user=user
-        )
+        # The system-wide average is filled in when the outbox is flushed.
+        # Skip it if the ci_event signal already queued the event for this save.
+        if not getattr(instance, '_event_queued', False):
+            queue_assessment_event(
+                instance.assessment.id,
+                f"{instance.assessment.name} - Continuous Improvement",
+                'UPDATE',
+                user
+            )
 
 
 class AcademicPerformanceViewSet(viewsets.ModelViewSet):
@@ -365,19 +345,12 @@ class AssessmentLearningOutcomeViewSet(viewsets.ModelViewSet):
         instance._current_user = user
         # REMOVE THIS LINE: instance.save()  # Don't save again!
 
-        # Create assessment event
-        try:
-            pre_score = AssessmentService.get_average_score()
-        except Exception:
-            pre_score = 0.0
-
-        AssessmentEvent.objects.create(
-            assessment_id=instance.assessment.id,  # Use .assessment.id not .assessment_id
-            assessment_name=f"{instance.assessment.name} - Learning Outcome",
-            event_type='CREATE',  # Changed from UPDATE to CREATE
-            score=pre_score,
-            average_score_at_time=pre_score,
-            user=user
+        # Create assessment event, the average score is filled in by the outbox flusher
+        queue_assessment_event(
+            instance.assessment.id,  # Use .assessment.id not .assessment_id
+            f"{instance.assessment.name} - Learning Outcome",
+            'CREATE',  # Changed from UPDATE to CREATE
+            user
         )
 
 
@@ -393,7 +366,9 @@ class ABETOutcomeViewSet(viewsets.ReadOnlyModelViewSet):
 
 class AssessmentEventViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = AssessmentEventSerializer
-    queryset = AssessmentEvent.objects.all().order_by('-timestamp')
+    queryset = AssessmentEvent.objects.select_related('user').order_by('-timestamp', '-id')
+    pagination_class = KeysetPagination
+    filterset_class = AssessmentEventFilter
 
     def get_permissions(self):
         if self.action == 'list':
@@ -433,54 +408,60 @@ def abet_accreditation_status(request):
 def debug_abet_outcomes(request):
     """Debug endpoint to check ABET outcomes calculation"""
     try:
-        from assessment.models import ABETOutcome, AssessmentLearningOutcome_ABET
-
-        debug_data = []
-
-        for outcome in ABETOutcome.objects.all():
-            scores = AssessmentLearningOutcome_ABET.objects.filter(
-                abet_outcome=outcome)
-
-            if scores.exists():
-                score_values = [s.score for s in scores]
-                avg_score = sum(score_values) / len(score_values)
-                percentage = (avg_score / 4.0) * 100
-            else:
-                score_values = []
-                avg_score = 0
-                percentage = 0
-
-            debug_data.append({
-                'outcome_label': outcome.label,
-                'outcome_description': outcome.description,
-                'raw_scores': score_values,
-                'average_score': avg_score,
-                'percentage': percentage,
-                'scores_count': len(score_values)
-            })
+        debug_data = [{
+            'outcome_label': outcome['label'],
+            'outcome_description': outcome['description'],
+            'distribution': outcome['distribution'],
+            'direct': outcome['direct'],
+            'indirect': outcome['indirect'],
+            'average_score': outcome['mean'],
+            'percentage': outcome['percentage'],
+            'scores_count': outcome['count']
+        } for outcome in AssessmentService.get_outcome_attainment()]
 
         return Response({
             'debug_data': debug_data,
-            'total_outcomes': ABETOutcome.objects.count(),
-            'total_scores': AssessmentLearningOutcome_ABET.objects.count()
+            'total_outcomes': len(debug_data),
+            'total_scores': sum(outcome['scores_count'] for outcome in debug_data)
         })
 
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
 
+@api_view(['GET'])
+def course_assessment_summary(request):
+    """Course assessment summary one page at a time, ?program_id=&page=&page_size="""
+    program_id = request.query_params.get('program_id')
+    page = request.query_params.get('page', '1')
+    page_size = request.query_params.get('page_size', '50')
+    if not page.isdigit() or not page_size.isdigit() or (program_id and not program_id.isdigit()):
+        return Response({'error': 'page, page_size and program_id must be positive integers'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    page = max(int(page), 1)
+    page_size = min(max(int(page_size), 1), 500)
+    return Response({
+        'count': AssessmentService.get_summary_courses(program_id).count(),
+        'page': page,
+        'page_size': page_size,
+        'results': AssessmentService.get_courses_assessment_summary(program_id, page, page_size)
+    })
+
+
 @api_view(['GET'])
 def assessment_methods_summary(request):
     """Get assessment methods compliance summary"""
     try:
-        methods_summary = AssessmentService.get_assessment_methods_summary()
-        compliance_metrics = AssessmentService.get_compliance_dashboard_metrics()
+        compliance_metrics, snapshot = get_snapshot_entry(
+            'compliance-metrics', AssessmentService.get_compliance_dashboard_metrics)
 
         return Response({
-            'methods_summary': methods_summary,
+            'methods_summary': compliance_metrics['methods_summary'],
             'compliance_metrics': compliance_metrics,
+            'snapshot': snapshot,
             'status': 'success'
-        })
+        }, headers=snapshot_headers(snapshot))
     except Exception as e:
         return Response({
             'error': str(e),
@@ -492,7 +473,19 @@ def assessment_methods_summary(request):
 def compliance_dashboard(request):
     """Get comprehensive compliance dashboard data"""
     try:
-        compliance_data = AssessmentService.get_compliance_dashboard_metrics()
+        months = request.query_params.get('months')
+        if months is not None and not (months.isdigit() and 1 <= int(months) <= COMPLIANCE_TRENDS_MAX_MONTHS):
+            return Response({'error': f'months must be a whole number from 1 to {COMPLIANCE_TRENDS_MAX_MONTHS}'},
+                            status=400)
+
+        compliance_data, snapshot = get_snapshot_entry(
+            'compliance-metrics', AssessmentService.get_compliance_dashboard_metrics)
+
+        # Other ranges are read straight from the stored monthly snapshots
+        trends = compliance_data['compliance_trends']
+        if months is not None and int(months) != 6:
+            trends = AssessmentService.get_compliance_trends(
+                months=int(months), current_summary=compliance_data['methods_summary'])
 
         return Response({
             'compliance_overview': {
@@ -502,13 +495,14 @@ def compliance_dashboard(request):
                 'status': 'compliant' if compliance_data['overall_compliance_rate'] >= 80 else 'non_compliant'
             },
             'methods_breakdown': compliance_data['methods_summary'],
-            'trends': compliance_data['compliance_trends'],
+            'trends': trends,
             'summary_stats': {
                 'total_methods': compliance_data['total_methods'],
                 'compliant_methods': compliance_data['compliant_methods'],
                 'non_compliant_methods': compliance_data['total_methods'] - compliance_data['compliant_methods']
-            }
-        })
+            },
+            'snapshot': snapshot
+        }, headers=snapshot_headers(snapshot))
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
@@ -532,14 +526,95 @@ def faculty_training_stats(request):
     })
 
 
-class RecentActivitiesAPIView(APIView):
-    permission_classes = [IsAuthenticated]
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated, IsAdminUserType])
+def request_metrics(request):
+    """
+    Per-endpoint query count and latency aggregates, worst offenders first.
+    DELETE resets them in every process sharing the cache, see metrics.py.
+    """
+    if request.method == 'DELETE':
+        metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def get(self, request):
-        # Get only the 4 most recent audit logs for dashboard
-        logs = AuditLog.objects.all().order_by('-timestamp')[:4]
-        serializer = AuditLogSerializer(logs, many=True)
-        return Response(serializer.data)
+    sort_by = request.query_params.get('sort', 'queries')
+    if sort_by not in metrics.BUCKETS:
+        return Response({'error': f"sort must be one of {', '.join(metrics.BUCKETS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    limit = request.query_params.get('limit')
+
+    return Response({
+        'enabled': settings.REQUEST_METRICS_ENABLED,
+        'sort': sort_by,
+        'endpoints': metrics.summarize(
+            metrics.collect_metrics(), sort_by,
+            int(limit) if limit and limit.isdigit() else None)
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsFacultyOrAdmin])
+@parser_classes([MultiPartParser])
+def import_assessment_data(request, kind):
+    """
+    Bulk import an .xlsx or .csv upload (field "file"), kind is academic-performance,
+    assessment-questions or abet-scores. ?dry_run=true validates only, ?partial=true
+    writes the valid rows even when others are rejected.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Upload the file in the "file" field'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    def flag(name):
+        return str(request.data.get(name, request.query_params.get(name, ''))).lower() in ('1', 'true', 'yes')
+
+    try:
+        report = import_file(kind, upload, upload.name, dry_run=flag('dry_run'), partial=flag('partial'),
+                             sheet=request.data.get('sheet') or None)
+    except ImportFileError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    ok = report['committed'] or (report['dry_run'] and not report['error_count'])
+    return Response(report, status=status.HTTP_200_OK if ok else status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsFacultyOrAdmin])
+def export_assessment_data(request):
+    """Excel workbook of assessments, component and outcome scores, ?program_id=&academic_year=&course_id="""
+    program_id = request.query_params.get('program_id')
+    course_id = request.query_params.get('course_id')
+    academic_year = request.query_params.get('academic_year')
+    if (program_id and not program_id.isdigit()) or (course_id and not course_id.isdigit()):
+        return Response({'error': 'program_id and course_id must be integers'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        export = export_assessments_file(program_id, academic_year, course_id)
+    except ExportFilterError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    name_parts = ['assessments']
+    if program_id:
+        name_parts.append(f'program-{program_id}')
+    if course_id:
+        name_parts.append(f'course-{course_id}')
+    if academic_year:
+        name_parts.append(academic_year)
+    # FileResponse streams the file in blocks and closes (and so deletes) it when done
+    return FileResponse(
+        export, as_attachment=True, filename='-'.join(name_parts) + '.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+
+class RecentActivitiesAPIView(generics.ListAPIView):
+    # Same feed as the audit log, 4 entries per page for the dashboard widget
+    permission_classes = [IsAuthenticated]
+    queryset = AuditLog.objects.select_related('user')
+    serializer_class = AuditLogSerializer
+    pagination_class = RecentActivityPagination
+    filterset_class = AuditLogFilter
 
 
 @api_view(['GET'])
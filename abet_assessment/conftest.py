@@ -0,0 +1,144 @@
+import datetime
+import itertools
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from assessment.models import (
+    ABETOutcome, AcademicPerformance, Assessment, AssessmentLearningOutcome,
+    AssessmentLearningOutcome_ABET, AuditLog, ContinuousImprovement
+)
+from assessment.services import AssessmentService
+from programs.models import (
+    Course, CourseStudent, Department, Faculty, Program, SemesterCourseAssignment, Student
+)
+from reports.models import Comment, Report
+from users.models import UserProfile
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                   'LOCATION': 'query-budget-tests'}}
+    settings.ASSESSMENT_EVENT_BACKGROUND_FLUSH = False
+    settings.SELF_STUDY_REPORT_BACKGROUND = False
+    settings.DASHBOARD_SNAPSHOT_MAX_STALENESS = 0
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user('budget-admin', 'admin@example.com', 'password', is_staff=True)
+    UserProfile.objects.create(user=user, user_type='admin')
+    return user
+
+
+@pytest.fixture
+def api_client(admin_user):
+    client = APIClient()
+    client.force_authenticate(admin_user)
+    return client
+
+
+class DatasetBuilder:
+    """
+    Adds rows for every hot endpoint, scale is the number of courses added per call.
+    Calling it again grows the same dataset so query counts can be compared across sizes.
+    """
+
+    def __init__(self):
+        self._seq = itertools.count(1)
+        self.department = Department.objects.create(name='Computer Engineering')
+        self.program = Program.objects.create(
+            name='Computer Engineering', description='Bachelor', department=self.department)
+        self.outcomes = [ABETOutcome.objects.create(label=f'SO{i}', description=f'Outcome {i}')
+                         for i in range(1, 8)]
+        self.author = User.objects.create_user('budget-author', 'author@example.com', 'password')
+        UserProfile.objects.create(user=self.author, user_type='faculty', department=self.department)
+
+    def grow(self, scale):
+        for _ in range(scale):
+            n = next(self._seq)
+            user = User.objects.create_user(f'prof{n}', f'prof{n}@example.com', 'password')
+            UserProfile.objects.create(user=user, user_type='professor', department=self.department)
+            faculty = Faculty.objects.create(
+                user=user, name=f'Professor {n}', department=self.department,
+                email=f'prof{n}@example.com', qualifications='PhD', expertise='Systems')
+            course = Course.objects.create(
+                code=f'CPE{n:04d}', name=f'Course {n}', description='Course', credits=3,
+                program=self.program, instructor=faculty)
+            SemesterCourseAssignment.objects.create(
+                academic_year='2024-2025', semester='First', course=course,
+                instructor=faculty, program=self.program)
+
+            for s in range(3):
+                student = Student.objects.create(
+                    first_name=f'Student{n}-{s}', last_name='Test', email=f's{n}-{s}@example.com',
+                    enrollment_date=datetime.date(2024, 9, 1))
+                CourseStudent.objects.create(course=course, student=student)
+
+            for a in range(2):
+                assessment = Assessment.objects.create(
+                    name=f'Assessment {n}-{a}', date=datetime.date(2024, 10, 1), course=course)
+                ContinuousImprovement.objects.create(
+                    action_taken='Added labs', implementation_date=datetime.date(2024, 10, 1),
+                    effectiveness_measure='Survey', weight=2, score=80, assessment=assessment)
+                AcademicPerformance.objects.create(
+                    assessmentType='Exam', high=100, mean=72, low=40, grade=75, weight=3,
+                    course_id=course.id, instructor_id=faculty.id, description='Midterm',
+                    assessment_id=assessment)
+                outcome = AssessmentLearningOutcome.objects.create(
+                    description='Design systems', program_id=self.program.id, assessment=assessment)
+                for so in self.outcomes[:3]:
+                    AssessmentLearningOutcome_ABET.objects.create(
+                        assessment_lo=outcome, abet_outcome=so, score=3, evidence_type='direct')
+                AuditLog.objects.create(
+                    user=user, action='CREATE', target_model='Assessment', target_id=assessment.id)
+
+            report = Report.objects.create(title=f'Report {n}', content='Findings', author=user)
+            Comment.objects.create(report=report, author=self.author, content='Reviewed')
+
+        # Score maintenance runs on commit, which never happens inside a test transaction
+        AssessmentService.store_scores_bulk()
+
+
+@pytest.fixture
+def dataset(db):
+    return DatasetBuilder()
+
+
+@pytest.fixture
+def count_queries():
+    """Request a URL with a cold cache, return (response, number of queries)"""
+    def request(client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        assert response.status_code == 200, response.content[:500]
+        return response, len(ctx.captured_queries)
+    return request
+
+
+@pytest.fixture
+def assert_query_budget(dataset, api_client, count_queries):
+    """
+    Measure a URL on a small and a 4x larger dataset and require the same query
+    count both times, within the budget. A difference means an N+1 crept in.
+    """
+    def check(url, budget, small=2, large=8):
+        dataset.grow(small)
+        _, small_count = count_queries(api_client, url)
+        dataset.grow(large - small)
+        _, large_count = count_queries(api_client, url)
+
+        assert small_count == large_count, (
+            f'{url}: {small_count} queries for {small} courses but {large_count} for {large}')
+        assert large_count <= budget, f'{url}: {large_count} queries, budget is {budget}'
+        return large_count
+    return check
@@ -1,21 +1,23 @@
 from rest_framework import serializers
 from .models import Department, Faculty, Program, ProgramEducationalObjective, Course, Student, CourseStudent, SemesterCourseAssignment
-from assessment.serializers import AssessmentSerializer
+from django.db.models import prefetch_related_objects
+from django.db.models.manager import BaseManager
+from assessment.serializers import AssessmentSerializer, DynamicFieldsMixin, get_score_provider
 from assessment.services import AssessmentService
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Department
         fields = '__all__'
 
-class FacultySerializer(serializers.ModelSerializer):
+class FacultySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
         model = Faculty
         fields = '__all__'
 
-class ProgramSerializer(serializers.ModelSerializer):
+class ProgramSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Program
         fields = '__all__'
@@ -23,44 +25,71 @@ class ProgramSerializer(serializers.ModelSerializer):
         print("Creating program with data:", validated_data)
         return super().create(validated_data)
 
-class ProgramEducationalObjectiveSerializer(serializers.ModelSerializer):
+class ProgramEducationalObjectiveSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ProgramEducationalObjective
         fields = '__all__'
 
-class CourseSerializer(serializers.ModelSerializer):
+def prime_courses(courses, course_fields, context):
+    """
+    Load what the requested course fields need for all courses at once: their
+    assessments, and the scores of every assessment when scores are shown.
+    """
+    assessments = course_fields.get('assessments')
+    needs_scores = 'average_score' in course_fields or (
+        assessments is not None and 'score' in assessments.child.fields)
+    if assessments is not None or needs_scores:
+        prefetch_related_objects(courses, 'assessments')
+    if needs_scores:
+        get_score_provider(context).prime(
+            assessment.id for course in courses for assessment in course.assessments.all())
+
+class CourseListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        courses = list(data.all() if isinstance(data, BaseManager) else data)
+        prime_courses(courses, self.child.fields, self.context)
+        return super().to_representation(courses)
+
+class CourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     assessments = AssessmentSerializer(many=True, read_only=True)
     average_score = serializers.SerializerMethodField()
     class Meta:
         model = Course
         fields = '__all__'
+        list_serializer_class = CourseListSerializer
+        expandable_fields = ('assessments', 'average_score')
     def get_average_score(self, obj):
-        assessments = obj.assessments.all()
-        if not assessments.exists():
-            return 0.0
-        total_score = 0
-        count = 0
-        for assessment in assessments:
-            try:
-                result = AssessmentService.calculate_assessment_score(assessment.id)
-                total_score += result.get('total_score', 0)
-                count += 1
-            except:
-                continue
-        return round(total_score / count, 2) if count > 0 else 0.0
+        scores = get_score_provider(self.context).get_many(
+            assessment.id for assessment in obj.assessments.all())
+        return round(AssessmentService.average_total_score(scores), 2)
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = '__all__'
 
-class CourseStudentSerializer(serializers.ModelSerializer):
+class CourseStudentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CourseStudent
         fields = '__all__'
 
-class SemesterCourseAssignmentSerializer(serializers.ModelSerializer):
+class SemesterCourseAssignmentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        assignments = list(data.all() if isinstance(data, BaseManager) else data)
+        fields = self.child.fields
+        related = [source for name, source in (('course_details', 'course'),
+                                               ('instructor_details', 'instructor'),
+                                               ('program_details', 'program')) if name in fields]
+        if 'instructor_details' in fields and 'username' in fields['instructor_details'].fields:
+            related.append('instructor__user')
+        prefetch_related_objects(assignments, *related)
+        if 'course_details' in fields:
+            prime_courses([assignment.course for assignment in assignments],
+                          fields['course_details'].fields, self.context)
+        return super().to_representation(assignments)
+
+class SemesterCourseAssignmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     course_details = CourseSerializer(source='course', read_only=True)
     instructor_details = FacultySerializer(source='instructor', read_only=True)
     program_details = ProgramSerializer(source='program', read_only=True)
@@ -68,4 +97,6 @@ class SemesterCourseAssignmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = SemesterCourseAssignment
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
\ No newline at end of file
+        read_only_fields = ('created_at', 'updated_at')
+        list_serializer_class = SemesterCourseAssignmentListSerializer
+        expandable_fields = ('course_details', 'instructor_details', 'program_details')
\ No newline at end of file
@@ -1,3 +1,23 @@
-from django.test import TestCase
+# Query budgets for the hot programs endpoints, see conftest.py.
 
-# Create your tests here.
+
+def test_course_list_query_budget(assert_query_budget):
+    assert_query_budget('/api/courses/', budget=8)
+
+
+def test_course_list_expanded_query_budget(assert_query_budget):
+    assert_query_budget('/api/courses/?expand=average_score,assessments.score', budget=8)
+
+
+def test_semester_assignment_list_query_budget(assert_query_budget):
+    assert_query_budget('/api/semester-assignments/', budget=8)
+
+
+def test_semester_assignment_list_expanded_query_budget(assert_query_budget):
+    assert_query_budget(
+        '/api/semester-assignments/?expand=course_details.average_score,course_details.assessments.score,'
+        'instructor_details,program_details', budget=10)
+
+
+def test_program_courses_query_budget(assert_query_budget, dataset):
+    assert_query_budget(f'/api/programs/{dataset.program.id}/courses/', budget=8)
@@ -39,7 +39,7 @@ class ProgramViewSet(viewsets.ModelViewSet):
     def get_courses(self, request, pk=None):
         program = self.get_object()
         courses = Course.objects.filter(program=program)
-        serializer = CourseSerializer(courses, many=True)
+        serializer = CourseSerializer(courses, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     def get_permissions(self):
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0006_alter_semestercourseassignment_options_and_more'),
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SelfStudyReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('stage', models.CharField(blank=True, max_length=100)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('fingerprint', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('cached', models.BooleanField(default=False)),
+                ('file_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('program', models.ForeignKey(blank=True, help_text='Empty for all programs', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='self_study_jobs', to='programs.program')),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='self_study_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -19,3 +19,35 @@ class Comment(models.Model):
 
     def __str__(self):
         return f"Comment by {self.author.username}"
+
+
+class SelfStudyReportJob(models.Model):
+    """
+    One request for a self-study PDF. The rendered file is shared by every job whose
+    data fingerprint matches (see reports/self_study.py), so only new data is rendered.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    program = models.ForeignKey('programs.Program', on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='self_study_jobs', help_text="Empty for all programs")
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
+                                     related_name='self_study_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    stage = models.CharField(max_length=100, blank=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
+    # True when the PDF already existed for this data and was not rendered again
+    cached = models.BooleanField(default=False)
+    file_size = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Self-study report #{self.pk} ({self.status})"
@@ -0,0 +1,244 @@
+"""
+Self-study PDF reports rendered with reportlab in a background thread.
+
+A job first collects the report data (programs, course summary, outcome
+attainment, compliance) and hashes it. The PDF is stored under that hash in
+SELF_STUDY_REPORT_DIR, so a job whose data did not change since an earlier
+render reuses the file and finishes without rendering. Progress is written
+to the SelfStudyReportJob row as the job moves through its stages.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from assessment.services import AssessmentService
+from programs.models import Program
+
+from .models import SelfStudyReportJob
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so earlier renders are not reused
+LAYOUT_VERSION = 1
+
+_executor_lock = threading.Lock()
+_executor = None
+
+
+def report_dir():
+    return Path(getattr(settings, 'SELF_STUDY_REPORT_DIR',
+                        Path(settings.BASE_DIR) / 'generated_reports' / 'self_study'))
+
+
+def report_path(fingerprint):
+    return report_dir() / f'{fingerprint}.pdf'
+
+
+def active_job_for(program_id):
+    """A pending or running job for the same program that has not timed out, if any"""
+    timeout = getattr(settings, 'SELF_STUDY_REPORT_TIMEOUT', 30 * 60)
+    return SelfStudyReportJob.objects.filter(
+        program_id=program_id, status__in=('pending', 'running'),
+        created_at__gte=timezone.now() - timedelta(seconds=timeout)).order_by('-created_at').first()
+
+
+def start_job(job):
+    """Run the job after the current transaction commits, in a worker thread unless disabled"""
+    if not getattr(settings, 'SELF_STUDY_REPORT_BACKGROUND', True):
+        run_job(job.pk)
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'SELF_STUDY_REPORT_WORKERS', 2),
+                thread_name_prefix='self-study-report')
+        return _executor
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        connection.close()
+
+
+def _update(job_id, **fields):
+    SelfStudyReportJob.objects.filter(pk=job_id).update(**fields)
+
+
+def run_job(job_id):
+    job = SelfStudyReportJob.objects.get(pk=job_id)
+    _update(job_id, status='running', stage='Collecting program data', progress=5,
+            started_at=timezone.now())
+    try:
+        data = collect_report_data(job.program_id, lambda stage, progress: _update(
+            job_id, stage=stage, progress=progress))
+        fingerprint = data_fingerprint(data)
+        path = report_path(fingerprint)
+
+        cached = path.exists()
+        if not cached:
+            _update(job_id, stage='Rendering PDF', progress=70, fingerprint=fingerprint)
+            render_pdf(data, path)
+
+        _update(job_id, status='done', stage='Done', progress=100, fingerprint=fingerprint,
+                cached=cached, file_size=path.stat().st_size, finished_at=timezone.now())
+        logger.info('Self-study report #%s %s (%s)', job_id, 'reused' if cached else 'rendered',
+                    fingerprint[:12])
+    except Exception as e:
+        logger.exception("Self-study report #%s failed", job_id)
+        _update(job_id, status='failed', stage='Failed', error=str(e), finished_at=timezone.now())
+
+
+def collect_report_data(program_id=None, progress=None):
+    """Everything the report shows, as plain JSON-serializable data"""
+    def step(stage, percent):
+        if progress:
+            progress(stage, percent)
+
+    programs = Program.objects.select_related('department').annotate(
+        course_count=Count('courses', distinct=True),
+        assessment_count=Count('courses__assessments', distinct=True),
+        average_score=Avg('courses__assessments__score_summary__total_score'),
+    ).order_by('name')
+    if program_id:
+        programs = programs.filter(id=program_id)
+    program_rows = [{
+        'name': program.name,
+        'level': program.get_level_display(),
+        'department': program.department.name,
+        'courses': program.course_count,
+        'assessments': program.assessment_count,
+        'average_score': round(program.average_score or 0, 1),
+    } for program in programs]
+
+    step('Summarizing courses', 20)
+    courses = [{
+        'name': course['name'],
+        'instructor': course['instructor'],
+        'enrollment': course['enrollment'],
+        'score': course['assessment_score'],
+        'outcomes': course['outcomes'],
+        'coverage': course['outcome_coverage'],
+        'status': course['status'],
+    } for course in AssessmentService.get_courses_assessment_summary(program_id)]
+
+    step('Calculating outcome attainment', 40)
+    outcomes = AssessmentService.get_outcome_attainment(program_id)
+
+    step('Calculating compliance', 55)
+    methods = AssessmentService.get_assessment_methods_summary(program_id)
+
+    return {
+        'layout_version': LAYOUT_VERSION,
+        'scope': program_rows[0]['name'] if program_id and program_rows else 'All programs',
+        'programs': program_rows,
+        'courses': courses,
+        'outcomes': outcomes,
+        'compliance': AssessmentService.calculatedynamiccompliancemetrics(program_id),
+        'methods': methods,
+        'methods_summary': AssessmentService.summarize_compliance(methods),
+    }
+
+
+def data_fingerprint(data):
+    payload = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _table(rows, widths, header_color=colors.HexColor('#1f3b64')):
+    table = Table(rows, colWidths=widths, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), header_color),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f5f9')]),
+    ]))
+    return table
+
+
+def render_pdf(data, path):
+    """Render the report to path, written to a temporary name and moved into place"""
+    styles = getSampleStyleSheet()
+    small = styles['BodyText'].clone('small', fontSize=8, leading=10)
+
+    def text(value, style=small):
+        # Paragraph parses its text as markup
+        return Paragraph(escape(str(value or '')), style)
+
+    story = [
+        Paragraph('ABET Self-Study Report', styles['Title']),
+        text(data['scope'], styles['Heading2']),
+        Paragraph(f"Generated {timezone.now():%B %d, %Y %H:%M}", styles['Normal']),
+        Spacer(1, 0.6 * cm),
+        Paragraph('1. Programs', styles['Heading2']),
+        _table([['Program', 'Level', 'Department', 'Courses', 'Assessments', 'Average Score']] + [
+            [text(row['name']), row['level'], text(row['department']),
+             row['courses'], row['assessments'], f"{row['average_score']:.1f}"]
+            for row in data['programs']], [8 * cm, 2.5 * cm, 6 * cm, 2.5 * cm, 3 * cm, 3 * cm]),
+        PageBreak(),
+        Paragraph('2. Courses', styles['Heading2']),
+        _table([['Course', 'Instructor', 'Enrollment', 'Score', 'Mapped Outcomes', 'Coverage', 'Status']] + [
+            [text(row['name']), text(row['instructor']), row['enrollment'],
+             f"{row['score']:.1f}", text(', '.join(row['outcomes'])),
+             f"{row['coverage']:.0f}%", row['status'].replace('_', ' ')]
+            for row in data['courses']], [6.5 * cm, 4.5 * cm, 2 * cm, 1.6 * cm, 6 * cm, 2 * cm, 3 * cm]),
+        PageBreak(),
+        Paragraph('3. Student Outcome Attainment', styles['Heading2']),
+        _table([['Outcome', 'Description', 'Scores', 'Mean (1-4)', 'Attainment', 'Direct', 'Indirect',
+                 'Status']] + [
+            [text(row['label']), text(row['description']), row['count'], f"{row['mean']:.2f}",
+             f"{row['percentage']:.1f}%", f"{row['direct']['mean']:.2f}", f"{row['indirect']['mean']:.2f}",
+             row['status']]
+            for row in data['outcomes']], [2 * cm, 9.5 * cm, 1.8 * cm, 2 * cm, 2.2 * cm, 1.8 * cm, 1.8 * cm,
+                                           2.2 * cm]),
+        Spacer(1, 0.6 * cm),
+        Paragraph('4. Compliance', styles['Heading2']),
+        _table([['Metric', 'Value', 'Current', 'Total', 'Target', 'Status']] + [
+            [metric['name'], metric['percentage'], metric['current'], metric['total'], metric['target'],
+             metric['status']]
+            for metric in data['compliance'].values()], [7 * cm, 3 * cm, 3 * cm, 3 * cm, 3 * cm, 3 * cm]),
+        Spacer(1, 0.4 * cm),
+        Paragraph(f"Assessment methods: {data['methods_summary']['compliant_methods']} of "
+                  f"{data['methods_summary']['total_methods']} compliant "
+                  f"({data['methods_summary']['overall_compliance_rate']}%)", styles['Normal']),
+        Spacer(1, 0.2 * cm),
+        _table([['Method', 'Type', 'Courses', 'Completion', 'Average Score', 'Status']] + [
+            [method['name'], method['assessment_type'], method['courses'], method['completion'],
+             method['avg_score'], method['status'].replace('_', ' ')]
+            for method in data['methods']], [7 * cm, 4 * cm, 2.5 * cm, 3 * cm, 3 * cm, 3.5 * cm]),
+    ]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.part')
+    try:
+        SimpleDocTemplate(str(tmp_path), pagesize=landscape(A4), title='ABET Self-Study Report',
+                          leftMargin=1.5 * cm, rightMargin=1.5 * cm).build(story)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
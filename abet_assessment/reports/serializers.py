@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Report, Comment
+from .models import Report, Comment, SelfStudyReportJob
 from django.contrib.auth.models import User
 
 
@@ -24,3 +24,23 @@ class ReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = Report
         fields = ['id', 'title', 'content', 'author', 'created_at', 'updated_at', 'comments']
+
+
+class SelfStudyReportJobSerializer(serializers.ModelSerializer):
+    requested_by = UserSerializer(read_only=True)
+    program_name = serializers.CharField(source='program.name', read_only=True, default='All programs')
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SelfStudyReportJob
+        fields = ['id', 'program', 'program_name', 'requested_by', 'status', 'stage', 'progress',
+                  'cached', 'file_size', 'error', 'created_at', 'started_at', 'finished_at',
+                  'download_url']
+        read_only_fields = [field for field in fields if field != 'program']
+
+    def get_download_url(self, obj):
+        if obj.status != 'done':
+            return None
+        request = self.context.get('request')
+        url = f'/api/self-study-reports/{obj.pk}/download/'
+        return request.build_absolute_uri(url) if request else url
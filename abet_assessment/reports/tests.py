@@ -1,3 +1,58 @@
-from django.test import TestCase
+from programs.models import Course, Department, Faculty, Program
+from reports.models import SelfStudyReportJob
+from reports.self_study import collect_report_data
 
-# Create your tests here.
+# Query budget for the reports list, see conftest.py.
+
+
+def test_report_list_query_budget(assert_query_budget):
+    assert_query_budget('/api/reports/', budget=3)
+
+
+def test_self_study_report_is_rendered_once_per_data_version(dataset, api_client, settings, tmp_path):
+    settings.SELF_STUDY_REPORT_DIR = tmp_path
+    dataset.grow(2)
+
+    response = api_client.post('/api/self-study-reports/', {'program': dataset.program.id})
+    assert response.status_code == 202
+    first = response.data
+    assert first['status'] == 'done', first['error']
+    assert first['progress'] == 100 and not first['cached']
+
+    download = api_client.get(f"/api/self-study-reports/{first['id']}/download/")
+    assert download.status_code == 200
+    assert b''.join(download.streaming_content).startswith(b'%PDF')
+
+    # Same data: the stored PDF is reused
+    second = api_client.post('/api/self-study-reports/', {'program': dataset.program.id}).data
+    assert second['cached'] and len(list(tmp_path.glob('*.pdf'))) == 1
+
+    # New data: rendered again
+    dataset.grow(1)
+    third = api_client.post('/api/self-study-reports/', {'program': dataset.program.id}).data
+    assert not third['cached'] and len(list(tmp_path.glob('*.pdf'))) == 2
+
+
+def test_self_study_report_for_one_program_leaves_out_the_others(dataset):
+    dataset.grow(2)
+    department = Department.objects.create(name='Civil Engineering')
+    program = Program.objects.create(name='Civil Engineering', description='Bachelor', department=department)
+    faculty = Faculty.objects.create(name='Professor Civil', department=department,
+                                     email='civil@example.com', qualifications='PhD', expertise='Bridges')
+    Course.objects.create(code='CIV0001', name='Statics', description='Course', credits=3,
+                          program=program, instructor=faculty)
+
+    compliance = collect_report_data(dataset.program.id)['compliance']
+
+    assert compliance['course_syllabi']['total'] == 2
+    assert compliance['assessment_data']['total'] == 4
+    department_faculty = Faculty.objects.filter(department=dataset.department).count()
+    assert compliance['faculty_training']['total'] == department_faculty
+    assert collect_report_data()['compliance']['course_syllabi']['total'] == 3
+
+
+def test_self_study_download_waits_for_the_job(api_client):
+    job = SelfStudyReportJob.objects.create(status='running', progress=40)
+    response = api_client.get(f'/api/self-study-reports/{job.id}/download/')
+    assert response.status_code == 409
+    assert response.data['progress'] == 40
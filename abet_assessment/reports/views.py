@@ -1,16 +1,18 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 
 from django.views.decorators.csrf import ensure_csrf_cookie
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.db.models import Prefetch
 
-from .models import Report, Comment
-from .serializers import ReportSerializer, CommentSerializer, UserSerializer
-from users.permissions import IsAdminUserType
+from .models import Report, Comment, SelfStudyReportJob
+from .serializers import ReportSerializer, CommentSerializer, UserSerializer, SelfStudyReportJobSerializer
+from .self_study import active_job_for, report_path, start_job
+from users.permissions import IsAdminUserType, IsFacultyOrAdmin
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -21,7 +23,9 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
 
 
 class ReportViewSet(viewsets.ModelViewSet):
-    queryset = Report.objects.all().order_by('-created_at')
+    queryset = Report.objects.select_related('author').prefetch_related(
+        Prefetch('comments', queryset=Comment.objects.select_related('author'))
+    ).order_by('-created_at')
     serializer_class = ReportSerializer
 
     def get_permissions(self):
@@ -38,6 +42,43 @@ class ReportViewSet(viewsets.ModelViewSet):
         instance.delete()
 
 
+class SelfStudyReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    POST starts a self-study PDF job (optional "program") and answers 202 with the job,
+    or the job already in progress for the same program. Poll the job for progress and
+    fetch the PDF from download/ once its status is done.
+    """
+    queryset = SelfStudyReportJob.objects.select_related('program', 'requested_by').order_by('-created_at')
+    serializer_class = SelfStudyReportJobSerializer
+    permission_classes = [IsAuthenticated, IsFacultyOrAdmin]
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        program = serializer.validated_data.get('program')
+
+        job = active_job_for(program.id if program else None)
+        if job is None:
+            job = serializer.save(requested_by=request.user)
+            start_job(job)
+            job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'done':
+            return Response({'error': f'Report is {job.status}', 'progress': job.progress},
+                            status=status.HTTP_409_CONFLICT)
+        path = report_path(job.fingerprint)
+        if not path.exists():
+            return Response({'error': 'The rendered file was removed, request the report again'},
+                            status=status.HTTP_410_GONE)
+        name = (job.program.name if job.program else 'all-programs').replace(' ', '-').lower()
+        return FileResponse(open(path, 'rb'), as_attachment=True, content_type='application/pdf',
+                            filename=f'self-study-{name}-{job.finished_at:%Y%m%d}.pdf')
+
+
 @ensure_csrf_cookie
 def get_csrf_token(request):
     return JsonResponse({'message': 'CSRF cookie set'})
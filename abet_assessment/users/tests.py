@@ -1,3 +1,5 @@
-from django.test import TestCase
+# Query budget for the users list, see conftest.py.
 
-# Create your tests here.
+
+def test_user_list_query_budget(assert_query_budget):
+    assert_query_budget('/api/users/', budget=2)
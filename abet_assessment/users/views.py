@@ -168,21 +168,17 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     
     def list(self, request):
-        users = User.objects.all()
+        # Profiles and departments come in the same query
+        users = User.objects.select_related('profile__department')
         user_data = []
         
         for user in users:
             try:
-                # Try to get the profile using the correct relationship
-                profile = UserProfile.objects.get(user_id=user.id)
+                profile = user.profile
                 department_name = 'N/A'
                 
-                if profile.department_id:
-                    try:
-                        department = Department.objects.get(id=profile.department_id)
-                        department_name = department.name
-                    except Department.DoesNotExist:
-                        department_name = 'N/A'
+                if profile.department is not None:
+                    department_name = profile.department.name
                 
                 user_info = {
                     'id': user.id,